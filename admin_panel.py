@@ -3,9 +3,10 @@ from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel, 
     QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, 
     QGroupBox, QFormLayout, QSplitter, QTreeWidget, QTreeWidgetItem, 
-    QStackedWidget, QFrame, QAbstractItemView, QDoubleSpinBox, QGridLayout
+    QStackedWidget, QFrame, QAbstractItemView, QDoubleSpinBox, QGridLayout,
+    QCheckBox, QInputDialog
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QTimer
 from PySide6.QtGui import QColor, QFont, QGuiApplication
 
 import hardware 
@@ -18,6 +19,13 @@ from box_domain import (
 from box_service import cerrar_caja, reabrir_caja
 from piece_service import PieceService
 from product_service import ProductService
+from db_worker import DBExecutor
+
+CAMBIOS_INTERVALO_MS = 2000
+# Canales por página en el árbol de supervisión; las cajas se piden al expandir cada canal.
+ARBOL_LOTE = 100
+# Espera tras la última tecla antes de buscar en el catálogo.
+BUSQUEDA_ESPERA_MS = 200
 
 # --- ESTILOS "HEAVY INDUSTRY" PARA ADMIN ---
 ADMIN_STYLE = """
@@ -112,11 +120,13 @@ QPushButton#BtnSuccess { background-color: #28a745; color: white; border: 2px so
 """
 
 class AdminPanel(QDialog):
-    data_changed = Signal()
+    # Lleva la lista de cambios aplicados (filas de la bitácora).
+    data_changed = Signal(object)
 
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
         self.db = db_manager
+        self.db_exec = DBExecutor(self)
         self.product_service = ProductService(self.db)
         self.piece_service = PieceService(self.db, self.product_service)
         self.hw = hardware.HardwareManager() 
@@ -126,11 +136,30 @@ class AdminPanel(QDialog):
         
         self.current_canal_data = None
         self.current_box_data = None
+
+        self._cursor_cambios = None
+        self._poll_again = False
+        self._items_canal = {}
+        self._items_caja = {}
+        self._canales_cargados = set()
+        self._arbol_gen = 0
+        self._ultimo_canal = None
+        self._item_mas = None
         
         self.setup_window()
         self.setup_ui()
         self.load_tree_data()
 
+        self.tm_cambios = QTimer(self)
+        self.tm_cambios.timeout.connect(self.poll_changes)
+        self.tm_cambios.start(CAMBIOS_INTERVALO_MS)
+
+    def done(self, r):
+        # Las respuestas pendientes ya no tienen a quién pintar.
+        self.tm_cambios.stop()
+        self.db_exec.shutdown(wait=False)
+        super().done(r)
+
     def setup_window(self):
         self.setWindowTitle("PANEL DE GESTIÓN Y SUPERVISIÓN")
         self.setStyleSheet(ADMIN_STYLE)
@@ -183,7 +212,11 @@ class AdminPanel(QDialog):
         self.tree = QTreeWidget()
         self.tree.setHeaderLabels(["Elemento"])
         self.tree.itemClicked.connect(self.on_tree_select)
+        self.tree.itemExpanded.connect(self.on_tree_expanded)
         lv.addWidget(self.tree)
+        self.chk_archivo = QCheckBox("🗄️ Mostrar archivo histórico")
+        self.chk_archivo.toggled.connect(self.load_tree_data)
+        lv.addWidget(self.chk_archivo)
         btn_ref = QPushButton("🔄 REFRESCAR"); btn_ref.clicked.connect(self.load_tree_data)
         lv.addWidget(btn_ref)
         splitter.addWidget(left_w)
@@ -199,32 +232,218 @@ class AdminPanel(QDialog):
         return panel
 
     def load_tree_data(self):
+        self.db_exec.submit(self._fetch_tree, self.chk_archivo.isChecked(), on_result=self._render_tree, clave="arbol")
+
+    def _fetch_tree(self, incluir_archivo):
+        # El cursor se lee antes: lo escrito durante la carga llega después como cambio.
+        cursor = self.db.get_cursor_cambios()
+        # Solo la primera página de canales; las demás con "Cargar más" y las cajas al expandir.
+        canales = self.db.get_canales_pagina(lote=ARBOL_LOTE)
+        archivados = self.db.get_historial_archivado() if incluir_archivo else []
+        return cursor, canales, archivados
+
+    def _render_tree(self, resultado):
+        self._cursor_cambios, canales, archivados = resultado
+        # Las respuestas de páginas o cajas pedidas antes de recargar ya no aplican.
+        self._arbol_gen += 1
         self.tree.clear()
-        canales = self.db.get_all_canales(incluir_cerrados=True)
-        for c in canales:
+        self._items_canal = {}
+        self._items_caja = {}
+        self._canales_cargados = set()
+        self._ultimo_canal = None
+        self._item_mas = None
+        self._add_canales(canales)
+        for c, cajas in archivados:
             item_c = QTreeWidgetItem(self.tree)
+            self._set_canal_item(item_c, c)
+            self._fill_cajas(item_c, c['id'], cajas)
+        self._poll_pendiente()
+
+    def _add_canales(self, canales):
+        # Las páginas van antes de "Cargar más" y de los canales archivados.
+        pos = self.tree.indexOfTopLevelItem(self._item_mas) if self._item_mas else self.tree.topLevelItemCount()
+        for c in canales:
+            item_c = QTreeWidgetItem()
+            item_c.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            self.tree.insertTopLevelItem(pos, item_c)
+            pos += 1
+            self._set_canal_item(item_c, c)
+            if c['estado'] == 'ACTIVO':
+                item_c.setExpanded(True)
+        if canales:
+            self._ultimo_canal = canales[-1]['id']
+
+        hay_mas = len(canales) == ARBOL_LOTE
+        if hay_mas and self._item_mas is None:
+            self._item_mas = QTreeWidgetItem()
+            self._item_mas.setText(0, "⬇️ Cargar más canales...")
+            self._item_mas.setData(0, Qt.UserRole, {'type': 'mas'})
+            self.tree.insertTopLevelItem(pos, self._item_mas)
+        elif not hay_mas and self._item_mas is not None:
+            self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(self._item_mas))
+            self._item_mas = None
+
+    def load_more_canales(self):
+        if self._ultimo_canal is None or self.db_exec.pending("arbol_pagina"):
+            return
+        gen = self._arbol_gen
+        self.db_exec.submit(
+            self.db.get_canales_pagina, self._ultimo_canal, ARBOL_LOTE,
+            on_result=lambda canales: gen == self._arbol_gen and self._add_canales(canales),
+            clave="arbol_pagina",
+        )
+
+    def on_tree_expanded(self, item):
+        data = item.data(0, Qt.UserRole)
+        if not data or data['type'] != 'canal' or data['id'] in self._canales_cargados:
+            return
+        cid, gen = data['id'], self._arbol_gen
+        self.db_exec.submit(
+            self._fetch_cajas, cid,
+            on_result=lambda cajas: self._render_cajas(gen, cid, cajas),
+            clave=f"cajas-{cid}",
+        )
+
+    def _fetch_cajas(self, canal_id):
+        return list(self.db.iter_cajas(canal_id, incluir_cerradas=True))
+
+    def _render_cajas(self, gen, canal_id, cajas):
+        item_c = self._items_canal.get(canal_id)
+        if gen != self._arbol_gen or item_c is None or canal_id in self._canales_cargados:
+            return
+        self._fill_cajas(item_c, canal_id, cajas)
+
+    def _fill_cajas(self, item_c, canal_id, cajas):
+        self._canales_cargados.add(canal_id)
+        for b in cajas:
+            self._set_caja_item(QTreeWidgetItem(item_c), b)
+        item_c.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def _set_canal_item(self, item_c, c):
+        if c.get('archivo'):
+            icon = "🗄️"
+        else:
             icon = "🟢" if c['estado'] == 'ACTIVO' else "🔒"
-            item_c.setText(0, f"{icon} {c['siniiga']}")
-            item_c.setData(0, Qt.UserRole, {'type': 'canal', 'id': c['id']})
-            
-            cajas = self.db.get_all_cajas_canal(c['id'], incluir_cerradas=True)
-            for b in cajas:
-                item_b = QTreeWidgetItem(item_c)
-                st = "📦" if puede_cerrar_caja(b['estado']) else "🔒"
-                item_b.setText(0, f"    {st} Caja #{b['numero_caja']} ({b['num_piezas']})")
-                item_b.setData(0, Qt.UserRole, {'type': 'caja', 'id': b['id'], 'pid': c['id']})
-        self.tree.expandAll()
+        item_c.setText(0, f"{icon} {c['siniiga']}")
+        item_c.setData(0, Qt.UserRole, {'type': 'canal', 'id': c['id']})
+        self._items_canal[c['id']] = item_c
+
+    def _set_caja_item(self, item_b, b):
+        st = "📦" if puede_cerrar_caja(b['estado']) else "🔒"
+        item_b.setText(0, f"    {st} Caja #{b['numero_caja']} ({b['num_piezas']})")
+        item_b.setData(0, Qt.UserRole, {'type': 'caja', 'id': b['id'], 'pid': b['canal_id'], 'numero': b['numero_caja']})
+        self._items_caja[b['id']] = item_b
+
+    # --- Refresco incremental (bitácora de cambios) ---
+    def poll_changes(self):
+        # Hasta que termine la primera carga no hay cursor del que partir. Si ya hay
+        # una consulta en curso puede haber leído antes del cambio que motivó esta
+        # llamada: se repite al llegar su respuesta en vez de esperar al timer.
+        if self._cursor_cambios is None or self.db_exec.pending("arbol") or self.db_exec.pending("cambios"):
+            self._poll_again = True
+            return
+        self._poll_again = False
+        self.db_exec.submit(self._fetch_changes, self._cursor_cambios, on_result=self._apply_changes, clave="cambios")
+
+    def _poll_pendiente(self):
+        if self._poll_again:
+            self.poll_changes()
+
+    def _fetch_changes(self, cursor):
+        lote = self.db.get_cambios_desde(cursor)
+        cambios = lote['cambios']
+        lote['canales'] = {cid: self.db.get_canal_by_id(cid) for cid in {c['canal_id'] for c in cambios if c['canal_id']}}
+        lote['cajas'] = {cid: self.db.get_caja_by_id(cid) for cid in {c['caja_id'] for c in cambios if c['caja_id']}}
+        return lote
+
+    def _apply_changes(self, lote):
+        self._aplicar_cambios(lote)
+        self._poll_pendiente()
+
+    def _aplicar_cambios(self, lote):
+        if lote['recargar']:
+            self.load_tree_data()
+            self._refresh_detail()
+            self.data_changed.emit([])
+            return
+        self._cursor_cambios = lote['cursor']
+        if not lote['cambios']:
+            return
+
+        incluir_archivo = self.chk_archivo.isChecked()
+        for cid, c in lote['canales'].items():
+            item_c = self._items_canal.get(cid)
+            if c is None or (c.get('archivo') and not incluir_archivo):
+                if item_c is not None:
+                    self._remove_canal_item(cid)
+            elif item_c is not None:
+                self._set_canal_item(item_c, c)
+            elif self._item_mas is not None and cid < self._ultimo_canal:
+                # Todavía no se llegó a su página: aparecerá con "Cargar más".
+                continue
+            else:
+                # Canal nuevo: el árbol va por id descendente. Sus cajas se piden al expandirlo.
+                item_c = QTreeWidgetItem()
+                item_c.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+                self.tree.insertTopLevelItem(0, item_c)
+                self._set_canal_item(item_c, c)
+                item_c.setExpanded(True)
+
+        for bid, b in lote['cajas'].items():
+            item_b = self._items_caja.get(bid)
+            padre = self._items_canal.get(b['canal_id']) if b else None
+            # Si las cajas del canal no se han cargado, llegarán completas al expandirlo.
+            if padre is None or b['canal_id'] not in self._canales_cargados:
+                if item_b is not None:
+                    item_b.parent().removeChild(item_b)
+                    del self._items_caja[bid]
+                continue
+            if item_b is None or item_b.parent() is not padre:
+                if item_b is not None:
+                    item_b.parent().removeChild(item_b)
+                item_b = QTreeWidgetItem()
+                pos = sum(
+                    1 for i in range(padre.childCount())
+                    if padre.child(i).data(0, Qt.UserRole)['numero'] < b['numero_caja']
+                )
+                padre.insertChild(pos, item_b)
+            self._set_caja_item(item_b, b)
+
+        vista = self.detail_stack.currentIndex()
+        if vista == 1 and self.current_canal_data:
+            afectado = self.current_canal_data['id'] in lote['canales']
+        elif vista == 2 and self.current_box_data:
+            afectado = self.current_box_data['id'] in lote['cajas']
+        else:
+            afectado = False
+        if afectado:
+            self._refresh_detail()
+        self.data_changed.emit(lote['cambios'])
+
+    def _remove_canal_item(self, cid):
+        item_c = self._items_canal.pop(cid)
+        self._canales_cargados.discard(cid)
+        for i in range(item_c.childCount()):
+            data = item_c.child(i).data(0, Qt.UserRole)
+            self._items_caja.pop(data['id'], None)
+        self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item_c))
+
+    def _refresh_detail(self):
+        vista = self.detail_stack.currentIndex()
+        if vista == 1 and self.current_canal_data:
+            self.show_canal_details(self.current_canal_data['id'])
+        elif vista == 2 and self.current_box_data:
+            self.show_box_details()
 
     def on_tree_select(self, item, col):
         data = item.data(0, Qt.UserRole)
         if not data: return
-        if data['type'] == 'canal':
-            self.current_canal_data = self.db.get_canal_by_id(data['id'])
-            self.show_canal_details()
+        if data['type'] == 'mas':
+            self.load_more_canales()
+        elif data['type'] == 'canal':
+            self.show_canal_details(data['id'])
         elif data['type'] == 'caja':
-            self.current_box_data = self.db.get_caja_by_id(data['id'])
-            self.current_canal_data = self.db.get_canal_by_id(data['pid'])
-            self.show_box_details()
+            self.show_box_details(data['id'], data['pid'])
 
     def setup_siniiga_panel(self):
         w = QWidget(); l = QVBoxLayout(w)
@@ -234,7 +453,9 @@ class AdminPanel(QDialog):
         
         gb = QGroupBox("Resumen"); fl = QFormLayout(gb)
         self.lbl_s_cajas = QLabel("-"); self.lbl_s_peso = QLabel("-")
+        self.lbl_s_piezas = QLabel("-"); self.lbl_s_actividad = QLabel("-")
         fl.addRow("Cajas:", self.lbl_s_cajas); fl.addRow("Peso:", self.lbl_s_peso)
+        fl.addRow("Piezas:", self.lbl_s_piezas); fl.addRow("Última actividad:", self.lbl_s_actividad)
         l.addWidget(gb)
         
         self.btn_s_toggle = QPushButton("ACCION")
@@ -312,19 +533,43 @@ class AdminPanel(QDialog):
         l.addWidget(act_box)
         return w
 
-    def show_canal_details(self):
-        c = self.current_canal_data
-        stats = self.db.get_resumen_canal(c['id'])
+    def show_canal_details(self, canal_id):
+        self.db_exec.submit(
+            lambda: (self.db.get_canal_by_id(canal_id), self.db.get_resumen_canal(canal_id)),
+            on_result=self._render_canal_details,
+            clave="detalle",
+        )
+
+    def _render_canal_details(self, datos):
+        c, stats = datos
+        if not c:
+            return
+        self.current_canal_data = c
         self.lbl_s_title.setText(f"SINIIGA: {c['siniiga']}")
-        self.lbl_s_cajas.setText(str(stats['total_cajas']))
+        self.lbl_s_cajas.setText(f"{stats['total_cajas']} ({stats['cajas_abiertas']} abiertas / {stats['cajas_cerradas']} cerradas)")
         self.lbl_s_peso.setText(f"{stats['peso_total']:.2f} Kg")
+        self.lbl_s_piezas.setText(str(stats['num_piezas']))
+        self.lbl_s_actividad.setText(stats['ultima_actividad'] or "-")
         self.btn_s_toggle.setText("🔒 ARCHIVAR" if c['estado'] == 'ACTIVO' else "🔓 REACTIVAR")
+        # Canal en archivo histórico: solo consulta.
+        self.btn_s_toggle.setEnabled(not c.get('archivo'))
         self.detail_stack.setCurrentIndex(1)
 
-    def show_box_details(self):
-        bid = self.current_box_data['id']
-        b = self.db.get_caja_by_id(bid) 
-        self.current_box_data = b 
+    def show_box_details(self, caja_id=None, canal_id=None):
+        bid = caja_id if caja_id is not None else self.current_box_data['id']
+        cid = canal_id if canal_id is not None else self.current_canal_data['id']
+        self.db_exec.submit(
+            lambda: (self.db.get_caja_by_id(bid), self.db.get_canal_by_id(cid), self.db.get_contenido_caja(bid)),
+            on_result=self._render_box_details,
+            clave="detalle",
+        )
+
+    def _render_box_details(self, datos):
+        b, c, piezas = datos
+        if not b:
+            return
+        self.current_box_data = b
+        self.current_canal_data = c
         self.lbl_b_title.setText(f"CAJA #{b['numero_caja']}")
         is_open = (b['estado'] == ESTADO_ABIERTA)
         
@@ -335,7 +580,6 @@ class AdminPanel(QDialog):
         self.kv_peso.setText(f"{b['peso_acumulado']:.2f} kg")
         self.kv_pzas.setText(str(b['num_piezas']))
 
-        piezas = self.db.get_contenido_caja(bid)
         self.tbl_p.setRowCount(0)
         for p in piezas:
             r = self.tbl_p.rowCount(); self.tbl_p.insertRow(r)
@@ -351,9 +595,12 @@ class AdminPanel(QDialog):
         self.update_piece_edit_panel_state(is_open)
             
         self.btn_toggle_box.setText("🔒 CERRAR" if is_open else "🔓 REABRIR")
-        self.btn_toggle_box.setEnabled(True)
+        # Caja en archivo histórico: solo reimpresión.
+        archivada = bool(b.get('archivo'))
+        self.btn_toggle_box.setEnabled(not archivada)
+        self.btn_prod.setEnabled(not archivada)
         self.btn_print_master.setVisible(not is_open)
-        self.btn_del_box.setEnabled(is_open)
+        self.btn_del_box.setEnabled(is_open and not archivada)
         self.detail_stack.setCurrentIndex(2)
 
     def update_piece_edit_panel_state(self, is_open):
@@ -384,8 +631,7 @@ class AdminPanel(QDialog):
             QMessageBox.warning(self, "Aviso", str(e))
             return
 
-        self.show_box_details()
-        self.data_changed.emit()
+        self.poll_changes()
 
     def action_delete_piece(self):
         row = self.tbl_p.currentRow()
@@ -404,8 +650,7 @@ class AdminPanel(QDialog):
             QMessageBox.warning(self, "Aviso", str(e))
             return
 
-        self.show_box_details()
-        self.data_changed.emit()
+        self.poll_changes()
 
     def action_reprint_tag(self):
         row = self.tbl_p.currentRow()
@@ -454,9 +699,7 @@ class AdminPanel(QDialog):
         else:
             return
 
-        self.load_tree_data()
-        self.data_changed.emit()
-        self.show_box_details()
+        self.poll_changes()
 
     def action_delete_box(self):
         if self.current_box_data['estado'] != ESTADO_ABIERTA:
@@ -465,35 +708,78 @@ class AdminPanel(QDialog):
 
         if QMessageBox.critical(self, "Eliminar", "¿Borrar caja?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
             self.db.eliminar_caja(self.current_box_data['id'])
-            self.load_tree_data(); self.detail_stack.setCurrentIndex(0); self.data_changed.emit()
+            self.detail_stack.setCurrentIndex(0); self.poll_changes()
 
     def action_toggle_canal(self):
         cid = self.current_canal_data['id']
         if self.current_canal_data['estado'] == 'ACTIVO': self.db.cerrar_canal(cid)
         else: self.db.reabrir_canal(cid)
-        self.load_tree_data(); self.detail_stack.setCurrentIndex(0); self.data_changed.emit()
+        self.detail_stack.setCurrentIndex(0); self.poll_changes()
 
     def create_catalog_view(self):
         w = QWidget(); lay = QHBoxLayout(w)
+        col = QVBoxLayout()
+        self.inp_buscar = QLineEdit()
+        self.inp_buscar.setPlaceholderText("🔍 Buscar por código, nombre o especie (ej. 'rib por', 'rinon')")
+        self.inp_buscar.setClearButtonEnabled(True)
+        self.inp_buscar.textChanged.connect(self.on_search_changed)
+        self.lbl_buscar = QLabel("")
+        self.tm_buscar = QTimer(self)
+        self.tm_buscar.setSingleShot(True)
+        self.tm_buscar.setInterval(BUSQUEDA_ESPERA_MS)
+        self.tm_buscar.timeout.connect(self.load_catalog)
         self.tbl_cat = QTableWidget(0, 3)
         self.tbl_cat.setHorizontalHeaderLabels(["Código", "Nombre", "Especie"])
         self.tbl_cat.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.tbl_cat.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tbl_cat.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.tbl_cat.itemClicked.connect(self.on_cat_select)
+        self.tbl_cat.itemSelectionChanged.connect(self.on_cat_selection_changed)
         gb = QGroupBox("Editor"); fl = QFormLayout(gb)
         self.inp_cod = QLineEdit(); self.inp_nom = QLineEdit(); self.inp_esp = QLineEdit()
         btn_save = QPushButton("💾 GUARDAR"); btn_save.setObjectName("BtnAction"); btn_save.clicked.connect(self.save_product)
         btn_del = QPushButton("🗑️ BORRAR"); btn_del.setObjectName("BtnDanger"); btn_del.clicked.connect(self.del_product)
         fl.addRow("Cod:", self.inp_cod); fl.addRow("Nom:", self.inp_nom); fl.addRow("Esp:", self.inp_esp)
         fl.addRow(btn_save); fl.addRow(btn_del)
-        lay.addWidget(self.tbl_cat, 1); lay.addWidget(gb, 0)
+
+        # Selección múltiple (Ctrl/Shift + clic): un solo cambio para todos los productos marcados.
+        gb_lote = QGroupBox("Selección"); vl = QVBoxLayout(gb_lote)
+        self.lbl_sel_cat = QLabel("0 productos")
+        self.btn_lote_act = QPushButton("✅ ACTIVAR"); self.btn_lote_act.setObjectName("BtnSuccess")
+        self.btn_lote_act.clicked.connect(lambda: self.action_bulk_catalog("activar"))
+        self.btn_lote_des = QPushButton("⛔ DESACTIVAR"); self.btn_lote_des.setObjectName("BtnDanger")
+        self.btn_lote_des.clicked.connect(lambda: self.action_bulk_catalog("desactivar"))
+        self.btn_lote_esp = QPushButton("🏷️ CAMBIAR ESPECIE")
+        self.btn_lote_esp.clicked.connect(lambda: self.action_bulk_catalog("especie"))
+        for wdg in (self.lbl_sel_cat, self.btn_lote_act, self.btn_lote_des, self.btn_lote_esp):
+            vl.addWidget(wdg)
+        self.on_cat_selection_changed()
+
+        side = QVBoxLayout(); side.addWidget(gb); side.addWidget(gb_lote); side.addStretch()
+        col.addWidget(self.inp_buscar); col.addWidget(self.lbl_buscar); col.addWidget(self.tbl_cat, 1)
+        lay.addLayout(col, 1); lay.addLayout(side, 0)
         self.load_catalog()
         return w
 
+    def on_search_changed(self, _texto):
+        # Cada tecla reinicia la espera: se busca una vez cuando el usuario hace una pausa.
+        self.tm_buscar.start()
+
     def load_catalog(self):
+        self.tm_buscar.stop()
+        texto = self.inp_buscar.text().strip()
+        if texto:
+            # clave: si llegan dos búsquedas, solo se pinta la respuesta de la última.
+            self.db_exec.submit(self.product_service.search, texto, on_result=self._render_catalog, clave="catalogo")
+        else:
+            self.db_exec.submit(self.product_service.list_all, True, on_result=self._render_catalog, clave="catalogo")
+
+    def _render_catalog(self, prods):
+        texto = self.inp_buscar.text().strip()
+        self.lbl_buscar.setText(f"{len(prods)} resultado(s) para '{texto}'" if texto else f"{len(prods)} productos")
         self.tbl_cat.setRowCount(0)
-        prods = self.product_service.list_all(include_inactive=True)
-        for p in prods:
-            r = self.tbl_cat.rowCount(); self.tbl_cat.insertRow(r)
+        self.tbl_cat.setRowCount(len(prods))
+        for r, p in enumerate(prods):
             code_item = QTableWidgetItem(str(p['codigo']))
             name_item = QTableWidgetItem(p['nombre'])
             especie_item = QTableWidgetItem(p['especie'])
@@ -511,6 +797,47 @@ class AdminPanel(QDialog):
         if r >= 0:
             self.inp_cod.setText(self.tbl_cat.item(r,0).text()); self.inp_cod.setReadOnly(True); self.inp_nom.setText(self.tbl_cat.item(r,1).text()); self.inp_esp.setText(self.tbl_cat.item(r,2).text())
 
+    def selected_catalog_codes(self):
+        filas = sorted(i.row() for i in self.tbl_cat.selectionModel().selectedRows())
+        return [self.tbl_cat.item(r, 0).text() for r in filas]
+
+    def on_cat_selection_changed(self):
+        n = len(self.tbl_cat.selectionModel().selectedRows())
+        self.lbl_sel_cat.setText(f"{n} producto(s) seleccionado(s)")
+        for btn in (self.btn_lote_act, self.btn_lote_des, self.btn_lote_esp):
+            btn.setEnabled(n > 0)
+
+    def action_bulk_catalog(self, accion):
+        codigos = self.selected_catalog_codes()
+        if not codigos:
+            return
+
+        nueva_especie = None
+        if accion == "especie":
+            nueva_especie, ok = QInputDialog.getText(self, "Cambiar especie", f"Nueva especie para {len(codigos)} producto(s):")
+            if not ok or not nueva_especie.strip():
+                return
+        elif QMessageBox.question(
+            self, accion.capitalize(), f"¿{accion.capitalize()} {len(codigos)} producto(s)?"
+        ) != QMessageBox.Yes:
+            return
+
+        try:
+            reporte = self.product_service.cambiar_en_lote(accion, codigos=codigos, nueva_especie=nueva_especie)
+        except ValueError as e:
+            QMessageBox.warning(self, "Aviso", str(e))
+            return
+
+        cuenta = {}
+        for r in reporte:
+            cuenta[r['estado']] = cuenta.get(r['estado'], 0) + 1
+        faltantes = [r['codigo'] for r in reporte if r['estado'] == 'NO_EXISTE']
+        resumen = f"Cambiados: {cuenta.get('CAMBIADO', 0)} | Sin cambios: {cuenta.get('SIN_CAMBIOS', 0)}"
+        if faltantes:
+            resumen += f"\nNo existen: {', '.join(faltantes)}"
+        QMessageBox.information(self, "Catálogo", resumen)
+        self.load_catalog()
+
     def save_product(self):
         codigo = self.inp_cod.text()
         if not codigo:
@@ -0,0 +1,217 @@
+# archive_service.py
+import os
+
+ARCHIVO_ALIAS = "archivo"
+TABLAS_ARCHIVO = ("canales", "cajas", "piezas")
+INDICES_ARCHIVO = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS archivo.ux_canales_id ON canales(id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS archivo.ux_cajas_id ON cajas(id)",
+    # (canal_id, numero_caja): el historial lista las cajas de un canal ya ordenadas.
+    "CREATE INDEX IF NOT EXISTS archivo.idx_cajas_canal_numero ON cajas(canal_id, numero_caja)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS archivo.ux_piezas_id ON piezas(id)",
+    # (caja_id, id): en el archivo id no es INTEGER PRIMARY KEY; sin él el contenido se ordena en temporal.
+    "CREATE INDEX IF NOT EXISTS archivo.idx_piezas_caja_id ON piezas(caja_id, id)",
+)
+
+
+def nombre_archivo_mensual(mes):
+    """mes = 'AAAA_MM' -> produccion_AAAA_MM.db"""
+    return f"produccion_{mes}.db"
+
+
+class ArchivePolicy:
+    """Política de archivado en frío (sección [ARCHIVO] de config.ini)."""
+
+    def __init__(self, directorio="archivo", dias_retencion=30, al_iniciar=False):
+        self.directorio = directorio
+        self.dias_retencion = int(dias_retencion)
+        self.al_iniciar = bool(al_iniciar)
+
+    @classmethod
+    def from_config(cls, config):
+        if config is None or not config.has_section("ARCHIVO"):
+            return cls()
+
+        sec = config["ARCHIVO"]
+        base = cls()
+        return cls(
+            directorio=sec.get("DIRECTORIO", base.directorio),
+            dias_retencion=sec.getint("DIAS_RETENCION", base.dias_retencion),
+            al_iniciar=sec.getboolean("AL_INICIAR", base.al_iniciar),
+        )
+
+    def ruta_directorio(self, db_path):
+        # Relativo a la carpeta de la base, no al directorio de trabajo.
+        if os.path.isabs(self.directorio):
+            return self.directorio
+        return os.path.join(os.path.dirname(os.path.abspath(db_path)), self.directorio)
+
+
+class ArchiveService:
+    """Mueve canales CERRADOS sin actividad reciente a archivos mensuales.
+
+    Cada archivo se adjunta (ATTACH) a la conexión de la base caliente y el
+    movimiento se hace en dos transacciones:
+      1. copia canal, cajas y piezas al archivo (reemplazando una copia previa);
+      2. comprueba la copia, registra el canal en archivo_canales y lo borra
+         de la base caliente.
+    Si el proceso se interrumpe entre ambas, el canal sigue en la base caliente
+    y la siguiente ejecución vuelve a copiarlo: no se pierde ni se duplica.
+    """
+
+    def __init__(self, db, policy=None):
+        self.db = db
+        self.policy = policy or db.archivo
+        self.db.instrumentar(self)
+
+    def candidatos(self, dias=None):
+        dias = self.policy.dias_retencion if dias is None else int(dias)
+        rows = self.db._get_conn().execute("""
+            SELECT cn.id, cn.siniiga, cn.lote_dia, cn.fecha_creacion,
+                   strftime('%Y_%m', COALESCE(cn.fecha_creacion, 'now'), 'localtime') as mes,
+                   COALESCE(r.total_cajas, 0) as total_cajas,
+                   COALESCE(r.peso_total, 0) as peso_total,
+                   COALESCE(r.num_piezas, 0) as num_piezas,
+                   r.ultima_actividad
+            FROM canales cn
+            LEFT JOIN resumen_canales r ON r.canal_id = cn.id
+            WHERE cn.estado = 'CERRADO'
+              AND COALESCE(r.cajas_abiertas, 0) = 0
+              AND COALESCE(r.ultima_actividad, cn.fecha_creacion) < datetime('now', ?)
+            ORDER BY cn.id ASC
+        """, (f"-{dias} days",)).fetchall()
+        return [dict(r) for r in rows]
+
+    def archivar(self, dias=None, dry_run=False):
+        """Devuelve una lista de dicts {canal_id, siniiga, archivo, cajas, piezas, estado}."""
+        por_archivo = {}
+        for c in self.candidatos(dias):
+            por_archivo.setdefault(nombre_archivo_mensual(c['mes']), []).append(c)
+
+        reporte = []
+        for nombre, canales in por_archivo.items():
+            if dry_run:
+                reporte.extend(_entrada(c, nombre, 'PENDIENTE') for c in canales)
+                continue
+            reporte.extend(self._archivar_en(nombre, canales))
+        return reporte
+
+    def _archivar_en(self, nombre, canales):
+        reporte = []
+        with self.db.adjuntar_archivo(nombre, crear=True):
+            with self.db.transaction() as conn:
+                columnas = self._preparar_archivo(conn)
+                for c in canales:
+                    self._copiar_canal(conn, c['id'], columnas)
+
+            with self.db.transaction() as conn:
+                for c in canales:
+                    estado = self._retirar_canal(conn, c, nombre)
+                    reporte.append(_entrada(c, nombre, estado))
+        return reporte
+
+    def _preparar_archivo(self, conn):
+        """Crea las tablas del archivo (o añade columnas nuevas) y devuelve sus columnas."""
+        columnas = {}
+        for tabla in TABLAS_ARCHIVO:
+            vivas = [r[1] for r in conn.execute(f"PRAGMA main.table_info({tabla})").fetchall()]
+            existentes = [r[1] for r in conn.execute(f"PRAGMA {ARCHIVO_ALIAS}.table_info({tabla})").fetchall()]
+            if not existentes:
+                # Sin restricciones UNIQUE/FK: un SINIIGA puede archivarse más de una vez.
+                conn.execute(f"CREATE TABLE {ARCHIVO_ALIAS}.{tabla} AS SELECT * FROM main.{tabla} WHERE 0")
+            else:
+                for col in vivas:
+                    if col not in existentes:
+                        conn.execute(f"ALTER TABLE {ARCHIVO_ALIAS}.{tabla} ADD COLUMN {col}")
+            columnas[tabla] = ", ".join(vivas)
+
+        for ddl in INDICES_ARCHIVO:
+            conn.execute(ddl)
+        return columnas
+
+    def _copiar_canal(self, conn, canal_id, columnas):
+        conn.execute(
+            "DELETE FROM archivo.piezas WHERE caja_id IN (SELECT id FROM archivo.cajas WHERE canal_id=?)",
+            (canal_id,),
+        )
+        conn.execute("DELETE FROM archivo.cajas WHERE canal_id=?", (canal_id,))
+        conn.execute("DELETE FROM archivo.canales WHERE id=?", (canal_id,))
+
+        cols = columnas['canales']
+        conn.execute(f"INSERT INTO archivo.canales ({cols}) SELECT {cols} FROM main.canales WHERE id=?", (canal_id,))
+        cols = columnas['cajas']
+        conn.execute(f"INSERT INTO archivo.cajas ({cols}) SELECT {cols} FROM main.cajas WHERE canal_id=?", (canal_id,))
+        cols = columnas['piezas']
+        conn.execute(f"""
+            INSERT INTO archivo.piezas ({cols}) SELECT {cols} FROM main.piezas
+            WHERE caja_id IN (SELECT id FROM main.cajas WHERE canal_id=?)
+        """, (canal_id,))
+
+    def _retirar_canal(self, conn, canal, nombre):
+        canal_id = canal['id']
+        row = conn.execute("SELECT estado FROM main.canales WHERE id=?", (canal_id,)).fetchone()
+        if not row or row['estado'] != 'CERRADO':
+            return 'OMITIDO'
+
+        conteo = """
+            SELECT COUNT(DISTINCT c.id), COUNT(p.id), MIN(c.id), MAX(c.id), MIN(p.id), MAX(p.id)
+            FROM {esquema}.cajas c LEFT JOIN {esquema}.piezas p ON p.caja_id = c.id
+            WHERE c.canal_id = ?
+        """
+        vivo = tuple(conn.execute(conteo.format(esquema="main"), (canal_id,)).fetchone())
+        copia = tuple(conn.execute(conteo.format(esquema=ARCHIVO_ALIAS), (canal_id,)).fetchone())
+        if vivo != copia:
+            # Cambió entre la copia y el retiro: se reintenta en la siguiente ejecución.
+            print(f"⚠️ Canal {canal_id} cambió durante el archivado; se omite.")
+            return 'OMITIDO'
+
+        resumen = conn.execute("SELECT * FROM main.resumen_canales WHERE canal_id=?", (canal_id,)).fetchone()
+        conn.execute("""
+            INSERT OR REPLACE INTO archivo_canales
+                (canal_id, siniiga, lote_dia, fecha_creacion, archivo, total_cajas, peso_total, num_piezas,
+                 ultima_actividad, caja_id_min, caja_id_max, pieza_id_min, pieza_id_max)
+            SELECT id, siniiga, lote_dia, fecha_creacion, ?, ?, ?, ?, ?, ?, ?, ?, ?
+            FROM main.canales WHERE id=?
+        """, (
+            nombre,
+            copia[0],
+            resumen['peso_total'] if resumen else 0,
+            copia[1],
+            resumen['ultima_actividad'] if resumen else None,
+            copia[2], copia[3], copia[4], copia[5],
+            canal_id,
+        ))
+
+        aporte = conn.execute("""
+            SELECT date(p.fecha_registro, 'localtime'), p.codigo_producto, COUNT(*), SUM(p.peso)
+            FROM main.piezas p JOIN main.cajas c ON c.id = p.caja_id
+            WHERE c.canal_id = ?
+            GROUP BY 1, 2
+        """, (canal_id,)).fetchall()
+
+        # Los triggers descuentan cajas, resumen_canales y produccion_diaria;
+        # resumen_canales se borra en cascada con el canal.
+        conn.execute("DELETE FROM main.piezas WHERE caja_id IN (SELECT id FROM main.cajas WHERE canal_id=?)", (canal_id,))
+        conn.execute("DELETE FROM main.cajas WHERE canal_id=?", (canal_id,))
+        conn.execute("DELETE FROM main.canales WHERE id=?", (canal_id,))
+
+        # La producción de días pasados no cambia por archivar: se repone.
+        for tabla in ("produccion_diaria", "produccion_diaria_archivada"):
+            conn.executemany(f"""
+                INSERT INTO {tabla} (dia, codigo_producto, piezas, peso) VALUES (?, ?, ?, ?)
+                ON CONFLICT(dia, codigo_producto) DO UPDATE SET
+                    piezas = piezas + excluded.piezas,
+                    peso = peso + excluded.peso
+            """, [tuple(r) for r in aporte])
+        return 'ARCHIVADO'
+
+
+def _entrada(canal, nombre, estado):
+    return {
+        'canal_id': canal['id'],
+        'siniiga': canal['siniiga'],
+        'archivo': nombre,
+        'cajas': canal['total_cajas'],
+        'piezas': canal['num_piezas'],
+        'estado': estado,
+    }
@@ -2,81 +2,70 @@ import sqlite3
 
 from box_domain import puede_cerrar_caja, puede_reabrir_caja
 from peso_policy import calcular_peso_caja, resolver_peso_cierre, PesoInvalidoError
+from db_rows import Caja
 
 
 class BoxService:
     def __init__(self, db_manager, hw_manager):
         self.db = db_manager
         self.hw_mgr = hw_manager
+        self.db.instrumentar(self)
 
     def cerrar_caja(self, caja_id, canal, contenido, peso_final):
-        conn = self.db._get_conn()
-        conn.execute("BEGIN IMMEDIATE")
-
-        try:
-            caja = conn.execute("SELECT * FROM cajas WHERE id=?", (caja_id,)).fetchone()
+        with self.db.transaction() as conn:
+            caja = self.db._consultar(Caja, "SELECT * FROM cajas WHERE id=?", (caja_id,), conn).fetchone()
             if not caja or caja["estado"] != "ABIERTA":
-                conn.rollback()
                 raise ValueError("Caja inexistente o no abierta")
 
             if not contenido:
-                conn.rollback()
                 raise ValueError("La caja no tiene contenido")
 
             self.db.cerrar_caja_conn(conn, caja_id)
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
 
         try:
             self.hw_mgr.print_master(
-                dict(caja),
+                caja,
                 canal,
                 contenido,
                 peso_manual_override=peso_final,
             )
         except Exception as exc:
-            self.db.reabrir_caja(caja_id)
+            try:
+                # reabrir_caja va por transaction(): reintenta si la base está ocupada.
+                self.db.reabrir_caja(caja_id)
+            except sqlite3.Error as error_reabrir:
+                # El operario debe enterarse del fallo de impresión, no solo del bloqueo.
+                raise RuntimeError(
+                    f"Error de impresión ({exc}); la caja {caja_id} quedó CERRADA sin etiqueta "
+                    f"maestra y no se pudo reabrir: {error_reabrir}"
+                ) from exc
             raise RuntimeError("Error de impresión, caja reabierta") from exc
 
         return True
 
     def crear_o_recuperar_caja(self, canal_id, numero_caja):
-        conn = self.db._get_conn()
-        conn.execute("BEGIN IMMEDIATE")
-
         try:
-            existe = conn.execute(
-                "SELECT id FROM cajas WHERE canal_id=? AND numero_caja=? AND estado='ABIERTA'",
-                (canal_id, numero_caja),
-            ).fetchone()
-            if existe:
-                conn.commit()
-                return existe["id"]
-
-            cursor = conn.execute(
-                "INSERT INTO cajas (canal_id, numero_caja) VALUES (?, ?)",
-                (canal_id, numero_caja),
-            )
-            conn.commit()
-            return cursor.lastrowid
+            with self.db.transaction() as conn:
+                existe = conn.execute(
+                    "SELECT id FROM cajas WHERE canal_id=? AND numero_caja=? AND estado='ABIERTA'",
+                    (canal_id, numero_caja),
+                ).fetchone()
+                if existe:
+                    return existe["id"]
+
+                cursor = conn.execute(
+                    "INSERT INTO cajas (canal_id, numero_caja) VALUES (?, ?)",
+                    (canal_id, numero_caja),
+                )
+                return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.rollback()
-            recuperada = conn.execute(
+            recuperada = self.db._get_conn().execute(
                 "SELECT id FROM cajas WHERE canal_id=? AND numero_caja=? AND estado='ABIERTA'",
                 (canal_id, numero_caja),
             ).fetchone()
             if recuperada:
                 return recuperada["id"]
             raise
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
 
 
 def cerrar_caja(db, hw_mgr, caja, canal, contenido, peso_final):
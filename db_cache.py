@@ -0,0 +1,113 @@
+# db_cache.py
+import functools
+import threading
+from collections import OrderedDict
+
+
+class CacheConfig:
+    """Caché de lecturas de DatabaseManager (sección [CACHE] de config.ini)."""
+
+    def __init__(self, activo=True, max_entradas=256, catalogo=True):
+        self.activo = bool(activo)
+        self.max_entradas = int(max_entradas)
+        # Catálogo de productos en memoria (ProductService); sigue a ACTIVO.
+        self.catalogo = bool(catalogo) and self.activo
+
+    @classmethod
+    def from_config(cls, config):
+        if config is None or not config.has_section("CACHE"):
+            return cls()
+
+        sec = config["CACHE"]
+        base = cls()
+        return cls(
+            activo=sec.getboolean("ACTIVO", base.activo),
+            max_entradas=sec.getint("MAX_ENTRADAS", base.max_entradas),
+            catalogo=sec.getboolean("CATALOGO", base.catalogo),
+        )
+
+
+class QueryCache:
+    """LRU de resultados de lecturas idempotentes, una por conexión del pool.
+
+    Cada caché guarda el sello (PRAGMA data_version, total_changes) de su
+    conexión. data_version cambia cuando otra conexión, de este u otro
+    proceso, confirma una escritura; total_changes cuenta las escrituras de
+    la propia conexión. Si el sello cambió, la caché se vacía entera antes
+    de responder: nunca se sirve un dato anterior a una escritura visible.
+    """
+
+    def __init__(self, max_entradas, conn_probe):
+        self.max_entradas = max_entradas
+        self._conn = conn_probe
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def cachear(self, nombre, fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            conn = self._conn()
+            # Dentro de una transacción se lee lo no confirmado: no se guarda.
+            if conn.in_transaction:
+                return fn(*args, **kwargs)
+            try:
+                clave = (nombre, args, tuple(sorted(kwargs.items())))
+                hash(clave)
+            except TypeError:
+                return fn(*args, **kwargs)
+
+            entradas = self._entradas(conn)
+            if clave in entradas:
+                entradas.move_to_end(clave)
+                self._contar('aciertos')
+                return _copia(entradas[clave])
+
+            self._contar('fallos')
+            resultado = fn(*args, **kwargs)
+            entradas[clave] = _copia(resultado)
+            if len(entradas) > self.max_entradas:
+                entradas.popitem(last=False)
+            return resultado
+        return envoltura
+
+    def _entradas(self, conn):
+        sello = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        local = self._local
+        if getattr(local, "conn", None) is not conn or local.sello != sello:
+            if getattr(local, "entradas", None):
+                self._contar('invalidaciones')
+            local.conn = conn
+            local.sello = sello
+            local.entradas = OrderedDict()
+        return local.entradas
+
+    def _contar(self, contador):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def limpiar(self):
+        self._local = threading.local()
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else None,
+                'max_entradas': self.max_entradas,
+            }
+
+
+def _copia(valor):
+    # Las filas (db_rows.Fila) son inmutables y se comparten; los dicts
+    # (p. ej. el resumen de canal) se copian porque el llamador puede modificarlos.
+    if isinstance(valor, dict):
+        return dict(valor)
+    if isinstance(valor, list):
+        return [dict(v) if isinstance(v, dict) else v for v in valor]
+    return valor
@@ -1,274 +1,385 @@
 # db_manager.py
 import sqlite3
 import os
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone
+
+from db_pool import ConnectionPool
+from db_profile import SQLiteProfile, CheckpointScheduler, ReintentoBloqueo
+from migration_runner import MigrationRunner
+from archive_service import ARCHIVO_ALIAS, ArchivePolicy
+from db_metrics import MetricsConfig, SQLMetrics, instrumentar
+from db_cache import CacheConfig, QueryCache
+from db_rows import Producto, Canal, Caja, Pieza
 
 DB_FILE = "produccion_local.db"
-SCHEMA_FILE = "schema.sql"
-MIGRATIONS_DIR = os.path.join("tools", "migrations")
-PRODUCTOS_ESTADO_MIGRATION = "001_add_estado_to_productos.sql"
-PIEZAS_CODIGO_INDEX_MIGRATION = "002_add_index_piezas_codigo_producto.sql"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# schema.sql en la raíz tiene prioridad; la copia versionada vive en tools/.
+SCHEMA_FILES = (
+    os.path.join(BASE_DIR, "schema.sql"),
+    os.path.join(BASE_DIR, "tools", "schema.sql"),
+)
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "tools", "migrations")
+TOLERANCIA_CONTADORES = 0.001
+# Más cambios pendientes que esto: conviene recargar completo en vez de aplicar deltas.
+CAMBIOS_LOTE = 500
+CAMBIOS_RETENCION_DIAS = 7
+# Filas por página de los iter_* (keyset: cada página es una consulta corta).
+ITER_LOTE = 500
+# Métodos que no se miden: context managers, generadores y ciclo de vida.
+SIN_METRICAS = (
+    "transaction", "adjuntar_archivo", "start_checkpoints", "checkpoint", "close", "instrumentar",
+    "iter_canales", "iter_cajas", "iter_piezas",
+)
+# Lecturas idempotentes que pasan por la caché (ver db_cache.QueryCache).
+CONSULTAS_CACHEABLES = (
+    "get_producto", "get_all_productos",
+    "get_canales_activos", "get_all_canales", "get_canal_by_id", "get_resumen_canal",
+    "get_max_numero_caja", "get_cajas_abiertas", "get_all_cajas_canal", "get_caja_by_id",
+    "get_contenido_caja", "get_pieza_by_id",
+)
+RESUMEN_CANAL_VACIO = {
+    'total_cajas': 0,
+    'cajas_abiertas': 0,
+    'cajas_cerradas': 0,
+    'peso_total': 0.0,
+    'num_piezas': 0,
+    'ultima_actividad': None,
+}
+
+
+def rango_utc_dia_local(fecha):
+    """Rango semiabierto [inicio, fin) en UTC, formato de CURRENT_TIMESTAMP, del día local `fecha`."""
+    inicio_local = datetime.combine(fecha, time.min).astimezone()
+    fin_local = datetime.combine(fecha + timedelta(days=1), time.min).astimezone()
+    formato = "%Y-%m-%d %H:%M:%S"
+    return (
+        inicio_local.astimezone(timezone.utc).strftime(formato),
+        fin_local.astimezone(timezone.utc).strftime(formato),
+    )
+
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, db_path=DB_FILE, config=None):
+        self.db_path = db_path
+        self.profile = SQLiteProfile.from_config(config)
+        metricas = MetricsConfig.from_config(config)
+        self.metrics = (
+            SQLMetrics(metricas.ruta_archivo(db_path), metricas.umbral_lento_ms) if metricas.activo else None
+        )
+        self.pool = ConnectionPool(db_path, on_connect=self._configurar_conexion)
+        self.reintentos = ReintentoBloqueo(self.profile)
+        cache = CacheConfig.from_config(config)
+        self.cache = QueryCache(cache.max_entradas, self._get_conn) if cache.activo else None
+        self.cache_catalogo = cache.catalogo
+        self.archivo = ArchivePolicy.from_config(config)
+        self.archivo_dir = self.archivo.ruta_directorio(db_path)
+        self._checkpoints = None
+        # Serializa las escrituras de todos los hilos del proceso (GUI y DBExecutor).
+        self._write_lock = threading.RLock()
         self._ensure_db_exists()
         self._run_pending_migrations()
+        if self.cache:
+            for nombre in CONSULTAS_CACHEABLES:
+                setattr(self, nombre, self.cache.cachear(nombre, getattr(self, nombre)))
+        # Después de la caché: los aciertos también se miden.
+        self.instrumentar(self, excluir=SIN_METRICAS)
 
-    def _get_conn(self):
-        conn = sqlite3.connect(DB_FILE)
+    def _configurar_conexion(self, conn):
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        self.profile.apply(conn)
+        if self.metrics:
+            self.metrics.instalar(conn)
+
+    def instrumentar(self, obj, excluir=()):
+        """Mide los métodos públicos de `obj` si la instrumentación SQL está activa."""
+        if self.metrics:
+            instrumentar(obj, self.metrics, conn_probe=self._get_conn, excluir=excluir)
+
+    def _get_conn(self):
+        return self.pool.acquire()
+
+    def _consultar(self, tipo, query, params=(), conn=None, **extra):
+        """Cursor ejecutado cuyas filas salen ya como `tipo` (Producto, Canal, Caja, Pieza)."""
+        cursor = (conn or self._get_conn()).execute(query, params)
+        if cursor.description:
+            cursor.row_factory = tipo.fabrica(cursor.description, **extra)
+        return cursor
+
+    def _paginar(self, tipo, primera, siguiente, params, claves, lote):
+        """Genera las filas de una consulta por páginas de `lote` (paginación keyset).
+
+        `primera` y `siguiente` terminan en LIMIT ?; `siguiente` recibe además
+        los valores de `claves` de la última fila entregada. Entre páginas no
+        queda ningún cursor abierto: no se retiene la instantánea de lectura
+        ni se bloquea el checkpoint mientras el consumidor procesa.
+        """
+        query, args = primera, tuple(params)
+        while True:
+            cursor = self._consultar(tipo, query, args + (lote,))
+            cursor.arraysize = lote
+            filas = cursor.fetchmany()
+            cursor.close()
+            yield from filas
+            if len(filas) < lote:
+                return
+            ultima = filas[-1]
+            query, args = siguiente, tuple(params) + tuple(ultima[c] for c in claves)
+
+    def get_estadisticas_cache(self):
+        """Aciertos/fallos de la caché de lecturas (None si está desactivada)."""
+        return self.cache.estadisticas() if self.cache else None
+
+    def get_estadisticas_bloqueo(self):
+        """Reintentos por base bloqueada desde que se abrió este DatabaseManager."""
+        return self.reintentos.estadisticas()
+
+    @contextmanager
+    def transaction(self):
+        conn = self._get_conn()
+        if conn.in_transaction:
+            # Transacción anidada: la confirma o revierte el bloque exterior.
+            yield conn
+            return
+
+        with self._write_lock:
+            # Otro proceso (importador, scripts) puede tener el lock de escritura.
+            self.reintentos.ejecutar(lambda: conn.execute("BEGIN IMMEDIATE"), "BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            try:
+                # Un COMMIT con SQLITE_BUSY deja la transacción abierta: se puede reintentar.
+                self.reintentos.ejecutar(conn.commit, "COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    @contextmanager
+    def adjuntar_archivo(self, nombre, crear=False):
+        """ATTACH del archivo mensual `nombre` como esquema `archivo` (fuera de transacciones)."""
+        ruta = os.path.join(self.archivo_dir, nombre)
+        if crear:
+            os.makedirs(self.archivo_dir, exist_ok=True)
+        elif not os.path.exists(ruta):
+            # ATTACH crearía un archivo vacío en silencio.
+            raise FileNotFoundError(f"Archivo histórico no encontrado: {ruta}")
+
+        conn = self._get_conn()
+        conn.execute(f"ATTACH DATABASE ? AS {ARCHIVO_ALIAS}", (ruta,))
+        try:
+            yield conn
+        finally:
+            conn.execute(f"DETACH DATABASE {ARCHIVO_ALIAS}")
+
+    def start_checkpoints(self, last_activity_probe):
+        if self.profile.journal_mode != "WAL" or self._checkpoints is not None:
+            return
+        self._checkpoints = CheckpointScheduler(self, last_activity_probe, self.profile)
+        self._checkpoints.start()
+
+    def checkpoint(self, modo="PASSIVE"):
+        return self._get_conn().execute(f"PRAGMA wal_checkpoint({modo})").fetchone()
+
+    def close(self):
+        if self._checkpoints is not None:
+            self._checkpoints.stop()
+            self._checkpoints = None
+        if self.metrics:
+            self.metrics.volcar(cache=self.get_estadisticas_cache(), bloqueo=self.get_estadisticas_bloqueo())
+        if self.cache:
+            self.cache.limpiar()
+        self.pool.close_all()
 
     def _ensure_db_exists(self):
-        if not os.path.exists(DB_FILE):
+        if not os.path.exists(self.db_path):
             print("⚠️ Base de datos no encontrada. Inicializando nueva estructura...")
             self._init_schema()
 
     def _init_schema(self):
-        if os.path.exists(SCHEMA_FILE):
-            with open(SCHEMA_FILE, 'r') as f:
+        schema_file = next((f for f in SCHEMA_FILES if os.path.exists(f)), None)
+        if schema_file:
+            with open(schema_file, 'r') as f:
                 script = f.read()
-            conn = self._get_conn()
-            conn.executescript(script)
-            conn.close()
+            self._get_conn().executescript(script)
             print("✅ Estructura de base de datos creada exitosamente.")
         else:
             print("❌ Error: No se encuentra schema.sql")
 
     def _run_pending_migrations(self):
-        conn = self._get_conn()
-        try:
-            self._run_productos_estado_migration(conn)
-            self._run_piezas_codigo_index_migration(conn)
-        finally:
-            conn.close()
-
-    def _run_productos_estado_migration(self, conn):
-        if not self._table_exists(conn, "productos"):
-            return
-
-        if self._column_exists(conn, "productos", "estado"):
-            return
-
-        migration_path = os.path.join(MIGRATIONS_DIR, PRODUCTOS_ESTADO_MIGRATION)
-        if not os.path.exists(migration_path):
-            print(f"❌ Error: No se encuentra migración {migration_path}")
-            return
-
-        with open(migration_path, "r", encoding="utf-8") as f:
-            script = f.read()
-
-        conn.executescript(script)
-        conn.commit()
-        print("✅ Migración aplicada: productos.estado agregado con valor por defecto ACTIVO.")
-
-    def _run_piezas_codigo_index_migration(self, conn):
-        if not self._table_exists(conn, "piezas"):
-            return
-
-        if self._index_exists(conn, "piezas", "idx_piezas_codigo_producto"):
-            return
-
-        migration_path = os.path.join(MIGRATIONS_DIR, PIEZAS_CODIGO_INDEX_MIGRATION)
-        if not os.path.exists(migration_path):
-            print(f"❌ Error: No se encuentra migración {migration_path}")
-            return
-
-        with open(migration_path, "r", encoding="utf-8") as f:
-            script = f.read()
-
-        conn.executescript(script)
-        conn.commit()
-        print("✅ Migración aplicada: índice idx_piezas_codigo_producto creado.")
-
-    def _table_exists(self, conn, table_name):
-        row = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone()
-        return row is not None
-
-    def _column_exists(self, conn, table_name, column_name):
-        rows = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
-        return any(row[1] == column_name for row in rows)
-
-    def _index_exists(self, conn, table_name, index_name):
-        rows = conn.execute(f"PRAGMA index_list('{table_name}')").fetchall()
-        return any(row[1] == index_name for row in rows)
+        runner = MigrationRunner(self._get_conn(), MIGRATIONS_DIR)
+        for r in runner.run():
+            print(f"✅ Migración aplicada: {r['version']:03d}_{r['nombre']} ({r['duracion_ms']:.0f} ms)")
 
     # --- 1. PRODUCTOS ---
     def get_producto(self, codigo):
-        conn = self._get_conn()
-        row = conn.execute("SELECT * FROM productos WHERE codigo=?", (codigo.strip(),)).fetchone()
-        conn.close()
-        return dict(row) if row else None
+        return self._consultar(Producto, "SELECT * FROM productos WHERE codigo=?", (codigo.strip(),)).fetchone()
 
     def get_all_productos(self):
-        conn = self._get_conn()
-        rows = conn.execute("SELECT * FROM productos ORDER BY codigo ASC").fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return self._consultar(Producto, "SELECT * FROM productos ORDER BY codigo ASC").fetchall()
 
     def upsert_producto(self, codigo, nombre, especie):
-        conn = self._get_conn()
-        conn.execute("""
-            INSERT INTO productos (codigo, nombre, especie) VALUES (?, ?, ?)
-            ON CONFLICT(codigo) DO UPDATE SET nombre=excluded.nombre, especie=excluded.especie
-        """, (codigo.strip(), nombre.strip(), especie.strip()))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("""
+                INSERT INTO productos (codigo, nombre, especie) VALUES (?, ?, ?)
+                ON CONFLICT(codigo) DO UPDATE SET nombre=excluded.nombre, especie=excluded.especie
+            """, (codigo.strip(), nombre.strip(), especie.strip()))
 
     def delete_producto(self, codigo):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM productos WHERE codigo=?", (codigo.strip(),))
-        affected = cursor.rowcount
-        conn.commit()
-        conn.close()
-        return affected > 0
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM productos WHERE codigo=?", (codigo.strip(),))
+        return cursor.rowcount > 0
 
     # --- 2. CANALES ---
     def get_canales_activos(self):
-        conn = self._get_conn()
-        rows = conn.execute("SELECT * FROM canales WHERE estado='ACTIVO' ORDER BY id DESC").fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return self._consultar(Canal, "SELECT * FROM canales WHERE estado='ACTIVO' ORDER BY id DESC").fetchall()
 
     def get_all_canales(self, incluir_cerrados=False):
-        conn = self._get_conn()
         if incluir_cerrados:
             query = "SELECT * FROM canales ORDER BY id DESC"
         else:
             query = "SELECT * FROM canales WHERE estado='ACTIVO' ORDER BY id DESC"
-        rows = conn.execute(query).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return self._consultar(Canal, query).fetchall()
+
+    def iter_canales(self, incluir_cerrados=False, lote=ITER_LOTE):
+        """Como get_all_canales, pero en páginas de `lote` filas."""
+        if incluir_cerrados:
+            primera = "SELECT * FROM canales ORDER BY id DESC LIMIT ?"
+            siguiente = "SELECT * FROM canales WHERE id < ? ORDER BY id DESC LIMIT ?"
+        else:
+            primera = "SELECT * FROM canales WHERE estado='ACTIVO' ORDER BY id DESC LIMIT ?"
+            siguiente = "SELECT * FROM canales WHERE estado='ACTIVO' AND id < ? ORDER BY id DESC LIMIT ?"
+        return self._paginar(Canal, primera, siguiente, (), ("id",), lote)
+
+    def get_canales_pagina(self, antes_de=None, lote=ITER_LOTE):
+        """Hasta `lote` canales (todos los estados) con id < `antes_de`, del más reciente al más antiguo."""
+        if antes_de is None:
+            return self._consultar(Canal, "SELECT * FROM canales ORDER BY id DESC LIMIT ?", (lote,)).fetchall()
+        return self._consultar(
+            Canal, "SELECT * FROM canales WHERE id < ? ORDER BY id DESC LIMIT ?", (antes_de, lote)
+        ).fetchall()
 
     def get_canal_by_id(self, canal_id):
-        conn = self._get_conn()
-        row = conn.execute("SELECT * FROM canales WHERE id=?", (canal_id,)).fetchone()
-        conn.close()
-        return dict(row) if row else None
+        row = self._consultar(Canal, "SELECT * FROM canales WHERE id=?", (canal_id,)).fetchone()
+        if row:
+            return row
+        rows = self._leer_archivo(Canal, self._archivos_de_canal(canal_id), "SELECT * FROM archivo.canales WHERE id=?", (canal_id,))
+        return rows[0] if rows else None
 
     def buscar_o_crear_canal(self, siniiga_parcial):
-        conn = self._get_conn()
-        cursor = conn.cursor()
         siniiga_full = siniiga_parcial.strip()
         if "-" not in siniiga_full:
             if len(siniiga_full) <= 8 and not siniiga_full.startswith("08"):
                 siniiga_full = "08" + siniiga_full.zfill(8)
 
-        cursor.execute("SELECT * FROM canales WHERE siniiga = ? AND estado='ACTIVO'", (siniiga_full,))
-        existe = cursor.fetchone()
+        conn = self._get_conn()
+        existe = self._consultar(Canal, "SELECT * FROM canales WHERE siniiga = ? AND estado='ACTIVO'", (siniiga_full,), conn).fetchone()
         if existe:
-            conn.close()
-            return dict(existe)
-        
+            return existe
+
         lote_hoy = datetime.now().strftime("%d%m%y")
         try:
-            cursor.execute("INSERT INTO canales (siniiga, lote_dia) VALUES (?, ?)", (siniiga_full, lote_hoy))
-            conn.commit()
-            cursor.execute("SELECT * FROM canales WHERE id=?", (cursor.lastrowid,))
-            nuevo = cursor.fetchone()
-            conn.close()
-            return dict(nuevo)
+            with self.transaction() as conn:
+                cursor = conn.execute("INSERT INTO canales (siniiga, lote_dia) VALUES (?, ?)", (siniiga_full, lote_hoy))
+                nuevo = self._consultar(Canal, "SELECT * FROM canales WHERE id=?", (cursor.lastrowid,), conn).fetchone()
+            return nuevo
         except sqlite3.IntegrityError:
-            conn.rollback()
-            cursor.execute("SELECT * FROM canales WHERE siniiga=?", (siniiga_full,))
-            recuperado = cursor.fetchone()
-            conn.close()
-            return dict(recuperado) if recuperado else None
+            return self._consultar(Canal, "SELECT * FROM canales WHERE siniiga=?", (siniiga_full,), conn).fetchone()
 
     def cerrar_canal(self, canal_id):
-        conn = self._get_conn()
-        conn.execute("UPDATE canales SET estado='CERRADO' WHERE id=?", (canal_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("UPDATE canales SET estado='CERRADO' WHERE id=?", (canal_id,))
 
     def reabrir_canal(self, canal_id):
-        conn = self._get_conn()
-        conn.execute("UPDATE canales SET estado='ACTIVO' WHERE id=?", (canal_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("UPDATE canales SET estado='ACTIVO' WHERE id=?", (canal_id,))
 
     def get_resumen_canal(self, canal_id):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                COUNT(DISTINCT c.id) as total_cajas,
-                COALESCE(SUM(p.peso), 0) as peso_total
-            FROM cajas c
-            LEFT JOIN piezas p ON p.caja_id = c.id
-            WHERE c.canal_id = ?
-        """, (canal_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return {'total_cajas': row[0] or 0, 'peso_total': row[1] or 0.0}
+        row = self._get_conn().execute(
+            "SELECT * FROM resumen_canales WHERE canal_id=?", (canal_id,)
+        ).fetchone()
+        if row:
+            return dict(row)
+
+        archivado = self._get_conn().execute(
+            "SELECT * FROM archivo_canales WHERE canal_id=?", (canal_id,)
+        ).fetchone()
+        if archivado:
+            return dict(
+                RESUMEN_CANAL_VACIO,
+                canal_id=canal_id,
+                total_cajas=archivado['total_cajas'],
+                cajas_cerradas=archivado['total_cajas'],
+                peso_total=archivado['peso_total'],
+                num_piezas=archivado['num_piezas'],
+                ultima_actividad=archivado['ultima_actividad'],
+            )
+        return dict(RESUMEN_CANAL_VACIO, canal_id=canal_id)
 
     # --- 3. CAJAS ---
     def get_max_numero_caja(self, canal_id):
-        conn = self._get_conn()
-        row = conn.execute("SELECT MAX(numero_caja) FROM cajas WHERE canal_id=?", (canal_id,)).fetchone()
-        conn.close()
+        row = self._get_conn().execute("SELECT MAX(numero_caja) FROM cajas WHERE canal_id=?", (canal_id,)).fetchone()
         return row[0] if row and row[0] else 0
 
     def get_cajas_abiertas(self, canal_id):
-        conn = self._get_conn()
         query = """
-        SELECT c.*, COALESCE(SUM(p.peso), 0) as peso_acumulado
-        FROM cajas c
-        LEFT JOIN piezas p ON p.caja_id = c.id
-        WHERE c.canal_id = ? AND c.estado = 'ABIERTA'
-        GROUP BY c.id ORDER BY c.numero_caja ASC
+        SELECT * FROM cajas
+        WHERE canal_id = ? AND estado = 'ABIERTA'
+        ORDER BY numero_caja ASC
         """
-        rows = conn.execute(query, (canal_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        return self._consultar(Caja, query, (canal_id,)).fetchall()
 
     def get_all_cajas_canal(self, canal_id, incluir_cerradas=True):
-        conn = self._get_conn()
-        st_filter = "" if incluir_cerradas else "AND c.estado='ABIERTA'"
+        st_filter = "" if incluir_cerradas else "AND estado='ABIERTA'"
         query = f"""
-        SELECT c.*, COUNT(p.id) as num_piezas, COALESCE(SUM(p.peso), 0) as peso_acumulado
-        FROM cajas c
-        LEFT JOIN piezas p ON p.caja_id = c.id
-        WHERE c.canal_id = ? {st_filter}
-        GROUP BY c.id ORDER BY c.numero_caja ASC
+        SELECT * FROM cajas
+        WHERE canal_id = ? {st_filter}
+        ORDER BY numero_caja ASC
         """
-        rows = conn.execute(query, (canal_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        rows = self._consultar(Caja, query, (canal_id,)).fetchall()
+        if rows:
+            return rows
+        return self._leer_archivo(
+            Caja,
+            self._archivos_de_canal(canal_id),
+            "SELECT * FROM archivo.cajas WHERE canal_id=? ORDER BY numero_caja ASC",
+            (canal_id,),
+        )
+
+    def iter_cajas(self, canal_id, incluir_cerradas=True, lote=ITER_LOTE):
+        """Como get_all_cajas_canal (solo base caliente), en páginas de `lote` filas."""
+        st_filter = "" if incluir_cerradas else "AND estado='ABIERTA'"
+        # UNIQUE(canal_id, numero_caja) sirve de índice para el keyset.
+        return self._paginar(
+            Caja,
+            f"SELECT * FROM cajas WHERE canal_id = ? {st_filter} ORDER BY numero_caja ASC LIMIT ?",
+            f"SELECT * FROM cajas WHERE canal_id = ? {st_filter} AND numero_caja > ? ORDER BY numero_caja ASC LIMIT ?",
+            (canal_id,), ("numero_caja",), lote,
+        )
 
     def get_caja_by_id(self, caja_id):
-        conn = self._get_conn()
-        query = """
-        SELECT c.*, COALESCE(SUM(p.peso), 0) as peso_acumulado, COUNT(p.id) as num_piezas
-        FROM cajas c
-        LEFT JOIN piezas p ON p.caja_id = c.id
-        WHERE c.id = ? GROUP BY c.id
-        """
-        row = conn.execute(query, (caja_id,)).fetchone()
-        conn.close()
-        return dict(row) if row else None
+        row = self._consultar(Caja, "SELECT * FROM cajas WHERE id=?", (caja_id,)).fetchone()
+        if row:
+            return row
+        rows = self._leer_archivo(Caja, self._archivos_con_id('caja', caja_id), "SELECT * FROM archivo.cajas WHERE id=?", (caja_id,))
+        return rows[0] if rows else None
 
     def crear_o_recuperar_caja(self, canal_id, numero_caja):
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM cajas WHERE canal_id=? AND numero_caja=? AND estado='ABIERTA'", (canal_id, numero_caja))
-        existe = cursor.fetchone()
-        if existe:
-            conn.close()
-            return existe['id']
-        cursor.execute("INSERT INTO cajas (canal_id, numero_caja) VALUES (?, ?)", (canal_id, numero_caja))
-        conn.commit()
-        new_id = cursor.lastrowid
-        conn.close()
-        return new_id
+        with self.transaction() as conn:
+            existe = conn.execute("SELECT id FROM cajas WHERE canal_id=? AND numero_caja=? AND estado='ABIERTA'", (canal_id, numero_caja)).fetchone()
+            if existe:
+                return existe['id']
+            cursor = conn.execute("INSERT INTO cajas (canal_id, numero_caja) VALUES (?, ?)", (canal_id, numero_caja))
+            return cursor.lastrowid
 
     def cerrar_caja(self, caja_id):
-        conn = self._get_conn()
-        conn.execute("UPDATE cajas SET estado='CERRADA', fecha_cierre=CURRENT_TIMESTAMP WHERE id=?", (caja_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            self.cerrar_caja_conn(conn, caja_id)
 
     def cerrar_caja_conn(self, conn, caja_id):
         conn.execute(
@@ -277,157 +388,402 @@ class DatabaseManager:
         )
 
     def reabrir_caja(self, caja_id):
-        conn = self._get_conn()
-        conn.execute("UPDATE cajas SET estado='ABIERTA', fecha_cierre=NULL WHERE id=?", (caja_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("UPDATE cajas SET estado='ABIERTA', fecha_cierre=NULL WHERE id=?", (caja_id,))
 
     def eliminar_caja(self, caja_id):
-        conn = self._get_conn()
-        conn.execute("DELETE FROM piezas WHERE caja_id=?", (caja_id,))
-        conn.execute("DELETE FROM cajas WHERE id=?", (caja_id,))
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM piezas WHERE caja_id=?", (caja_id,))
+            conn.execute("DELETE FROM cajas WHERE id=?", (caja_id,))
 
     # --- 4. PIEZAS ---
     def registrar_pieza(self, caja_id, codigo, nombre, peso):
-        conn = self._get_conn()
         try:
-            conn.execute("BEGIN IMMEDIATE")
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT estado FROM cajas WHERE id=?", (caja_id,))
-            row = cursor.fetchone()
-
-            if not row:
-                raise ValueError("Caja no existe")
-
-            if row["estado"] != "ABIERTA":
-                raise ValueError("No se puede registrar pieza en caja cerrada")
-
-            if peso <= 0:
-                raise ValueError("Peso inválido")
-
-            cursor.execute("SELECT MAX(consecutivo) FROM piezas WHERE caja_id=?", (caja_id,))
-            res = cursor.fetchone()[0]
-            sig = (res + 1) if res else 1
-            cursor.execute("""
-                INSERT INTO piezas (caja_id, codigo_producto, nombre_producto, peso, consecutivo)
-                VALUES (?, ?, ?, ?, ?)
-            """, (caja_id, codigo, nombre, peso, sig))
-            new_id = cursor.lastrowid
-            conn.commit()
-            return sig, new_id
+            with self.transaction() as conn:
+                row = conn.execute("SELECT estado, next_consecutivo FROM cajas WHERE id=?", (caja_id,)).fetchone()
+
+                if not row:
+                    raise ValueError("Caja no existe")
+
+                if row["estado"] != "ABIERTA":
+                    raise ValueError("No se puede registrar pieza en caja cerrada")
+
+                if peso <= 0:
+                    raise ValueError("Peso inválido")
+
+                # trg_piezas_contadores_ai avanza next_consecutivo en el mismo INSERT
+                sig = row["next_consecutivo"]
+                cursor = conn.execute("""
+                    INSERT INTO piezas (caja_id, codigo_producto, nombre_producto, peso, consecutivo)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (caja_id, codigo, nombre, peso, sig))
+                return sig, cursor.lastrowid
         except sqlite3.IntegrityError as e:
-            conn.rollback()
             if "UNIQUE constraint failed: piezas.caja_id, piezas.consecutivo" in str(e):
                 raise ValueError("Conflicto de consecutivo en la caja") from e
             raise ValueError("Error de integridad al registrar pieza") from e
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+
+    def registrar_pieza_etiqueta(self, caja_id, codigo, peso):
+        """Valida, inserta y devuelve {pieza, caja, producto, estadisticas} en una sola transacción."""
+        if peso <= 0:
+            raise ValueError("Peso inválido")
+
+        try:
+            with self.transaction() as conn:
+                caja = conn.execute("SELECT estado, next_consecutivo FROM cajas WHERE id=?", (caja_id,)).fetchone()
+                if not caja:
+                    raise ValueError("Caja no existe")
+
+                if caja["estado"] != "ABIERTA":
+                    raise ValueError("No se puede registrar pieza en caja cerrada")
+
+                producto = self._consultar(
+                    Producto, "SELECT * FROM productos WHERE codigo=? AND estado='ACTIVO'", (codigo,), conn
+                ).fetchone()
+                if not producto:
+                    raise ValueError("Producto inexistente o INACTIVO")
+
+                pieza = self._consultar(Pieza, """
+                    INSERT INTO piezas (caja_id, codigo_producto, nombre_producto, peso, consecutivo)
+                    VALUES (?, ?, ?, ?, ?)
+                    RETURNING *, time(fecha_registro, 'localtime') as hora
+                """, (caja_id, producto["codigo"], producto["nombre"], peso, caja["next_consecutivo"]), conn).fetchone()
+
+                # Contadores ya actualizados por los triggers dentro de esta transacción
+                caja = self._consultar(Caja, "SELECT * FROM cajas WHERE id=?", (caja_id,), conn).fetchone()
+                return {
+                    'pieza': pieza,
+                    'caja': caja,
+                    'producto': producto,
+                    'estadisticas': self._estadisticas_hoy(conn),
+                }
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE constraint failed: piezas.caja_id, piezas.consecutivo" in str(e):
+                raise ValueError("Conflicto de consecutivo en la caja") from e
+            raise ValueError("Error de integridad al registrar pieza") from e
+
+    def registrar_piezas_bulk(self, caja_id, piezas):
+        """Registra [(codigo, nombre, peso), ...] en una sola transacción; devuelve los ids en orden."""
+        if not piezas:
+            return []
+
+        if any(peso <= 0 for _, _, peso in piezas):
+            raise ValueError("Peso inválido")
+
+        try:
+            with self.transaction() as conn:
+                row = conn.execute("SELECT estado, next_consecutivo FROM cajas WHERE id=?", (caja_id,)).fetchone()
+                if not row:
+                    raise ValueError("Caja no existe")
+
+                if row["estado"] != "ABIERTA":
+                    raise ValueError("No se puede registrar pieza en caja cerrada")
+
+                primero = row["next_consecutivo"]
+                conn.executemany("""
+                    INSERT INTO piezas (caja_id, codigo_producto, nombre_producto, peso, consecutivo)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (caja_id, codigo, nombre, peso, primero + i)
+                    for i, (codigo, nombre, peso) in enumerate(piezas)
+                ])
+                rows = conn.execute(
+                    "SELECT id FROM piezas WHERE caja_id=? AND consecutivo >= ? ORDER BY consecutivo ASC",
+                    (caja_id, primero),
+                ).fetchall()
+                return [r["id"] for r in rows]
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE constraint failed: piezas.caja_id, piezas.consecutivo" in str(e):
+                raise ValueError("Conflicto de consecutivo en la caja") from e
+            raise ValueError("Error de integridad al registrar piezas") from e
 
     def get_contenido_caja(self, caja_id):
         conn = self._get_conn()
-        rows = conn.execute("SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE caja_id=? ORDER BY id DESC", (caja_id,)).fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        rows = self._consultar(
+            Pieza, "SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE caja_id=? ORDER BY id DESC", (caja_id,), conn
+        ).fetchall()
+        if rows or conn.execute("SELECT 1 FROM cajas WHERE id=?", (caja_id,)).fetchone():
+            return rows
+        return self._leer_archivo(
+            Pieza,
+            self._archivos_con_id('caja', caja_id),
+            "SELECT *, time(fecha_registro, 'localtime') as hora FROM archivo.piezas WHERE caja_id=? ORDER BY id DESC",
+            (caja_id,),
+        )
+
+    def iter_piezas(self, caja_id, lote=ITER_LOTE):
+        """Como get_contenido_caja (solo base caliente), en páginas de `lote` filas."""
+        return self._paginar(
+            Pieza,
+            "SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE caja_id=? ORDER BY id DESC LIMIT ?",
+            "SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE caja_id=? AND id < ? ORDER BY id DESC LIMIT ?",
+            (caja_id,), ("id",), lote,
+        )
+
+    def get_piezas_by_ids(self, pieza_ids):
+        """{id: pieza} con la columna hora, para aplicar deltas a la tabla de la caja."""
+        ids = list(pieza_ids)
+        if not ids:
+            return {}
+        marcas = ",".join("?" * len(ids))
+        rows = self._consultar(
+            Pieza, f"SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE id IN ({marcas})", ids
+        ).fetchall()
+        return {r['id']: r for r in rows}
 
     def get_pieza_by_id(self, pieza_id):
-        conn = self._get_conn()
-        row = conn.execute("SELECT * FROM piezas WHERE id=?", (pieza_id,)).fetchone()
-        conn.close()
-        return dict(row) if row else None
+        row = self._consultar(Pieza, "SELECT * FROM piezas WHERE id=?", (pieza_id,)).fetchone()
+        if row:
+            return row
+        rows = self._leer_archivo(Pieza, self._archivos_con_id('pieza', pieza_id), "SELECT * FROM archivo.piezas WHERE id=?", (pieza_id,))
+        return rows[0] if rows else None
 
     def editar_pieza(self, pieza_id, nuevo_peso):
-        conn = self._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT caja_id, peso FROM piezas WHERE id=?", (pieza_id,))
-            pieza = cursor.fetchone()
+        with self.transaction() as conn:
+            pieza = conn.execute("SELECT 1 FROM piezas WHERE id=?", (pieza_id,)).fetchone()
             if not pieza:
                 raise ValueError("Pieza no existe")
 
-            caja_id = pieza['caja_id']
-            cursor.execute("UPDATE piezas SET peso=? WHERE id=?", (nuevo_peso, pieza_id))
-
-            cursor.execute(
-                "SELECT COALESCE(SUM(peso), 0) as peso_total, COUNT(*) as total_piezas FROM piezas WHERE caja_id=?",
-                (caja_id,)
-            )
-            resumen = cursor.fetchone()
-            peso_total = float(resumen['peso_total']) if resumen else 0.0
-            total_piezas = int(resumen['total_piezas']) if resumen else 0
-
-            caja_cols = {r['name'] for r in conn.execute("PRAGMA table_info(cajas)").fetchall()}
-            if 'peso_acumulado' in caja_cols and 'num_piezas' in caja_cols:
-                cursor.execute(
-                    "UPDATE cajas SET peso_acumulado=?, num_piezas=? WHERE id=?",
-                    (peso_total, total_piezas, caja_id)
-                )
-            elif 'peso_acumulado' in caja_cols:
-                cursor.execute("UPDATE cajas SET peso_acumulado=? WHERE id=?", (peso_total, caja_id))
-            elif 'num_piezas' in caja_cols:
-                cursor.execute("UPDATE cajas SET num_piezas=? WHERE id=?", (total_piezas, caja_id))
-
-            conn.commit()
-            return True
-        except:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+            # trg_piezas_contadores_au mantiene cajas.peso_acumulado
+            conn.execute("UPDATE piezas SET peso=? WHERE id=?", (nuevo_peso, pieza_id))
+        return True
 
     def borrar_pieza(self, pieza_id):
-        conn = self._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT caja_id FROM piezas WHERE id=?", (pieza_id,))
-            pieza = cursor.fetchone()
+        with self.transaction() as conn:
+            pieza = conn.execute("SELECT 1 FROM piezas WHERE id=?", (pieza_id,)).fetchone()
             if not pieza:
                 raise ValueError("Pieza no existe")
 
-            caja_id = pieza['caja_id']
-            cursor.execute("DELETE FROM piezas WHERE id=?", (pieza_id,))
-
-            cursor.execute(
-                "SELECT COALESCE(SUM(peso), 0) as peso_total, COUNT(*) as total_piezas FROM piezas WHERE caja_id=?",
-                (caja_id,)
-            )
-            resumen = cursor.fetchone()
-            peso_total = float(resumen['peso_total']) if resumen else 0.0
-            total_piezas = int(resumen['total_piezas']) if resumen else 0
-
-            caja_cols = {r['name'] for r in conn.execute("PRAGMA table_info(cajas)").fetchall()}
-            if 'peso_acumulado' in caja_cols and 'num_piezas' in caja_cols:
-                cursor.execute(
-                    "UPDATE cajas SET peso_acumulado=?, num_piezas=? WHERE id=?",
-                    (peso_total, total_piezas, caja_id)
-                )
-            elif 'peso_acumulado' in caja_cols:
-                cursor.execute("UPDATE cajas SET peso_acumulado=? WHERE id=?", (peso_total, caja_id))
-            elif 'num_piezas' in caja_cols:
-                cursor.execute("UPDATE cajas SET num_piezas=? WHERE id=?", (total_piezas, caja_id))
-
-            conn.commit()
-            return True
-        except:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+            # trg_piezas_contadores_ad mantiene cajas.peso_acumulado/num_piezas
+            conn.execute("DELETE FROM piezas WHERE id=?", (pieza_id,))
+        return True
 
     def get_estadisticas_generales(self):
-        conn = self._get_conn()
+        return self._estadisticas_hoy(self._get_conn())
+
+    def _estadisticas_hoy(self, conn):
+        # Acumulado diario: lectura por clave (dia, *) sin tocar el histórico de piezas.
         row_hoy = conn.execute("""
-            SELECT COUNT(*), COALESCE(SUM(p.peso), 0) 
-            FROM piezas p WHERE date(p.fecha_registro) = date('now', 'localtime')
-        """).fetchone()
-        conn.close()
+            SELECT COALESCE(SUM(piezas), 0), COALESCE(SUM(peso), 0)
+            FROM produccion_diaria WHERE dia = ?
+        """, (datetime.now().strftime("%Y-%m-%d"),)).fetchone()
         return {'piezas_hoy': row_hoy[0], 'peso_hoy': row_hoy[1]}
+
+    def get_produccion_por_producto(self, fecha=None):
+        dia = (fecha or datetime.now().date()).strftime("%Y-%m-%d")
+        rows = self._get_conn().execute("""
+            SELECT codigo_producto, piezas, peso FROM produccion_diaria
+            WHERE dia = ? AND piezas > 0 ORDER BY codigo_producto ASC
+        """, (dia,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_estadisticas_dia(self, fecha=None):
+        """Totales de un día local calculados sobre piezas con el índice de fecha_registro."""
+        fecha = fecha or datetime.now().date()
+        inicio, fin = rango_utc_dia_local(fecha)
+        conn = self._get_conn()
+        row = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(peso), 0)
+            FROM piezas WHERE fecha_registro >= ? AND fecha_registro < ?
+        """, (inicio, fin)).fetchone()
+        archivado = conn.execute("""
+            SELECT COALESCE(SUM(piezas), 0), COALESCE(SUM(peso), 0)
+            FROM produccion_diaria_archivada WHERE dia = ?
+        """, (fecha.strftime("%Y-%m-%d"),)).fetchone()
+        return {'piezas': row[0] + archivado[0], 'peso': row[1] + archivado[1]}
+
+    # --- 5. ARCHIVO HISTÓRICO ---
+    def get_canales_archivados(self):
+        rows = self._get_conn().execute("SELECT * FROM archivo_canales ORDER BY canal_id DESC").fetchall()
+        return [dict(r) for r in rows]
+
+    def get_historial_archivado(self):
+        """[(canal, cajas), ...] de todos los canales archivados; un ATTACH por archivo mensual."""
+        historial = []
+        por_archivo = {}
+        for c in self.get_canales_archivados():
+            por_archivo.setdefault(c['archivo'], []).append(c['canal_id'])
+
+        for nombre, ids in por_archivo.items():
+            try:
+                with self.adjuntar_archivo(nombre) as conn:
+                    for canal_id in ids:
+                        canal = self._consultar(
+                            Canal, "SELECT * FROM archivo.canales WHERE id=?", (canal_id,), conn, archivo=nombre
+                        ).fetchone()
+                        if not canal:
+                            continue
+                        cajas = self._consultar(
+                            Caja, "SELECT * FROM archivo.cajas WHERE canal_id=? ORDER BY numero_caja ASC",
+                            (canal_id,), conn, archivo=nombre,
+                        ).fetchall()
+                        historial.append((canal, cajas))
+            except FileNotFoundError as e:
+                print(f"⚠️ {e}")
+        historial.sort(key=lambda item: item[0]['id'], reverse=True)
+        return historial
+
+    def _archivos_de_canal(self, canal_id):
+        rows = self._get_conn().execute("SELECT archivo FROM archivo_canales WHERE canal_id=?", (canal_id,)).fetchall()
+        return [r['archivo'] for r in rows]
+
+    def _archivos_con_id(self, entidad, valor):
+        # entidad: 'caja' o 'pieza' (columnas {entidad}_id_min/_max de archivo_canales)
+        rows = self._get_conn().execute(f"""
+            SELECT archivo FROM archivo_canales
+            WHERE {entidad}_id_min <= ? AND {entidad}_id_max >= ?
+        """, (valor, valor)).fetchall()
+        # Sin DISTINCT en SQL: evita un B-tree temporal; son pocas filas.
+        return list(dict.fromkeys(r['archivo'] for r in rows))
+
+    def _leer_archivo(self, tipo, archivos, query, params=()):
+        """Ejecuta `query` (sobre el esquema archivo) en cada archivo hasta encontrar filas."""
+        for nombre in archivos:
+            try:
+                with self.adjuntar_archivo(nombre) as conn:
+                    rows = self._consultar(tipo, query, params, conn, archivo=nombre).fetchall()
+            except FileNotFoundError as e:
+                print(f"⚠️ {e}")
+                continue
+            if rows:
+                return rows
+        return []
+
+    # --- 6. BITÁCORA DE CAMBIOS ---
+    def get_cursor_cambios(self):
+        row = self._get_conn().execute("SELECT MAX(id) FROM cambios").fetchone()
+        return row[0] or 0
+
+    def get_cambios_desde(self, cursor, limite=CAMBIOS_LOTE):
+        """Cambios con id > cursor: {'cursor', 'recargar', 'cambios'}.
+
+        recargar=True si hay más de `limite` pendientes o si la poda ya borró
+        cambios posteriores al cursor: el consumidor debe recargar completo.
+        """
+        conn = self._get_conn()
+        rows = conn.execute(
+            "SELECT * FROM cambios WHERE id > ? ORDER BY id ASC LIMIT ?", (cursor, limite + 1)
+        ).fetchall()
+        if not rows:
+            return {'cursor': cursor, 'recargar': False, 'cambios': []}
+
+        podados = rows[0]['id'] > cursor + 1 and conn.execute(
+            "SELECT 1 FROM cambios WHERE id <= ? LIMIT 1", (cursor,)
+        ).fetchone() is None
+        if len(rows) > limite or podados:
+            return {'cursor': self.get_cursor_cambios(), 'recargar': True, 'cambios': []}
+        return {'cursor': rows[-1]['id'], 'recargar': False, 'cambios': [dict(r) for r in rows]}
+
+    def podar_cambios(self, dias=CAMBIOS_RETENCION_DIAS):
+        with self.transaction() as conn:
+            return conn.execute(
+                "DELETE FROM cambios WHERE fecha < datetime('now', ?)", (f"-{int(dias)} days",)
+            ).rowcount
+
+    # --- 7. VERIFICACIÓN DE CONTADORES ---
+    def verificar_contadores_cajas(self, reparar=False):
+        """Compara peso_acumulado/num_piezas/next_consecutivo contra piezas; devuelve las cajas descuadradas."""
+        query = """
+        SELECT c.id, c.peso_acumulado, c.num_piezas, c.next_consecutivo,
+               COALESCE(SUM(p.peso), 0) as peso_real, COUNT(p.id) as piezas_reales,
+               COALESCE(MAX(p.consecutivo), 0) + 1 as next_real
+        FROM cajas c
+        LEFT JOIN piezas p ON p.caja_id = c.id
+        GROUP BY c.id
+        HAVING c.num_piezas != COUNT(p.id)
+            OR c.next_consecutivo != COALESCE(MAX(p.consecutivo), 0) + 1
+            OR ABS(c.peso_acumulado - COALESCE(SUM(p.peso), 0)) > ?
+        """
+        descuadres = [dict(r) for r in self._get_conn().execute(query, (TOLERANCIA_CONTADORES,)).fetchall()]
+        if reparar and descuadres:
+            with self.transaction() as conn:
+                conn.executemany(
+                    "UPDATE cajas SET peso_acumulado=?, num_piezas=?, next_consecutivo=? WHERE id=?",
+                    [(d['peso_real'], d['piezas_reales'], d['next_real'], d['id']) for d in descuadres],
+                )
+        return descuadres
+
+    def verificar_resumen_canales(self, reparar=False):
+        """Compara resumen_canales contra cajas; devuelve los canales descuadrados."""
+        query = """
+        SELECT cn.id as canal_id,
+               r.total_cajas, r.cajas_abiertas, r.cajas_cerradas, r.peso_total, r.num_piezas,
+               COUNT(c.id) as cajas_reales,
+               COALESCE(SUM(c.estado = 'ABIERTA'), 0) as abiertas_reales,
+               COALESCE(SUM(c.estado = 'CERRADA'), 0) as cerradas_reales,
+               COALESCE(SUM(c.peso_acumulado), 0) as peso_real,
+               COALESCE(SUM(c.num_piezas), 0) as piezas_reales
+        FROM canales cn
+        LEFT JOIN resumen_canales r ON r.canal_id = cn.id
+        LEFT JOIN cajas c ON c.canal_id = cn.id
+        GROUP BY cn.id
+        HAVING r.canal_id IS NULL
+            OR r.total_cajas != COUNT(c.id)
+            OR r.cajas_abiertas != COALESCE(SUM(c.estado = 'ABIERTA'), 0)
+            OR r.cajas_cerradas != COALESCE(SUM(c.estado = 'CERRADA'), 0)
+            OR r.num_piezas != COALESCE(SUM(c.num_piezas), 0)
+            OR ABS(r.peso_total - COALESCE(SUM(c.peso_acumulado), 0)) > ?
+        """
+        descuadres = [dict(r) for r in self._get_conn().execute(query, (TOLERANCIA_CONTADORES,)).fetchall()]
+        if reparar and descuadres:
+            with self.transaction() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO resumen_canales
+                        (canal_id, total_cajas, cajas_abiertas, cajas_cerradas, peso_total, num_piezas, ultima_actividad)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(canal_id) DO UPDATE SET
+                        total_cajas=excluded.total_cajas,
+                        cajas_abiertas=excluded.cajas_abiertas,
+                        cajas_cerradas=excluded.cajas_cerradas,
+                        peso_total=excluded.peso_total,
+                        num_piezas=excluded.num_piezas
+                    """,
+                    [
+                        (d['canal_id'], d['cajas_reales'], d['abiertas_reales'], d['cerradas_reales'],
+                         d['peso_real'], d['piezas_reales'])
+                        for d in descuadres
+                    ],
+                )
+        return descuadres
+
+    def verificar_produccion_diaria(self, reparar=False):
+        """Compara produccion_diaria contra piezas (más lo archivado); devuelve los (dia, producto) descuadrados."""
+        query = """
+        WITH real AS (
+            SELECT dia, codigo_producto, SUM(piezas) as piezas_reales, SUM(peso) as peso_real
+            FROM (
+                SELECT date(fecha_registro, 'localtime') as dia, codigo_producto, 1 as piezas, peso
+                FROM piezas
+                UNION ALL
+                SELECT dia, codigo_producto, piezas, peso FROM produccion_diaria_archivada
+            )
+            GROUP BY 1, 2
+        ),
+        claves AS (
+            SELECT dia, codigo_producto FROM real
+            UNION
+            SELECT dia, codigo_producto FROM produccion_diaria WHERE piezas != 0 OR peso != 0
+        )
+        SELECT k.dia, k.codigo_producto,
+               COALESCE(d.piezas, 0) as piezas, COALESCE(d.peso, 0) as peso,
+               COALESCE(r.piezas_reales, 0) as piezas_reales, COALESCE(r.peso_real, 0) as peso_real
+        FROM claves k
+        LEFT JOIN produccion_diaria d ON d.dia = k.dia AND d.codigo_producto = k.codigo_producto
+        LEFT JOIN real r ON r.dia = k.dia AND r.codigo_producto = k.codigo_producto
+        WHERE COALESCE(d.piezas, 0) != COALESCE(r.piezas_reales, 0)
+           OR ABS(COALESCE(d.peso, 0) - COALESCE(r.peso_real, 0)) > ?
+        """
+        descuadres = [dict(r) for r in self._get_conn().execute(query, (TOLERANCIA_CONTADORES,)).fetchall()]
+        if reparar and descuadres:
+            with self.transaction() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO produccion_diaria (dia, codigo_producto, piezas, peso) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(dia, codigo_producto) DO UPDATE SET
+                        piezas=excluded.piezas,
+                        peso=excluded.peso
+                    """,
+                    [(d['dia'], d['codigo_producto'], d['piezas_reales'], d['peso_real']) for d in descuadres],
+                )
+        return descuadres
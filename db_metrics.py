@@ -0,0 +1,179 @@
+# db_metrics.py
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+ENV_TRACE = "CCC_SQL_TRACE"
+MAX_MUESTRAS = 5000
+SENTENCIAS_CON_PLAN = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+class MetricsConfig:
+    """Instrumentación SQL opcional (sección [METRICAS] o variable CCC_SQL_TRACE=1)."""
+
+    def __init__(self, activo=False, umbral_lento_ms=50.0, archivo="metricas_sql.jsonl"):
+        self.activo = bool(activo)
+        self.umbral_lento_ms = float(umbral_lento_ms)
+        self.archivo = archivo
+
+    @classmethod
+    def from_config(cls, config):
+        base = cls()
+        if config is not None and config.has_section("METRICAS"):
+            sec = config["METRICAS"]
+            base = cls(
+                activo=sec.getboolean("ACTIVO", base.activo),
+                umbral_lento_ms=sec.getfloat("UMBRAL_LENTO_MS", base.umbral_lento_ms),
+                archivo=sec.get("ARCHIVO", base.archivo),
+            )
+        if os.environ.get(ENV_TRACE, "").strip().lower() in ("1", "true", "si", "sí"):
+            base.activo = True
+        return base
+
+    def ruta_archivo(self, db_path):
+        if os.path.isabs(self.archivo):
+            return self.archivo
+        return os.path.join(os.path.dirname(os.path.abspath(db_path)), self.archivo)
+
+
+class SQLMetrics:
+    """Conteos y latencias por método, sentencias lentas con su plan, en JSONL.
+
+    Solo existe si la instrumentación está activa: con ella apagada no se
+    envuelve ningún método ni se instala el trace callback.
+    """
+
+    def __init__(self, ruta_jsonl, umbral_lento_ms):
+        self.ruta_jsonl = ruta_jsonl
+        self.umbral_lento_ms = umbral_lento_ms
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metodos = {}
+        self.conexiones_abiertas = 0
+
+    # --- Registro ---
+    def instalar(self, conn):
+        """Llamar desde on_connect del pool: cuenta la conexión y traza sus sentencias."""
+        with self._lock:
+            self.conexiones_abiertas += 1
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, sentencia):
+        activas = getattr(self._local, "sentencias", None)
+        if activas is not None:
+            activas.append(sentencia)
+
+    def medir(self, nombre, fn, conn_probe=None):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            sentencias = getattr(self._local, "sentencias", None)
+            raiz = sentencias is None
+            if raiz:
+                sentencias = self._local.sentencias = []
+            desde = len(sentencias)
+            inicio = time.perf_counter()
+            try:
+                resultado = fn(*args, **kwargs)
+            finally:
+                ms = (time.perf_counter() - inicio) * 1000
+                propias = sentencias[desde:]
+                if raiz:
+                    self._local.sentencias = None
+            self._registrar(nombre, ms, _filas(resultado))
+            if ms >= self.umbral_lento_ms and propias:
+                self._registrar_lento(nombre, ms, propias, conn_probe)
+            return resultado
+        return envoltura
+
+    def _registrar(self, nombre, ms, filas):
+        with self._lock:
+            m = self._metodos.setdefault(nombre, {'llamadas': 0, 'filas': 0, 'muestras': []})
+            m['llamadas'] += 1
+            m['filas'] += filas
+            if len(m['muestras']) < MAX_MUESTRAS:
+                m['muestras'].append(ms)
+            else:
+                m['muestras'][m['llamadas'] % MAX_MUESTRAS] = ms
+
+    def _registrar_lento(self, nombre, ms, sentencias, conn_probe):
+        planes = {}
+        conn = conn_probe() if conn_probe else None
+        for sql in dict.fromkeys(sentencias):
+            if conn is None or not sql.lstrip().upper().startswith(SENTENCIAS_CON_PLAN):
+                continue
+            try:
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                planes[sql] = [r[3] for r in rows]
+            except sqlite3.Error as e:
+                planes[sql] = [f"sin plan: {e}"]
+        self._escribir({
+            'tipo': 'lento',
+            'fecha': datetime.now().isoformat(timespec="seconds"),
+            'metodo': nombre,
+            'ms': round(ms, 3),
+            'sentencias': sentencias,
+            'planes': planes,
+        })
+
+    # --- Consulta ---
+    def resumen(self):
+        with self._lock:
+            metodos = {
+                nombre: {
+                    'llamadas': m['llamadas'],
+                    'filas': m['filas'],
+                    **_percentiles(m['muestras']),
+                }
+                for nombre, m in self._metodos.items()
+            }
+            return {'conexiones_abiertas': self.conexiones_abiertas, 'metodos': metodos}
+
+    def volcar(self, cache=None, bloqueo=None):
+        """Escribe el resumen acumulado en el JSONL (al cerrar la base)."""
+        registro = dict(self.resumen(), tipo='resumen', fecha=datetime.now().isoformat(timespec="seconds"))
+        if cache is not None:
+            registro['cache'] = cache
+        if bloqueo is not None:
+            registro['bloqueo'] = bloqueo
+        self._escribir(registro)
+
+    def _escribir(self, registro):
+        try:
+            with self._lock, open(self.ruta_jsonl, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ No se pudo escribir métricas SQL: {e}")
+
+
+def instrumentar(obj, metrics, prefijo=None, conn_probe=None, excluir=()):
+    """Envuelve los métodos públicos de la instancia `obj` con medición de tiempo."""
+    prefijo = prefijo or type(obj).__name__
+    for nombre in dir(type(obj)):
+        if nombre.startswith("_") or nombre in excluir:
+            continue
+        atributo = getattr(type(obj), nombre)
+        if not callable(atributo) or isinstance(atributo, type):
+            continue
+        metodo = getattr(obj, nombre)
+        setattr(obj, nombre, metrics.medir(f"{prefijo}.{nombre}", metodo, conn_probe))
+
+
+def _filas(resultado):
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 0 if resultado is None else 1
+
+
+def _percentiles(muestras):
+    if not muestras:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    orden = sorted(muestras)
+
+    def rango(p):
+        return round(orden[min(len(orden) - 1, max(0, int(round(p * len(orden))) - 1))], 3)
+
+    return {'p50_ms': rango(0.50), 'p95_ms': rango(0.95), 'p99_ms': rango(0.99), 'max_ms': round(orden[-1], 3)}
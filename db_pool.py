@@ -0,0 +1,64 @@
+# db_pool.py
+import sqlite3
+import threading
+
+
+class ConnectionPool:
+    """Conexiones SQLite de larga vida, una por hilo, reutilizadas entre llamadas."""
+
+    def __init__(self, db_path, on_connect=None):
+        self.db_path = db_path
+        self._on_connect = on_connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def acquire(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+        conn = self._connect()
+        self._local.conn = conn
+        return conn
+
+    def close_all(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def _connect(self):
+        # isolation_level=None: las transacciones se abren explícitamente
+        # (BEGIN IMMEDIATE) y una lectura nunca deja una transacción colgada.
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        if self._on_connect:
+            self._on_connect(conn)
+        with self._lock:
+            self._conns.append(conn)
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._local.conn = None
@@ -0,0 +1,186 @@
+# db_profile.py
+import datetime
+import random
+import sqlite3
+import threading
+import time
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+# Códigos primarios de SQLite (los extendidos llevan el primario en el byte bajo).
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+class SQLiteProfile:
+    """Perfil de rendimiento aplicado a cada conexión (sección [DB] de config.ini)."""
+
+    def __init__(
+        self,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size_kb=16384,
+        mmap_size_mb=64,
+        temp_store="MEMORY",
+        busy_timeout_ms=1000,
+        reintentos_bloqueo=3,
+        reintento_base_ms=50,
+        reintento_max_ms=800,
+        wal_autocheckpoint=4000,
+        checkpoint_mode="PASSIVE",
+        checkpoint_intervalo_s=30,
+        checkpoint_inactividad_s=20,
+    ):
+        self.journal_mode = _opcion(journal_mode, JOURNAL_MODES, "WAL", "JOURNAL_MODE")
+        self.synchronous = _opcion(synchronous, SYNCHRONOUS_LEVELS, "NORMAL", "SYNCHRONOUS")
+        self.cache_size_kb = int(cache_size_kb)
+        self.mmap_size_mb = int(mmap_size_mb)
+        self.temp_store = _opcion(temp_store, TEMP_STORES, "MEMORY", "TEMP_STORE")
+        self.busy_timeout_ms = int(busy_timeout_ms)
+        self.reintentos_bloqueo = max(0, int(reintentos_bloqueo))
+        self.reintento_base_ms = max(1, int(reintento_base_ms))
+        self.reintento_max_ms = max(self.reintento_base_ms, int(reintento_max_ms))
+        self.wal_autocheckpoint = int(wal_autocheckpoint)
+        self.checkpoint_mode = _opcion(checkpoint_mode, CHECKPOINT_MODES, "PASSIVE", "CHECKPOINT_MODO")
+        self.checkpoint_intervalo_s = int(checkpoint_intervalo_s)
+        self.checkpoint_inactividad_s = int(checkpoint_inactividad_s)
+
+    @classmethod
+    def from_config(cls, config):
+        if config is None or not config.has_section("DB"):
+            return cls()
+
+        sec = config["DB"]
+        base = cls()
+        return cls(
+            journal_mode=sec.get("JOURNAL_MODE", base.journal_mode),
+            synchronous=sec.get("SYNCHRONOUS", base.synchronous),
+            cache_size_kb=sec.getint("CACHE_SIZE_KB", base.cache_size_kb),
+            mmap_size_mb=sec.getint("MMAP_SIZE_MB", base.mmap_size_mb),
+            temp_store=sec.get("TEMP_STORE", base.temp_store),
+            busy_timeout_ms=sec.getint("BUSY_TIMEOUT_MS", base.busy_timeout_ms),
+            reintentos_bloqueo=sec.getint("REINTENTOS_BLOQUEO", base.reintentos_bloqueo),
+            reintento_base_ms=sec.getint("REINTENTO_BASE_MS", base.reintento_base_ms),
+            reintento_max_ms=sec.getint("REINTENTO_MAX_MS", base.reintento_max_ms),
+            wal_autocheckpoint=sec.getint("WAL_AUTOCHECKPOINT", base.wal_autocheckpoint),
+            checkpoint_mode=sec.get("CHECKPOINT_MODO", base.checkpoint_mode),
+            checkpoint_intervalo_s=sec.getint("CHECKPOINT_INTERVALO_S", base.checkpoint_intervalo_s),
+            checkpoint_inactividad_s=sec.getint("CHECKPOINT_INACTIVIDAD_S", base.checkpoint_inactividad_s),
+        )
+
+    def apply(self, conn):
+        # busy_timeout primero: cambiar journal_mode puede requerir esperar un lock.
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        # cache_size negativo = tamaño en KiB, independiente del page_size.
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kb}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size_mb * 1024 * 1024}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        if self.journal_mode == "WAL":
+            conn.execute(f"PRAGMA wal_autocheckpoint = {self.wal_autocheckpoint}")
+
+
+class BaseOcupadaError(sqlite3.OperationalError):
+    """La base siguió bloqueada por otro proceso tras busy_timeout y todos los reintentos."""
+
+
+class ReintentoBloqueo:
+    """Reintenta BEGIN IMMEDIATE / COMMIT cuando SQLite agota busy_timeout.
+
+    El manejador de SQLite espera con pausas fijas: varios procesos que
+    chocan vuelven a intentar al mismo tiempo. Aquí cada reintento duerme un
+    tiempo aleatorio entre 0 y min(REINTENTO_MAX_MS, REINTENTO_BASE_MS * 2^n)
+    (backoff exponencial con jitter completo) y se rinde tras
+    REINTENTOS_BLOQUEO intentos con BaseOcupadaError.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self._lock = threading.Lock()
+        self.reintentos = 0
+        self.agotados = 0
+        self.espera_ms = 0.0
+
+    def ejecutar(self, fn, operacion):
+        intento = 0
+        inicio = time.perf_counter()
+        while True:
+            try:
+                return fn()
+            except sqlite3.OperationalError as e:
+                if not es_bloqueo(e):
+                    raise
+                if intento >= self.profile.reintentos_bloqueo:
+                    esperado = (time.perf_counter() - inicio) * 1000
+                    self._contar(agotados=1)
+                    raise BaseOcupadaError(
+                        f"Base de datos ocupada por otro proceso: {operacion} falló tras "
+                        f"{intento + 1} intento(s) en {esperado:.0f} ms"
+                    ) from e
+            tope = min(self.profile.reintento_max_ms, self.profile.reintento_base_ms * 2 ** intento)
+            pausa = random.uniform(0, tope)
+            self._contar(reintentos=1, espera_ms=pausa)
+            time.sleep(pausa / 1000)
+            intento += 1
+
+    def _contar(self, reintentos=0, agotados=0, espera_ms=0.0):
+        with self._lock:
+            self.reintentos += reintentos
+            self.agotados += agotados
+            self.espera_ms += espera_ms
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'reintentos': self.reintentos,
+                'agotados': self.agotados,
+                'espera_ms': round(self.espera_ms, 1),
+            }
+
+
+def es_bloqueo(error):
+    codigo = getattr(error, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    texto = str(error).lower()
+    return "locked" in texto or "busy" in texto
+
+
+class CheckpointScheduler(threading.Thread):
+    """Ejecuta el checkpoint WAL en segundo plano solo cuando el operario está inactivo."""
+
+    def __init__(self, db_manager, last_activity_probe, profile):
+        super().__init__(name="wal-checkpoint", daemon=True)
+        self.db = db_manager
+        self._last_activity = last_activity_probe
+        self.profile = profile
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.profile.checkpoint_intervalo_s):
+            if not self._operario_inactivo():
+                continue
+            try:
+                self.db.checkpoint(self.profile.checkpoint_mode)
+            except sqlite3.Error as e:
+                print(f"⚠️ Checkpoint WAL omitido: {e}")
+
+    def stop(self):
+        self._detener.set()
+        if self.is_alive():
+            self.join(timeout=5)
+
+    def _operario_inactivo(self):
+        inactivo = datetime.datetime.now() - self._last_activity()
+        return inactivo.total_seconds() >= self.profile.checkpoint_inactividad_s
+
+
+def _opcion(valor, permitidos, por_defecto, nombre):
+    valor_norm = str(valor).strip().upper()
+    if valor_norm in permitidos:
+        return valor_norm
+    print(f"⚠️ [DB] {nombre}={valor} no es válido. Se usa {por_defecto}.")
+    return por_defecto
@@ -0,0 +1,114 @@
+# db_rows.py
+class Fila(tuple):
+    """Fila de solo lectura con acceso estilo dict: fila['peso'], fila.get('archivo').
+
+    Es una tupla (sin __dict__ por instancia): cada fila ocupa lo que sus
+    valores. Los nombres de columna viven en una subclase por combinación de
+    columnas, creada una vez y reutilizada (ver `fabrica`).
+    """
+
+    __slots__ = ()
+    _columnas = ()
+    _indices = {}
+    _variantes = None
+    _base = None
+
+    @classmethod
+    def para(cls, columnas):
+        """Subclase de `cls` con las columnas dadas, en caché por tipo."""
+        columnas = tuple(columnas)
+        if cls.__dict__.get("_variantes") is None:
+            cls._variantes = {}
+        variante = cls._variantes.get(columnas)
+        if variante is None:
+            variante = type(cls.__name__, (cls,), {
+                "__slots__": (),
+                "_columnas": columnas,
+                "_indices": {c: i for i, c in enumerate(columnas)},
+                "_base": cls,
+            })
+            cls._variantes[columnas] = variante
+        return variante
+
+    @classmethod
+    def fabrica(cls, description, **extra):
+        """row_factory para un cursor ya ejecutado; `extra` añade columnas fijas (p. ej. archivo)."""
+        variante = cls.para([d[0] for d in description] + list(extra))
+        nuevo = tuple.__new__
+        if extra:
+            valores = tuple(extra.values())
+            return lambda _cursor, row: nuevo(variante, row + valores)
+        return lambda _cursor, row: nuevo(variante, row)
+
+    @classmethod
+    def desde_dict(cls, datos):
+        return tuple.__new__(cls.para(datos.keys()), datos.values())
+
+    # --- Acceso estilo dict ---
+    def __getitem__(self, clave):
+        if clave.__class__ is str:
+            try:
+                return tuple.__getitem__(self, self._indices[clave])
+            except KeyError:
+                raise KeyError(clave) from None
+        return tuple.__getitem__(self, clave)
+
+    def get(self, clave, defecto=None):
+        i = self._indices.get(clave)
+        return defecto if i is None else tuple.__getitem__(self, i)
+
+    def __contains__(self, clave):
+        return clave in self._indices
+
+    def __iter__(self):
+        return iter(self._columnas)
+
+    def keys(self):
+        return self._columnas
+
+    def values(self):
+        return tuple(tuple.__iter__(self))
+
+    def items(self):
+        return zip(self._columnas, tuple.__iter__(self))
+
+    def con(self, **cambios):
+        """Copia con columnas cambiadas o añadidas (las filas no se modifican en sitio)."""
+        datos = dict(self.items())
+        datos.update(cambios)
+        return self._base.desde_dict(datos)
+
+    def __eq__(self, otro):
+        if isinstance(otro, Fila):
+            return self._columnas == otro._columnas and tuple.__eq__(self, otro)
+        if isinstance(otro, dict):
+            return dict(self.items()) == otro
+        return NotImplemented
+
+    def __ne__(self, otro):
+        igual = self.__eq__(otro)
+        return igual if igual is NotImplemented else not igual
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __reduce__(self):
+        return (self._base.desde_dict, (dict(self.items()),))
+
+
+class Producto(Fila):
+    __slots__ = ()
+
+
+class Canal(Fila):
+    __slots__ = ()
+
+
+class Caja(Fila):
+    __slots__ = ()
+
+
+class Pieza(Fila):
+    __slots__ = ()
@@ -0,0 +1,83 @@
+# db_worker.py
+import itertools
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+
+class DBExecutor(QObject):
+    """Ejecuta consultas fuera del hilo de la GUI y entrega el resultado en él.
+
+    Un único hilo de trabajo (con su propia conexión del pool) procesa las
+    peticiones en orden, así que las escrituras enviadas aquí quedan
+    serializadas entre sí; frente a las del hilo GUI las serializa
+    DatabaseManager.transaction().
+
+    Con `clave`, solo se aplica la respuesta más reciente: si el operario
+    cambia de caja antes de que llegue la respuesta anterior, esta se descarta.
+    """
+
+    # (id_peticion, resultado, error)
+    respuesta = Signal(int, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-worker")
+        self._ids = itertools.count(1)
+        self._pendientes = {}
+        self._ultima_por_clave = {}
+        self._cerrado = False
+        # AutoConnection: la señal se emite desde el hilo de trabajo y el
+        # slot corre en el hilo de la GUI (conexión en cola).
+        self.respuesta.connect(self._despachar)
+
+    def submit(self, fn, *args, on_result=None, on_error=None, clave=None):
+        if self._cerrado:
+            return None
+
+        req_id = next(self._ids)
+        self._pendientes[req_id] = (on_result, on_error, clave)
+        if clave is not None:
+            self._ultima_por_clave[clave] = req_id
+
+        future = self._hilo.submit(fn, *args)
+        future.add_done_callback(lambda f, req_id=req_id: self._terminado(req_id, f))
+        return future
+
+    def pending(self, clave):
+        return clave in self._ultima_por_clave
+
+    def discard(self, clave):
+        """Descarta la respuesta pendiente de `clave`, si la hay."""
+        self._ultima_por_clave.pop(clave, None)
+
+    def shutdown(self, wait=True):
+        self._cerrado = True
+        self._pendientes.clear()
+        self._hilo.shutdown(wait=wait, cancel_futures=True)
+
+    def _terminado(self, req_id, future):
+        if self._cerrado or future.cancelled():
+            return
+        error = future.exception()
+        self.respuesta.emit(req_id, None if error else future.result(), error)
+
+    def _despachar(self, req_id, resultado, error):
+        callbacks = self._pendientes.pop(req_id, None)
+        if callbacks is None:
+            return
+        on_result, on_error, clave = callbacks
+        if clave is not None:
+            if self._ultima_por_clave.get(clave) != req_id:
+                return
+            del self._ultima_por_clave[clave]
+
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                traceback.print_exception(type(error), error, error.__traceback__)
+            return
+        if on_result:
+            on_result(resultado)
@@ -13,7 +13,7 @@ from PySide6.QtGui import QRegularExpressionValidator
 # 1. DIALOGO SINIIGA PREMIUM (CON MODO INTRODUCTOR-LOTE)
 # ============================================================================
 class SiniigaSelectorDialog(QDialog):
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, db_manager, parent=None, canales=None):
         super().__init__(parent)
         self.db = db_manager
         self.selected_siniiga = None
@@ -21,8 +21,10 @@ class SiniigaSelectorDialog(QDialog):
         self.setFixedSize(600, 600)
         self.setWindowFlags(Qt.Dialog | Qt.FramelessWindowHint)
         
-        # Cargar datos iniciales
-        self.canales = self.db.get_canales_activos() if self.db else []
+        # Cargar datos iniciales (MainUI los precarga fuera del hilo GUI)
+        if canales is None:
+            canales = self.db.get_canales_activos() if self.db else []
+        self.canales = canales
         
         self.init_ui()
         self.filtrar("") 
@@ -166,18 +168,22 @@ class SiniigaSelectorDialog(QDialog):
 # 2. DIALOGO CAJA INTELIGENTE (LOGICA HISTORICA)
 # ============================================================================
 class BoxSelectorDialog(QDialog):
-    def __init__(self, db, cid, parent=None):
+    def __init__(self, db, cid, parent=None, datos=None):
         super().__init__(parent)
         self.db = db
         self.cid = cid # Canal ID
         self.res = None 
         
+        # datos = (cajas abiertas, máximo histórico), precargados por MainUI
+        if datos is None:
+            datos = (self.db.get_cajas_abiertas(cid), self.db.get_max_numero_caja(cid))
+
         # 1. Obtener abiertas
-        self.exist = self.db.get_cajas_abiertas(cid)
+        self.exist = datos[0]
         self.open_nums = [c['numero_caja'] for c in self.exist]
         
         # 2. Obtener máximo histórico para sugerencia real
-        self.max_hist = self.db.get_max_numero_caja(cid)
+        self.max_hist = datos[1]
         self.sug = self.max_hist + 1
         
         self.setFixedSize(500, 450)
@@ -4,8 +4,12 @@ import serial
 import serial.tools.list_ports
 import re
 import time
-import win32print
 import datetime
+try:
+    import win32print
+except ImportError:
+    # Solo existe en Windows; sin él no hay impresora (herramientas y pruebas en Linux).
+    win32print = None
 from PySide6.QtCore import QThread, Signal
 
 # =============================================================================
@@ -108,6 +112,8 @@ class HardwareManager:
             print(f"❌ Error buscando impresora: {e}")
 
     def send_raw_zpl(self, zpl_code):
+        if win32print is None:
+            return False, "win32print no disponible: no hay impresora en este equipo"
         try:
             hPrinter = win32print.OpenPrinter(self.printer_name)
             try:
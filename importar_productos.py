@@ -1,6 +1,22 @@
-import os
-import sqlite3
-from db_manager import DatabaseManager
+# importar_productos.py
+# Uso (desde la raíz del proyecto):
+#   python importar_productos.py                           -> catálogo incluido (CLEAN_DATA)
+#   python importar_productos.py catalogo.csv              -> CSV o TSV (el separador se detecta)
+#   python importar_productos.py catalogo.csv --simular    -> solo el reporte, no escribe
+#   python importar_productos.py catalogo.csv --sin-desactivar --db otra.db
+# Lee el archivo en streaming, normaliza y deduplica (gana la última línea de
+# cada código), compara contra el catálogo actual y aplica el diff
+# (insertar / actualizar / desactivar) en una sola transacción con
+# executemany. Nunca borra productos: los que faltan en el archivo quedan
+# INACTIVOS y conservan sus piezas.
+import argparse
+import csv
+import io
+import itertools
+import sys
+import time
+
+from db_manager import DB_FILE, DatabaseManager
 
 # =============================================================================
 # DATOS MAESTROS SANITIZADOS
@@ -696,65 +712,166 @@ CLEAN_DATA = """11000,AGUAYON-C1,VAQUILLA
 41366,CLUB STEAK,BOVINO/VAQUILLA"""
 
 # =============================================================================
-# LÓGICA DE MIGRACIÓN
+# IMPORTACIÓN POR DIFERENCIAS
 # =============================================================================
+SEPARADORES = ",\t;"
+EJEMPLOS_REPORTE = 5
 
-def fix_and_import():
-    # 1. Asegurar instancia de base de datos
-    db = DatabaseManager()
-    
-    # 2. Conexión directa para limpieza total (Nuke & Pave)
-    print("☢️ Iniciando limpieza total de la tabla 'productos'...")
-    try:
-        conn = sqlite3.connect("produccion_local.db")
-        conn.execute("DELETE FROM productos;")
-        conn.commit()
-        conn.close()
-        print("✅ Tabla productos vacía.")
-    except Exception as e:
-        print(f"❌ Error al limpiar DB: {e}")
+
+def leer_filas(lineas, separador=None):
+    """Genera (num_linea, codigo, nombre, especie) normalizados de un iterable de líneas.
+
+    Las filas inválidas salen con codigo None y el motivo en `nombre`.
+    """
+    lineas = iter(lineas)
+    primera = next(lineas, None)
+    if primera is None:
         return
+    if separador is None:
+        separador = max(SEPARADORES, key=primera.count)
+
+    lector = csv.reader(itertools.chain((primera,), lineas), delimiter=separador)
+    for num, partes in enumerate(lector, start=1):
+        if len(partes) < 3:
+            if any(p.strip() for p in partes):
+                yield num, None, "formato inválido (se esperan codigo, nombre, especie)", None
+            continue
+        # Espacios repetidos, tabuladores o saltos dentro de un campo quedan en un espacio.
+        codigo, nombre, especie = (" ".join(p.split()) for p in partes[:3])
+        if not (codigo and nombre and especie):
+            yield num, None, "campo vacío", None
+            continue
+        # Cabecera (también repetida a media lista al concatenar archivos).
+        if codigo.upper() in ("CODIGO", "CÓDIGO"):
+            continue
+        yield num, codigo, nombre, especie
+
+
+def leer_catalogo(lineas, separador=None):
+    """{codigo: (nombre, especie)} deduplicado (gana la última línea) y el resumen de lectura."""
+    productos = {}
+    lectura = {'filas': 0, 'duplicadas': 0, 'invalidas': []}
+    for num, codigo, nombre, especie in leer_filas(lineas, separador):
+        lectura['filas'] += 1
+        if codigo is None:
+            lectura['invalidas'].append((num, nombre))
+            continue
+        if codigo in productos:
+            lectura['duplicadas'] += 1
+        productos[codigo] = (nombre, especie)
+    return productos, lectura
+
+
+def calcular_diff(conn, entrantes, desactivar_faltantes=True):
+    """Compara `entrantes` contra productos; devuelve {insertar, actualizar, desactivar, sin_cambios}."""
+    # Tuplas simples en vez de sqlite3.Row: el catálogo completo se lee en cada importación.
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    actuales = {r[0]: r[1:] for r in cursor.execute("SELECT codigo, nombre, especie, estado FROM productos")}
+    diff = {'insertar': [], 'actualizar': [], 'desactivar': [], 'sin_cambios': 0}
+    for codigo, (nombre, especie) in entrantes.items():
+        actual = actuales.get(codigo)
+        if actual is None:
+            diff['insertar'].append((codigo, nombre, especie))
+        elif actual != (nombre, especie, 'ACTIVO'):
+            # Estar en el archivo también lo reactiva.
+            diff['actualizar'].append((nombre, especie, codigo))
+        else:
+            diff['sin_cambios'] += 1
+    if desactivar_faltantes:
+        diff['desactivar'] = [
+            (codigo,) for codigo, (_, _, estado) in actuales.items()
+            if estado == 'ACTIVO' and codigo not in entrantes
+        ]
+    return diff
+
+
+def aplicar_diff(conn, diff):
+    conn.executemany(
+        "INSERT INTO productos (codigo, nombre, especie, estado) VALUES (?, ?, ?, 'ACTIVO')", diff['insertar']
+    )
+    conn.executemany(
+        "UPDATE productos SET nombre=?, especie=?, estado='ACTIVO' WHERE codigo=?", diff['actualizar']
+    )
+    conn.executemany("UPDATE productos SET estado='INACTIVO' WHERE codigo=?", diff['desactivar'])
+
+
+def importar(db, lineas, simular=False, desactivar_faltantes=True, separador=None):
+    """Importa el catálogo de `lineas`; devuelve el reporte (con los ejemplos de cada cambio)."""
+    inicio = time.perf_counter()
+    entrantes, lectura = leer_catalogo(lineas, separador)
+    if not entrantes:
+        raise ValueError("El archivo no tiene productos válidos")
 
-    # 3. Procesar datos
-    lineas = CLEAN_DATA.strip().split('\n')
-    total = len(lineas)
-    exito = 0
-    errores = 0
+    if simular:
+        diff = calcular_diff(db._get_conn(), entrantes, desactivar_faltantes)
+    else:
+        # El diff se calcula con el lock de escritura tomado: nadie cambia el catálogo en medio.
+        with db.transaction() as conn:
+            diff = calcular_diff(conn, entrantes, desactivar_faltantes)
+            aplicar_diff(conn, diff)
 
-    print(f"🚀 Importando {total} productos correctamente sanitizados...")
+    return {
+        'simulado': simular,
+        'filas': lectura['filas'],
+        'productos': len(entrantes),
+        'duplicadas': lectura['duplicadas'],
+        'invalidas': lectura['invalidas'],
+        'insertar': len(diff['insertar']),
+        'actualizar': len(diff['actualizar']),
+        'desactivar': len(diff['desactivar']),
+        'sin_cambios': diff['sin_cambios'],
+        'ejemplos': {
+            'insertar': [r[0] for r in diff['insertar'][:EJEMPLOS_REPORTE]],
+            'actualizar': [r[2] for r in diff['actualizar'][:EJEMPLOS_REPORTE]],
+            'desactivar': [r[0] for r in diff['desactivar'][:EJEMPLOS_REPORTE]],
+        },
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+    }
 
-    for i, linea in enumerate(lineas):
-        partes = linea.split(',')
-        
-        # Validación mínima de columnas (Codigo, Nombre, Especie)
-        if len(partes) >= 3:
-            codigo = partes[0].strip()
-            nombre = partes[1].strip()
-            especie = partes[2].strip()
-            
-            # Saltarse cabeceras accidentales
-            if "Codigo" in codigo:
-                continue
-                
-            try:
-                # Usar el DB Manager para el Insert
-                db.upsert_producto(codigo, nombre, especie)
-                exito += 1
-                # Mostrar avance cada 100 registros
-                if exito % 100 == 0:
-                    print(f"   ⏳ {exito}/{total} procesados...")
-            except Exception as e:
-                print(f"   ❌ Error en linea {i} [{codigo}]: {e}")
-                errores += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa el catálogo de productos aplicando solo las diferencias.")
+    parser.add_argument("archivo", nargs="?", help="CSV/TSV codigo,nombre,especie (por defecto el catálogo incluido)")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--simular", action="store_true", help="Solo muestra qué cambiaría")
+    parser.add_argument("--sin-desactivar", action="store_true",
+                        help="No desactiva los productos que faltan en el archivo")
+    parser.add_argument("--separador", help="Separador de columnas (por defecto se detecta)")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    try:
+        if args.archivo:
+            with open(args.archivo, encoding=args.encoding, newline="") as f:
+                reporte = importar(db, f, args.simular, not args.sin_desactivar, args.separador)
         else:
-            print(f"   ⚠️ Linea {i} ignorada (Formato inválido): {linea}")
+            reporte = importar(db, io.StringIO(CLEAN_DATA), args.simular, not args.sin_desactivar, args.separador)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close()
+
+    print("=" * 60)
+    print(f" {'SIMULACIÓN' if reporte['simulado'] else 'IMPORTACIÓN'} DE CATÁLOGO ({reporte['ms']} ms) ")
+    print("=" * 60)
+    print(f"    Filas leídas: {reporte['filas']} | Productos: {reporte['productos']} | "
+          f"Duplicadas: {reporte['duplicadas']} | Inválidas: {len(reporte['invalidas'])}")
+    for num, motivo in reporte['invalidas'][:EJEMPLOS_REPORTE]:
+        print(f"    ⚠️ Línea {num}: {motivo}")
+    for accion in ("insertar", "actualizar", "desactivar"):
+        ejemplos = ", ".join(reporte['ejemplos'][accion])
+        print(f"    {accion.capitalize():<11} {reporte[accion]:>6}" + (f"  ({ejemplos}...)" if ejemplos else ""))
+    print(f"    Sin cambios {reporte['sin_cambios']:>6}")
+    if reporte['simulado']:
+        print("    [SIMULACIÓN] No se escribió nada.")
+    else:
+        print("✅ Catálogo actualizado. Los productos desactivados conservan sus piezas.")
+    print("=" * 60)
+    return 0
 
-    print("\n" + "="*40)
-    print(f"🏁 PROCESO FINALIZADO")
-    print(f"📦 Éxitos: {exito}")
-    print(f"⚠️ Errores: {errores}")
-    print("="*40)
-    print("TIP: Abre el Panel Admin y dale a 'Actualizar Todo' para ver los cambios.")
 
 if __name__ == "__main__":
-    fix_and_import()
\ No newline at end of file
+    sys.exit(main())
@@ -27,6 +27,36 @@ def load_config():
             'PRINTER_NAME': 'ZDesigner GC420t',
             'SCALE_BAUDRATE': '9600'
         }
+        config['DB'] = {
+            'JOURNAL_MODE': 'WAL',
+            'SYNCHRONOUS': 'NORMAL',
+            'CACHE_SIZE_KB': '16384',
+            'MMAP_SIZE_MB': '64',
+            'TEMP_STORE': 'MEMORY',
+            'BUSY_TIMEOUT_MS': '1000',
+            'REINTENTOS_BLOQUEO': '3',
+            'REINTENTO_BASE_MS': '50',
+            'REINTENTO_MAX_MS': '800',
+            'WAL_AUTOCHECKPOINT': '4000',
+            'CHECKPOINT_MODO': 'PASSIVE',
+            'CHECKPOINT_INTERVALO_S': '30',
+            'CHECKPOINT_INACTIVIDAD_S': '20'
+        }
+        config['ARCHIVO'] = {
+            'DIRECTORIO': 'archivo',
+            'DIAS_RETENCION': '30',
+            'AL_INICIAR': 'False'
+        }
+        config['METRICAS'] = {
+            'ACTIVO': 'False',
+            'UMBRAL_LENTO_MS': '50',
+            'ARCHIVO': 'metricas_sql.jsonl'
+        }
+        config['CACHE'] = {
+            'ACTIVO': 'True',
+            'MAX_ENTRADAS': '256',
+            'CATALOGO': 'True'
+        }
         with open(CONFIG_FILE, 'w') as f:
             config.write(f)
     else:
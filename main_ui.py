@@ -5,11 +5,14 @@ from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
     QLineEdit, QTableWidget, QTableWidgetItem, QHeaderView, QSplitter, 
     QMessageBox, QFrame, QScrollArea, QComboBox, QCheckBox, QInputDialog,
-    QAbstractItemView
+    QAbstractItemView, QCompleter
 )
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QStringListModel
 
 from db_manager import DatabaseManager
+from db_profile import BaseOcupadaError
+from db_worker import DBExecutor
+from archive_service import ArchiveService
 from dialogs import SiniigaSelectorDialog, BoxSelectorDialog
 from admin_panel import AdminPanel
 from box_domain import (
@@ -21,11 +24,17 @@ from box_domain import (
 )
 from box_service import BoxService, cerrar_caja
 from product_service import ProductService
+from product_index import LIMITE_SUGERENCIAS
 from piece_service import PieceService
 import styles 
 import hardware
 from peso_policy import calcular_peso_pieza, calcular_peso_caja, PesoInvalidoError, resolver_peso_cierre
 
+CAMBIOS_INTERVALO_MS = 1000
+# Autocompletar de txt_prod: desde cuántos caracteres y cómo se muestra cada sugerencia.
+MIN_CARACTERES_SUGERENCIA = 2
+SEPARADOR_SUGERENCIA = "  —  "
+
 
 class SessionState:
     def __init__(self):
@@ -43,13 +52,18 @@ class MainUI(QMainWindow):
         self.resize(1280, 850)
         self.setStyleSheet(styles.MAIN_STYLESHEET)
         
-        self.db = DatabaseManager()
+        self.db = DatabaseManager(config=config)
+        self.db_exec = DBExecutor(self)
         self.product_service = ProductService(self.db)
         self.piece_service = PieceService(self.db, self.product_service)
         self.hw_mgr = hardware.HardwareManager(config.get('HARDWARE', 'PRINTER_NAME', fallback='ZDesigner'))
         self.box_service = BoxService(self.db, self.hw_mgr)
 
         self.state = SessionState()
+        self._box_buttons = {}
+        self.db.start_checkpoints(lambda: self.state.last_activity)
+        if self.db.archivo.al_iniciar:
+            self.db_exec.submit(ArchiveService(self.db).archivar, on_result=self._report_archive)
         
         # Estado de hardware
         self.scale_active = False 
@@ -64,6 +78,23 @@ class MainUI(QMainWindow):
         self.timer.timeout.connect(self.update_kpis)
         self.timer.start(1000)
 
+        # Bitácora de cambios: deltas de esta y otras estaciones sobre la misma base
+        self._cursor_cambios = self.db.get_cursor_cambios()
+        self.db_exec.submit(self.db.podar_cambios)
+        self.tm_cambios = QTimer()
+        self.tm_cambios.timeout.connect(self.poll_changes)
+        self.tm_cambios.start(CAMBIOS_INTERVALO_MS)
+
+    def _report_archive(self, reporte):
+        archivados = [r for r in reporte if r['estado'] == 'ARCHIVADO']
+        if archivados:
+            print(f"✅ Archivo histórico: {len(archivados)} canales movidos.")
+
+    def closeEvent(self, event):
+        self.db_exec.shutdown()
+        self.db.close()
+        super().closeEvent(event)
+
     def init_ui(self):
         cw = QWidget()
         self.setCentralWidget(cw)
@@ -138,6 +169,7 @@ class MainUI(QMainWindow):
         lv.addWidget(QLabel("1. CÓDIGO PRODUCTO:"))
         self.txt_prod = QLineEdit()
         self.txt_prod.returnPressed.connect(self.logic_validate_product)
+        self._init_product_completer()
         lv.addWidget(self.txt_prod)
         
         self.lbl_prod_name = QLabel("⚠️ SELECCIONE CAJA")
@@ -248,7 +280,7 @@ class MainUI(QMainWindow):
                 self.scale_active = True
             else:
                 try:
-                    self.th_scale = hardware.ScaleWorker(self.cb_ports.currentText())
+                    self.th_scale = self._crear_bascula()
                     self.th_scale.weight_received.connect(self.update_weight_display)
                     self.th_scale.start()
                     self.scale_active = True
@@ -259,6 +291,9 @@ class MainUI(QMainWindow):
         
         self.update_scale_ui()
 
+    def _crear_bascula(self):
+        return hardware.ScaleWorker(self.cb_ports.currentText())
+
     def update_scale_ui(self):
         """
         FIX: El estilo visual lo controla SIEMPRE styles.py vía QSS.
@@ -276,11 +311,37 @@ class MainUI(QMainWindow):
     # =========================================================================
     # FLUJO OPERATIVO
     # =========================================================================
+    def _init_product_completer(self):
+        self.model_sugerencias = QStringListModel(self)
+        completer = QCompleter(self.model_sugerencias, self)
+        # El índice de ProductService ya filtró: el completer solo muestra.
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setMaxVisibleItems(LIMITE_SUGERENCIAS)
+        completer.activated.connect(self._on_product_suggestion)
+        self.txt_prod.setCompleter(completer)
+        self.txt_prod.textEdited.connect(self.update_product_suggestions)
+
+    def update_product_suggestions(self, texto):
+        if len(texto.strip()) < MIN_CARACTERES_SUGERENCIA:
+            self.model_sugerencias.setStringList([])
+            return
+        productos = self.product_service.sugerir(texto)
+        self.model_sugerencias.setStringList(
+            [f"{p['codigo']}{SEPARADOR_SUGERENCIA}{p['nombre']}" for p in productos]
+        )
+        if productos:
+            self.txt_prod.completer().complete()
+
+    def _on_product_suggestion(self, texto):
+        self.txt_prod.setText(texto.split(SEPARADOR_SUGERENCIA)[0])
+        self.logic_validate_product()
+
     def _buscar_producto(self, code):
         return self.product_service.get_producto_activo(code)
 
     def logic_validate_product(self):
-        code = self.txt_prod.text().strip()
+        # Si Enter llega antes que la selección del autocompletar, el texto es "codigo — nombre".
+        code = self.txt_prod.text().split(SEPARADOR_SUGERENCIA)[0].strip()
         if not code:
             return
         p = self._buscar_producto(code)
@@ -325,21 +386,18 @@ class MainUI(QMainWindow):
         return peso_final
 
     def _register_piece(self, final_w):
-        consec, pid = self.piece_service.registrar_pieza(
+        return self.piece_service.registrar_para_etiqueta(
             self.state.current_box['id'],
             self.state.current_product['codigo'],
-            self.state.current_product['nombre'],
             final_w
         )
-        return pid
 
-    def _print_piece(self, pid):
-        full = self.db.get_pieza_by_id(pid)
+    def _print_piece(self, registro):
         ok, msg = self.hw_mgr.print_ticket(
-            full,
-            self.state.current_box,
+            registro['pieza'],
+            registro['caja'],
             self.state.current_canal,
-            self.state.current_product
+            registro['producto']
         )
         if not ok:
             QMessageBox.critical(self, "Impresora", msg)
@@ -350,11 +408,13 @@ class MainUI(QMainWindow):
     def _apply_weight_policy(self, final_w):
         return final_w
 
-    def _post_print_refresh(self):
-        self.state.current_box = self.db.get_caja_by_id(self.state.current_box['id'])
+    def _post_print_refresh(self, registro):
+        # Todo viene de la transacción de registro: sin consultas adicionales.
+        self.state.current_box = registro['caja']
         self.state.last_activity = datetime.datetime.now()
-        self.refresh_table()
-        self.update_stats()
+        self._prepend_table_row(registro['pieza'])
+        self.db_exec.discard("stats")
+        self._apply_stats(registro['estadisticas'])
         self.highlight_buttons(self.state.current_box['numero_caja'])
 
         if self.scale_active:
@@ -386,13 +446,13 @@ class MainUI(QMainWindow):
             return
 
         try:
-            pid = self._register_piece(final_w)
-            self._print_piece(pid)
-        except ValueError as e:
+            registro = self._register_piece(final_w)
+            self._print_piece(registro)
+        except (ValueError, BaseOcupadaError) as e:
             QMessageBox.warning(self, "Error", str(e))
             return
 
-        self._post_print_refresh()
+        self._post_print_refresh(registro)
 
     def _ejecutar_cierre_caja(self, peso_final, contenido):
         cerrar_caja(
@@ -455,25 +515,47 @@ class MainUI(QMainWindow):
                 f"El peso final difiere de la suma calculada por {resultado['delta']:.2f} kg"
             )
 
-        self._execute_close(resultado["peso_final"], contenido)
+        try:
+            self._execute_close(resultado["peso_final"], contenido)
+        except BaseOcupadaError as e:
+            QMessageBox.warning(self, "Error", str(e))
 
     def open_siniiga_flow(self):
-        d = SiniigaSelectorDialog(self.db, self)
+        self.db_exec.submit(self.db.get_canales_activos, on_result=self._show_siniiga_dialog, clave="dialogo")
+
+    def _show_siniiga_dialog(self, canales):
+        d = SiniigaSelectorDialog(self.db, self, canales=canales)
         if d.exec() and d.selected_siniiga:
             data = d.selected_siniiga
-            self.state.current_canal = self.db.buscar_o_crear_canal(data['texto']) if 'nuevo' in data else data
-            self.state.current_box = None
-            self.refresh_context()
+            self._set_canal(self.db.buscar_o_crear_canal(data['texto']) if 'nuevo' in data else data)
+
+    def _set_canal(self, canal):
+        self.state.current_canal = canal
+        self.state.current_box = None
+        self.refresh_context()
 
     def open_new_box_flow(self):
         if not self.state.current_canal:
             return
-        d = BoxSelectorDialog(self.db, self.state.current_canal['id'], self)
+        cid = self.state.current_canal['id']
+        self.db_exec.submit(
+            lambda: (self.db.get_cajas_abiertas(cid), self.db.get_max_numero_caja(cid)),
+            on_result=self._show_box_dialog,
+            clave="dialogo",
+        )
+
+    def _show_box_dialog(self, datos):
+        if not self.state.current_canal:
+            return
+        d = BoxSelectorDialog(self.db, self.state.current_canal['id'], self, datos=datos)
         if d.exec():
-            bid = self.box_service.crear_o_recuperar_caja(self.state.current_canal['id'], d.res)
-            self.state.current_box = self.db.get_caja_by_id(bid)
-            self.refresh_context()
-            self.select_box(self.state.current_box)
+            self._open_box(d.res)
+
+    def _open_box(self, numero_caja):
+        bid = self.box_service.crear_o_recuperar_caja(self.state.current_canal['id'], numero_caja)
+        self.state.current_box = self.db.get_caja_by_id(bid)
+        self.refresh_context()
+        self.select_box(self.state.current_box)
 
     def select_box(self, box_data):
         if not box_data:
@@ -500,19 +582,31 @@ class MainUI(QMainWindow):
     def refresh_context(self):
         if not self.state.current_canal:
             return
-        stats = self.db.get_resumen_canal(self.state.current_canal['id'])
-        cajas_ab = self.db.get_cajas_abiertas(self.state.current_canal['id'])
+        self.db_exec.submit(
+            self._fetch_context,
+            self.state.current_canal['id'],
+            on_result=self._apply_context,
+            clave="contexto",
+        )
+
+    def _fetch_context(self, canal_id):
+        return self.db.get_resumen_canal(canal_id), self.db.get_cajas_abiertas(canal_id)
+
+    def _apply_context(self, datos):
+        if not self.state.current_canal:
+            return
+        stats, cajas_ab = datos
+        self._set_header(stats)
+        self._rebuild_box_buttons(cajas_ab)
+        self._sync_selected_box(cajas_ab)
+
+    def _set_header(self, stats):
         siniiga_display = self.state.current_canal['siniiga'].split("-")[0]
         
-        num_ab = len(cajas_ab)
-        num_ce = stats['total_cajas'] - num_ab
-        header = f"SINIIGA: {siniiga_display}\nLOTE: {self.state.current_canal['lote_dia']}\nCAJAS: {stats['total_cajas']} ({num_ab} ABIERTAS / {num_ce} CERRADAS)"
+        header = f"SINIIGA: {siniiga_display}\nLOTE: {self.state.current_canal['lote_dia']}\nCAJAS: {stats['total_cajas']} ({stats['cajas_abiertas']} ABIERTAS / {stats['cajas_cerradas']} CERRADAS)"
         
         self.btn_sin.setText(header)
         self.btn_sin.setStyleSheet("background-color:#28a745; color:black; border:3px solid #1e7e34; text-align:left; padding-left:10px; font-size:14px; font-weight:bold;")
-        
-        self._rebuild_box_buttons(cajas_ab)
-        self._sync_selected_box(cajas_ab)
 
     def _rebuild_box_buttons(self, cajas_ab):
         while self.box_layout.count():
@@ -521,19 +615,27 @@ class MainUI(QMainWindow):
             if w:
                 w.deleteLater()
 
+        self._box_buttons = {}
         for c in cajas_ab:
-            b = QPushButton(f"CAJA {c['numero_caja']}\n{c['peso_acumulado']:.1f}kg")
-            b.setProperty("class", "boxBtn")
-            b.setStyleSheet(styles.STYLE_BOX_OPEN)
-            cid = c['id']
-            b.clicked.connect(lambda ch, cid=cid: self.select_box(self.db.get_caja_by_id(cid)))
-            self.box_layout.addWidget(b)
+            self.box_layout.addWidget(self._make_box_button(c))
 
         add = QPushButton("+")
         add.setFixedSize(65, 80)
         add.clicked.connect(self.open_new_box_flow)
         self.box_layout.addWidget(add)
 
+    def _make_box_button(self, c):
+        b = QPushButton(f"CAJA {c['numero_caja']}\n{c['peso_acumulado']:.1f}kg")
+        b.setProperty("class", "boxBtn")
+        b.setProperty("numero_caja", c['numero_caja'])
+        b.setStyleSheet(styles.STYLE_BOX_OPEN)
+        cid = c['id']
+        b.clicked.connect(lambda ch, cid=cid: self.db_exec.submit(
+            self.db.get_caja_by_id, cid, on_result=self.select_box, clave="caja"
+        ))
+        self._box_buttons[cid] = b
+        return b
+
     def _sync_selected_box(self, cajas_ab):
         if not self.state.current_box:
             self.btn_print.setEnabled(False)
@@ -543,34 +645,72 @@ class MainUI(QMainWindow):
 
         still = next((c for c in cajas_ab if c['id'] == self.state.current_box['id']), None)
         if still:
-            self.select_box(self.db.get_caja_by_id(still['id']))
+            self.select_box(still)
         else:
             self.state.current_box = None
             self.refresh_context()
 
     def refresh_table(self):
-        self.table.setRowCount(0)
         if not self.state.current_box:
+            self.db_exec.discard("tabla")
+            self.table.setRowCount(0)
             return
-        items = self._fetch_box_items()
-        self._render_table(items)
+        self.db_exec.submit(
+            self._fetch_box_items,
+            self.state.current_box['id'],
+            on_result=self._render_table,
+            clave="tabla",
+        )
 
-    def _fetch_box_items(self):
-        return self.db.get_contenido_caja(self.state.current_box['id'])
+    def _fetch_box_items(self, caja_id):
+        return self.db.get_contenido_caja(caja_id)
 
     def _render_table(self, items):
+        if not self.state.current_box:
+            return
+        self.table.setRowCount(0)
         self.table.setRowCount(len(items))
         for r, i in enumerate(items):
-            item_n = QTableWidgetItem(str(i['consecutivo']))
-            item_n.setData(Qt.UserRole, i['id'])
-            self.table.setItem(r, 0, item_n)
-            self.table.setItem(r, 1, QTableWidgetItem(i['codigo_producto']))
-            self.table.setItem(r, 2, QTableWidgetItem(i['nombre_producto']))
-            self.table.setItem(r, 3, QTableWidgetItem(f"{i['peso']:.2f}"))
-            self.table.setItem(r, 4, QTableWidgetItem(i['hora']))
+            self._set_table_row(r, i)
+        self.lbl_total.setText(f"TOTAL: {self.state.current_box['peso_acumulado']:.2f} Kg")
+        self.table.scrollToBottom()
+
+    def _prepend_table_row(self, pieza):
+        # Si la tabla aún se está cargando, se recarga completa (ya incluye la pieza).
+        if self.db_exec.pending("tabla"):
+            self.refresh_table()
+            return
+        self._upsert_table_row(pieza)
         self.lbl_total.setText(f"TOTAL: {self.state.current_box['peso_acumulado']:.2f} Kg")
         self.table.scrollToBottom()
 
+    def _find_table_row(self, pieza_id):
+        for r in range(self.table.rowCount()):
+            item = self.table.item(r, 0)
+            if item and item.data(Qt.UserRole) == pieza_id:
+                return r
+        return -1
+
+    def _upsert_table_row(self, pieza):
+        r = self._find_table_row(pieza['id'])
+        if r < 0:
+            # La tabla va de la pieza más reciente a la más antigua (ORDER BY id DESC).
+            r = next(
+                (i for i in range(self.table.rowCount()) if self.table.item(i, 0).data(Qt.UserRole) < pieza['id']),
+                self.table.rowCount(),
+            )
+            self.table.insertRow(r)
+        self._set_table_row(r, pieza)
+
+    def _set_table_row(self, r, i):
+        item_n = QTableWidgetItem(str(i['consecutivo']))
+        item_n.setData(Qt.UserRole, i['id'])
+        self.table.setItem(r, 0, item_n)
+        self.table.setItem(r, 1, QTableWidgetItem(i['codigo_producto']))
+        self.table.setItem(r, 2, QTableWidgetItem(i['nombre_producto']))
+        self.table.setItem(r, 3, QTableWidgetItem(f"{i['peso']:.2f}"))
+        self.table.setItem(r, 4, QTableWidgetItem(i['hora']))
+
     def delete_selected_piece(self):
         r = self.table.currentRow()
         if r < 0:
@@ -595,8 +735,108 @@ class MainUI(QMainWindow):
             {'nombre': p['nombre_producto'], 'codigo': p['codigo_producto'], 'especie': 'REIMP'}
         )
 
+    # --- Refresco incremental (bitácora de cambios) ---
+    def poll_changes(self):
+        if self.db_exec.pending("cambios"):
+            return
+        canal_id = self.state.current_canal['id'] if self.state.current_canal else None
+        caja_id = self.state.current_box['id'] if self.state.current_box else None
+        self.db_exec.submit(
+            self._fetch_changes,
+            self._cursor_cambios,
+            canal_id,
+            caja_id,
+            on_result=self._apply_changes,
+            clave="cambios",
+        )
+
+    def _fetch_changes(self, cursor, canal_id, caja_id):
+        lote = self.db.get_cambios_desde(cursor)
+        lote.update(canal_id=canal_id, caja_id=caja_id)
+        cambios = lote['cambios']
+        if lote['recargar'] or not cambios:
+            return lote
+
+        del_canal = [c for c in cambios if canal_id is not None and c['canal_id'] == canal_id]
+        de_la_caja = [c['entidad_id'] for c in cambios if c['entidad'] == 'pieza' and c['caja_id'] == caja_id]
+        lote['cajas'] = {cid: self.db.get_caja_by_id(cid) for cid in {c['caja_id'] for c in del_canal if c['caja_id']}}
+        lote['piezas_cambiadas'] = list(dict.fromkeys(de_la_caja))
+        lote['piezas'] = self.db.get_piezas_by_ids(lote['piezas_cambiadas'])
+        lote['resumen'] = self.db.get_resumen_canal(canal_id) if del_canal else None
+        lote['canal'] = self.db.get_canal_by_id(canal_id) if any(c['entidad'] == 'canal' for c in del_canal) else None
+        hay_piezas = any(c['entidad'] == 'pieza' for c in cambios)
+        lote['estadisticas'] = self.db.get_estadisticas_generales() if hay_piezas else None
+        return lote
+
+    def _apply_changes(self, lote):
+        self._cursor_cambios = lote['cursor']
+        if lote['recargar']:
+            self.refresh_context()
+            self.refresh_table()
+            self.update_stats()
+            return
+        if not lote['cambios']:
+            return
+
+        if lote['estadisticas']:
+            self.db_exec.discard("stats")
+            self._apply_stats(lote['estadisticas'])
+
+        # El operario cambió de canal mientras tanto: ya se recargó completo.
+        if not self.state.current_canal or self.state.current_canal['id'] != lote['canal_id']:
+            return
+
+        if lote['canal']:
+            self.state.current_canal = lote['canal']
+        if lote['resumen']:
+            self._set_header(lote['resumen'])
+        for caja_id, caja in lote['cajas'].items():
+            self._apply_box_change(caja_id, caja)
+
+        if self.state.current_box and self.state.current_box['id'] == lote['caja_id']:
+            for pieza_id in lote['piezas_cambiadas']:
+                pieza = lote['piezas'].get(pieza_id)
+                if pieza and pieza['caja_id'] == lote['caja_id']:
+                    self._upsert_table_row(pieza)
+                else:
+                    r = self._find_table_row(pieza_id)
+                    if r >= 0:
+                        self.table.removeRow(r)
+            self.lbl_total.setText(f"TOTAL: {self.state.current_box['peso_acumulado']:.2f} Kg")
+
+    def _apply_box_change(self, caja_id, caja):
+        abierta = (
+            caja is not None
+            and caja['estado'] == ESTADO_ABIERTA
+            and caja['canal_id'] == self.state.current_canal['id']
+        )
+        btn = self._box_buttons.get(caja_id)
+        es_actual = self.state.current_box is not None and self.state.current_box['id'] == caja_id
+
+        if abierta:
+            if btn:
+                btn.setText(f"CAJA {caja['numero_caja']}\n{caja['peso_acumulado']:.1f}kg")
+            else:
+                pos = sum(1 for b in self._box_buttons.values() if b.property("numero_caja") < caja['numero_caja'])
+                self.box_layout.insertWidget(pos, self._make_box_button(caja))
+            if es_actual:
+                self.state.current_box = caja
+                self.highlight_buttons(caja['numero_caja'])
+            return
+
+        if btn:
+            self.box_layout.removeWidget(btn)
+            btn.deleteLater()
+            del self._box_buttons[caja_id]
+        if es_actual:
+            self.state.current_box = None
+            self.table.setRowCount(0)
+            self._sync_selected_box([])
+
     def update_stats(self):
-        s = self.db.get_estadisticas_generales()
+        self.db_exec.submit(self.db.get_estadisticas_generales, on_result=self._apply_stats, clave="stats")
+
+    def _apply_stats(self, s):
         self.k_h.itemAt(1).widget().setText(str(s['piezas_hoy']))
         self.k_p.itemAt(1).widget().setText(f"{s['peso_hoy']:.1f} Kg")
 
@@ -610,6 +850,7 @@ class MainUI(QMainWindow):
         try:
             print("Creating AdminPanel")
             panel = AdminPanel(self.db, self)
+            panel.data_changed.connect(lambda cambios: self.poll_changes())
             print("Before exec")
             panel.exec()
             print("After exec")
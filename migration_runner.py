@@ -0,0 +1,188 @@
+# migration_runner.py
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+# Solo se descubren archivos NNN_descripcion.sql directamente en tools/migrations.
+# tools/migrations/historico/ guarda scripts de reconstrucción de tablas del
+# 2026-02-24 que nunca se aplicaron, y al reconstruir piezas/cajas descartarían
+# columnas y triggers posteriores. Los UNIQUE de cajas y piezas y el estado de
+# productos ya están en schema.sql y la migración 001; la FK de
+# piezas.codigo_producto -> productos (ON DELETE RESTRICT) no: la aplica la
+# migración 013 con triggers. Se conservan como referencia, no se ejecutan.
+MIGRATION_FILE_RE = re.compile(r"^(\d{3})_([A-Za-z0-9_]+)\.sql$")
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    aplicada_en DATETIME DEFAULT CURRENT_TIMESTAMP,
+    duracion_ms REAL            -- NULL: adoptada de una base previa al runner
+)
+"""
+
+
+class Migration:
+    def __init__(self, version, nombre, path):
+        self.version = version
+        self.nombre = nombre
+        self.path = path
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def checksum(self):
+        return hashlib.sha256(self.read().encode("utf-8")).hexdigest()
+
+
+class MigrationRunner:
+    """Aplica en una sola transacción las migraciones numeradas pendientes.
+
+    La versión aplicada se guarda en schema_version y se replica en
+    PRAGMA user_version: si coincide con la última migración del directorio,
+    el arranque no consulta sqlite_master ni lee ningún archivo.
+    """
+
+    def __init__(self, conn, migrations_dir):
+        self.conn = conn
+        self.migrations_dir = migrations_dir
+
+    def discover(self):
+        if not os.path.isdir(self.migrations_dir):
+            return []
+
+        migraciones = []
+        for nombre_archivo in os.listdir(self.migrations_dir):
+            m = MIGRATION_FILE_RE.match(nombre_archivo)
+            if m:
+                migraciones.append(
+                    Migration(int(m.group(1)), m.group(2), os.path.join(self.migrations_dir, nombre_archivo))
+                )
+        migraciones.sort(key=lambda mig: mig.version)
+
+        versiones = [mig.version for mig in migraciones]
+        if len(versiones) != len(set(versiones)):
+            raise RuntimeError(f"Versiones de migración duplicadas en {self.migrations_dir}")
+        return migraciones
+
+    def current_version(self):
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def run(self, dry_run=False):
+        """Devuelve una lista de dicts {version, nombre, estado, duracion_ms}."""
+        migraciones = self.discover()
+        if not migraciones:
+            return []
+
+        ultima = migraciones[-1].version
+        if self.current_version() == ultima:
+            return []
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            reporte = self._run_locked(migraciones, ultima)
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        if dry_run:
+            self.conn.rollback()
+        else:
+            self.conn.commit()
+        return reporte
+
+    def _run_locked(self, migraciones, ultima):
+        self.conn.execute(SCHEMA_VERSION_DDL)
+        aplicadas = {
+            row[0]: row[1]
+            for row in self.conn.execute("SELECT version, checksum FROM schema_version").fetchall()
+        }
+        if not aplicadas:
+            aplicadas = self._adopt_legacy(migraciones)
+
+        reporte = []
+        for mig in migraciones:
+            checksum = mig.checksum()
+            if mig.version in aplicadas:
+                if aplicadas[mig.version] != checksum:
+                    print(f"⚠️ Migración {mig.version:03d}_{mig.nombre} modificada después de aplicarse.")
+                continue
+
+            inicio = time.perf_counter()
+            for sentencia in split_statements(mig.read()):
+                self.conn.execute(sentencia)
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+
+            self.conn.execute(
+                "INSERT INTO schema_version (version, nombre, checksum, duracion_ms) VALUES (?, ?, ?, ?)",
+                (mig.version, mig.nombre, checksum, duracion_ms),
+            )
+            reporte.append({
+                'version': mig.version,
+                'nombre': mig.nombre,
+                'estado': 'APLICADA',
+                'duracion_ms': duracion_ms,
+            })
+
+        self.conn.execute(f"PRAGMA user_version = {int(ultima)}")
+        return reporte
+
+    def _adopt_legacy(self, migraciones):
+        """Registra como aplicadas las migraciones que el arranque anterior ya ejecutaba."""
+        adoptadas = {}
+        for mig in migraciones:
+            sonda = LEGACY_PROBES.get(mig.version)
+            if sonda is None or not sonda(self.conn):
+                continue
+            checksum = mig.checksum()
+            self.conn.execute(
+                "INSERT INTO schema_version (version, nombre, checksum, duracion_ms) VALUES (?, ?, ?, NULL)",
+                (mig.version, mig.nombre, checksum),
+            )
+            adoptadas[mig.version] = checksum
+        return adoptadas
+
+
+def split_statements(script):
+    """Divide un script SQL en sentencias completas (respeta BEGIN...END de triggers)."""
+    sentencias = []
+    actual = ""
+    for linea in script.splitlines(keepends=True):
+        if not actual and (not linea.strip() or linea.lstrip().startswith("--")):
+            continue
+        actual += linea
+        if sqlite3.complete_statement(actual):
+            sentencias.append(actual.strip())
+            actual = ""
+    if actual.strip():
+        raise ValueError(f"Sentencia SQL incompleta al final del script: {actual.strip()[:60]}...")
+    return sentencias
+
+
+def _table_exists(conn, table_name):
+    row = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone()
+    return row is not None
+
+
+def _column_exists(conn, table_name, column_name):
+    rows = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+    return any(row[1] == column_name for row in rows)
+
+
+def _index_exists(conn, index_name):
+    row = conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?", (index_name,)).fetchone()
+    return row is not None
+
+
+# Migraciones que el arranque aplicaba antes del runner, detectadas por su efecto.
+LEGACY_PROBES = {
+    1: lambda conn: _column_exists(conn, "productos", "estado"),
+    2: lambda conn: _index_exists(conn, "idx_piezas_codigo_producto"),
+    3: lambda conn: _column_exists(conn, "cajas", "peso_acumulado"),
+    4: lambda conn: _table_exists(conn, "resumen_canales"),
+    5: lambda conn: _table_exists(conn, "produccion_diaria"),
+}
@@ -5,6 +5,7 @@ class PieceService:
     def __init__(self, db_manager, product_service):
         self.db = db_manager
         self.product_service = product_service
+        self.db.instrumentar(self)
 
     def registrar_pieza(self, caja_id, codigo_producto, nombre_producto, peso):
         caja = self.db.get_caja_by_id(caja_id)
@@ -29,6 +30,47 @@ class PieceService:
 
         return self.db.registrar_pieza(caja_id, codigo_producto, nombre_producto, peso)
 
+    def registrar_para_etiqueta(self, caja_id, codigo_producto, peso):
+        """Registro de una pieza con todo lo que necesitan la etiqueta y la pantalla.
+
+        Una sola transacción valida caja y producto, inserta y devuelve
+        {pieza, caja, producto, estadisticas}.
+        """
+        if peso <= 0:
+            raise ValueError("El peso debe ser mayor a 0")
+
+        if not codigo_producto:
+            raise ValueError("El código no puede estar vacío")
+
+        return self.db.registrar_pieza_etiqueta(caja_id, str(codigo_producto).strip(), peso)
+
+    def registrar_piezas_bulk(self, caja_id, piezas):
+        """Carga masiva [(codigo, peso), ...] para recaptura; una validación y una transacción."""
+        caja = self.db.get_caja_by_id(caja_id)
+        if not caja:
+            raise ValueError("Caja no existe")
+
+        if caja["estado"] != ESTADO_ABIERTA:
+            raise ValueError("La caja no está abierta")
+
+        for codigo, peso in piezas:
+            if not codigo:
+                raise ValueError("El código no puede estar vacío")
+            if peso <= 0:
+                raise ValueError("El peso debe ser mayor a 0")
+
+        productos = self.product_service.get_productos_activos(codigo for codigo, _ in piezas)
+        faltantes = sorted({str(codigo).strip() for codigo, _ in piezas} - productos.keys())
+        if faltantes:
+            raise ValueError(f"Productos inexistentes o INACTIVOS: {', '.join(faltantes)}")
+
+        filas = []
+        for codigo, peso in piezas:
+            producto = productos[str(codigo).strip()]
+            filas.append((producto["codigo"], producto["nombre"], peso))
+
+        return self.db.registrar_piezas_bulk(caja_id, filas)
+
     def editar_pieza(self, pieza_id, nuevo_peso):
         pieza = self.db.get_pieza_by_id(pieza_id)
         if not pieza:
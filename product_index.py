@@ -0,0 +1,93 @@
+# product_index.py
+import bisect
+import unicodedata
+
+LIMITE_SUGERENCIAS = 15
+# Más cambios que esta fracción del catálogo: se reconstruye en vez de aplicar deltas.
+FRACCION_RECONSTRUIR = 0.25
+
+
+def normalizar(texto):
+    """Mayúsculas, sin acentos y con espacios simples: 'rinon' encuentra 'RIÑON'."""
+    sin_acentos = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sin_acentos.upper().split())
+
+
+class IndiceProductos:
+    """Índice de prefijos sobre los productos ACTIVOS, en listas ordenadas con bisect.
+
+    `_codigos` guarda (codigo_normalizado, codigo); `_nombres` guarda una
+    entrada por palabra del nombre, desde esa palabra hasta el final, así
+    "TROZO" y "EN TR" encuentran "PALETA EN TROZO". Buscar es un bisect más
+    un recorrido de a lo sumo `limite` entradas por lista.
+    """
+
+    def __init__(self):
+        self._codigos = []
+        self._nombres = []
+        self._productos = {}
+        self._fuente = None
+
+    def actualizar(self, productos):
+        """Sincroniza con `productos` ({codigo: Producto}); True si hubo cambios.
+
+        Si es el mismo dict de la última vez no hace nada. Si no, aplica solo
+        los productos agregados, quitados o modificados.
+        """
+        if productos is self._fuente:
+            return False
+        anteriores = self._productos
+        nuevos = {c: p for c, p in productos.items() if p["estado"] == "ACTIVO"}
+        quitar = [p for c, p in anteriores.items() if nuevos.get(c) != p]
+        poner = [p for c, p in nuevos.items() if anteriores.get(c) != p]
+        self._fuente = productos
+        if not quitar and not poner:
+            return False
+
+        if len(quitar) + len(poner) > len(nuevos) * FRACCION_RECONSTRUIR:
+            self._codigos = sorted(c for p in nuevos.values() for c in _claves_codigo(p))
+            self._nombres = sorted(n for p in nuevos.values() for n in _claves_nombre(p))
+        else:
+            for p in quitar:
+                _quitar(self._codigos, _claves_codigo(p))
+                _quitar(self._nombres, _claves_nombre(p))
+            for p in poner:
+                for clave in _claves_codigo(p):
+                    bisect.insort(self._codigos, clave)
+                for clave in _claves_nombre(p):
+                    bisect.insort(self._nombres, clave)
+        self._productos = nuevos
+        return True
+
+    def buscar(self, texto, limite=LIMITE_SUGERENCIAS):
+        """Productos cuyo código, o alguna palabra del nombre, empieza con `texto`; primero los de código."""
+        prefijo = normalizar(texto)
+        if not prefijo:
+            return []
+        encontrados = {}
+        for lista in (self._codigos, self._nombres):
+            i = bisect.bisect_left(lista, (prefijo,))
+            while i < len(lista) and len(encontrados) < limite and lista[i][0].startswith(prefijo):
+                codigo = lista[i][1]
+                encontrados.setdefault(codigo, self._productos[codigo])
+                i += 1
+        return list(encontrados.values())
+
+    def __len__(self):
+        return len(self._productos)
+
+
+def _claves_codigo(producto):
+    return [(normalizar(producto["codigo"]), producto["codigo"])]
+
+
+def _claves_nombre(producto):
+    palabras = normalizar(producto["nombre"]).split(" ")
+    return [(" ".join(palabras[i:]), producto["codigo"]) for i in range(len(palabras)) if palabras[i]]
+
+
+def _quitar(lista, claves):
+    for clave in claves:
+        i = bisect.bisect_left(lista, clave)
+        if i < len(lista) and lista[i] == clave:
+            del lista[i]
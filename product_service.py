@@ -1,51 +1,168 @@
+import os
+import re
+import threading
+
+from db_rows import Producto
+from product_index import LIMITE_SUGERENCIAS, IndiceProductos
+
+LOTE_CONSULTA = 500
+LIMITE_BUSQUEDA = 200
+ACCIONES_LOTE = ("activar", "desactivar", "especie")
+# Un catálogo en memoria por archivo de base, compartido por los ProductService del proceso.
+_CATALOGOS = {}
+_CATALOGOS_LOCK = threading.Lock()
+
+
+class CatalogoCache:
+    """Catálogo completo {codigo: Producto} en memoria, compartido en el proceso.
+
+    Se recarga entero cuando cambia catalogo_version (la incrementan los
+    triggers de productos, venga la escritura de donde venga). La versión
+    solo se relee si la conexión vio alguna escritura desde la última
+    consulta: PRAGMA data_version (otras conexiones y procesos) o
+    total_changes (la propia).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._productos = None
+        self._version = None
+        self.recargas = 0
+
+    def productos(self, db, conn):
+        sello = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        local = self._local
+        productos = self._productos
+        if productos is not None and getattr(local, "conn", None) is conn and local.sello == sello:
+            return productos
+
+        version = conn.execute("SELECT version FROM catalogo_version WHERE id=1").fetchone()[0]
+        with self._lock:
+            if self._productos is None or self._version != version:
+                self._cargar(db, conn)
+            productos = self._productos
+        local.conn, local.sello = conn, sello
+        return productos
+
+    def _cargar(self, db, conn):
+        # Versión y filas de la misma instantánea.
+        conn.execute("BEGIN")
+        try:
+            self._version = conn.execute("SELECT version FROM catalogo_version WHERE id=1").fetchone()[0]
+            filas = db._consultar(Producto, "SELECT * FROM productos ORDER BY codigo ASC", (), conn).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        self._productos = {p["codigo"]: p for p in filas}
+        self.recargas += 1
+
+    def invalidar(self):
+        with self._lock:
+            self._productos = None
+
+
+def catalogo_compartido(db):
+    clave = os.path.abspath(db.db_path)
+    with _CATALOGOS_LOCK:
+        return _CATALOGOS.setdefault(clave, CatalogoCache())
+
+
 class ProductService:
     def __init__(self, db_manager):
         self.db = db_manager
+        self.catalogo = catalogo_compartido(db_manager) if db_manager.cache_catalogo else None
+        self.indice = IndiceProductos()
+        self.db.instrumentar(self)
 
     # --- API NUEVA SOLICITADA ---
     def get_producto(self, codigo):
         codigo_limpio = self._validar_codigo(codigo)
-        conn = self.db._get_conn()
-        try:
-            row = conn.execute(
-                "SELECT * FROM productos WHERE codigo=?", (codigo_limpio,)
-            ).fetchone()
-            return dict(row) if row else None
-        finally:
-            conn.close()
+        productos = self._productos_en_memoria()
+        if productos is not None:
+            return productos.get(codigo_limpio)
+        return self.db._consultar(
+            Producto, "SELECT * FROM productos WHERE codigo=?", (codigo_limpio,)
+        ).fetchone()
 
     def get_producto_activo(self, codigo):
         codigo_limpio = self._validar_codigo(codigo)
+        productos = self._productos_en_memoria()
+        if productos is not None:
+            producto = productos.get(codigo_limpio)
+            return producto if producto is not None and producto["estado"] == "ACTIVO" else None
+        return self.db._consultar(
+            Producto,
+            "SELECT * FROM productos WHERE codigo=? AND estado='ACTIVO'",
+            (codigo_limpio,),
+        ).fetchone()
+
+    def get_productos_activos(self, codigos):
+        """Devuelve {codigo: producto} de los códigos ACTIVOS de la lista, en consultas por lotes."""
+        codigos_limpios = list(dict.fromkeys(self._validar_codigo(c) for c in codigos))
+        productos = self._productos_en_memoria()
+        if productos is not None:
+            return {
+                c: productos[c] for c in codigos_limpios
+                if c in productos and productos[c]["estado"] == "ACTIVO"
+            }
         conn = self.db._get_conn()
-        try:
-            row = conn.execute(
-                "SELECT * FROM productos WHERE codigo=? AND estado='ACTIVO'",
-                (codigo_limpio,),
-            ).fetchone()
-            return dict(row) if row else None
-        finally:
-            conn.close()
+        encontrados = {}
+        for i in range(0, len(codigos_limpios), LOTE_CONSULTA):
+            lote = codigos_limpios[i:i + LOTE_CONSULTA]
+            marcas = ",".join("?" * len(lote))
+            rows = self.db._consultar(
+                Producto, f"SELECT * FROM productos WHERE estado='ACTIVO' AND codigo IN ({marcas})", lote, conn
+            ).fetchall()
+            encontrados.update((r["codigo"], r) for r in rows)
+        return encontrados
 
     def get_all_productos(self, incluir_inactivos=False):
-        conn = self.db._get_conn()
-        try:
-            if incluir_inactivos:
-                rows = conn.execute("SELECT * FROM productos ORDER BY codigo ASC").fetchall()
-            else:
-                rows = conn.execute(
-                    "SELECT * FROM productos WHERE estado='ACTIVO' ORDER BY codigo ASC"
-                ).fetchall()
-            return [dict(r) for r in rows]
-        finally:
-            conn.close()
+        productos = self._productos_en_memoria()
+        if productos is not None:
+            return [p for p in productos.values() if incluir_inactivos or p["estado"] == "ACTIVO"]
+        if incluir_inactivos:
+            query = "SELECT * FROM productos ORDER BY codigo ASC"
+        else:
+            query = "SELECT * FROM productos WHERE estado='ACTIVO' ORDER BY codigo ASC"
+        return self.db._consultar(Producto, query).fetchall()
+
+    def sugerir(self, texto, limite=LIMITE_SUGERENCIAS):
+        """Productos ACTIVOS cuyo código o alguna palabra del nombre empieza con `texto` (autocompletar)."""
+        productos = self._productos_en_memoria()
+        if productos is None:
+            productos = {p["codigo"]: p for p in self.get_all_productos()}
+        # Incremental: solo reindexa lo que cambió desde la llamada anterior.
+        self.indice.actualizar(productos)
+        return self.indice.buscar(texto, limite)
+
+    def search(self, texto, limite=LIMITE_BUSQUEDA, incluir_inactivos=True):
+        """Productos cuyo código, nombre o especie tienen palabras que empiezan con las de `texto`.
+
+        Va a productos_fts: sin distinguir acentos ni Ñ, todas las palabras
+        deben coincidir y el orden es por relevancia (el código pesa más).
+        """
+        consulta = _consulta_fts(texto)
+        if not consulta:
+            return []
+        filtro = "" if incluir_inactivos else "AND p.estado='ACTIVO'"
+        return self.db._consultar(
+            Producto,
+            f"""
+            SELECT p.* FROM productos_fts f
+            JOIN productos p ON p.rowid = f.rowid
+            WHERE productos_fts MATCH ? {filtro}
+            ORDER BY f.rank
+            LIMIT ?
+            """,
+            (consulta, limite),
+        ).fetchall()
 
     def upsert_producto(self, codigo, nombre, especie):
         codigo_limpio = self._validar_codigo(codigo)
         nombre_limpio = self._validar_texto(nombre, "nombre")
         especie_limpia = self._validar_texto(especie, "especie")
 
-        conn = self.db._get_conn()
-        try:
+        with self.db.transaction() as conn:
             conn.execute(
                 """
                 INSERT INTO productos (codigo, nombre, especie, estado)
@@ -56,9 +173,7 @@ class ProductService:
                 """,
                 (codigo_limpio, nombre_limpio, especie_limpia),
             )
-            conn.commit()
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
 
     def desactivar_producto(self, codigo):
         self._set_estado(codigo, "INACTIVO")
@@ -66,6 +181,71 @@ class ProductService:
     def activar_producto(self, codigo):
         self._set_estado(codigo, "ACTIVO")
 
+    def cambiar_en_lote(self, accion, codigos=None, prefijo=None, especie=None, nueva_especie=None):
+        """Activa, desactiva o cambia la especie de varios productos en una sola transacción.
+
+        Los productos se eligen con una (y solo una) de: `codigos` (lista),
+        `prefijo` de código o `especie`. Devuelve una entrada por código con
+        estado CAMBIADO, SIN_CAMBIOS o NO_EXISTE (solo para `codigos`).
+        """
+        if accion not in ACCIONES_LOTE:
+            raise ValueError(f"Acción desconocida: '{accion}'")
+        if sum(x is not None for x in (codigos, prefijo, especie)) != 1:
+            raise ValueError("Indique códigos, un prefijo o una especie (solo uno)")
+        if accion == "especie":
+            nueva_especie = self._validar_texto(nueva_especie, "especie")
+            columna, valor = "especie", nueva_especie
+        else:
+            columna, valor = "estado", "ACTIVO" if accion == "activar" else "INACTIVO"
+
+        with self.db.transaction() as conn:
+            if codigos is not None:
+                pedidos = list(dict.fromkeys(self._validar_codigo(c) for c in codigos))
+                actuales = {}
+                for i in range(0, len(pedidos), LOTE_CONSULTA):
+                    lote = pedidos[i:i + LOTE_CONSULTA]
+                    marcas = ",".join("?" * len(lote))
+                    rows = conn.execute(
+                        f"SELECT codigo, estado, especie FROM productos WHERE codigo IN ({marcas})", lote
+                    ).fetchall()
+                    actuales.update((r["codigo"], r) for r in rows)
+            elif prefijo is not None:
+                prefijo = self._validar_codigo(prefijo)
+                rows = conn.execute(
+                    "SELECT codigo, estado, especie FROM productos WHERE codigo >= ? AND codigo < ? ORDER BY codigo",
+                    (prefijo, _siguiente_prefijo(prefijo)),
+                ).fetchall()
+                actuales = {r["codigo"]: r for r in rows}
+                pedidos = list(actuales)
+            else:
+                especie = self._validar_texto(especie, "especie")
+                rows = conn.execute(
+                    "SELECT codigo, estado, especie FROM productos WHERE especie = ? ORDER BY codigo", (especie,)
+                ).fetchall()
+                actuales = {r["codigo"]: r for r in rows}
+                pedidos = list(actuales)
+
+            reporte, cambios = [], []
+            for codigo in pedidos:
+                actual = actuales.get(codigo)
+                if actual is None:
+                    reporte.append({'codigo': codigo, 'estado': 'NO_EXISTE', 'antes': None, 'despues': None})
+                    continue
+                antes = actual[columna]
+                if antes == valor:
+                    reporte.append({'codigo': codigo, 'estado': 'SIN_CAMBIOS', 'antes': antes, 'despues': valor})
+                    continue
+                reporte.append({'codigo': codigo, 'estado': 'CAMBIADO', 'antes': antes, 'despues': valor})
+                cambios.append((valor, codigo))
+
+            if columna == "estado":
+                conn.executemany("UPDATE productos SET estado=? WHERE codigo=?", cambios)
+            else:
+                conn.executemany("UPDATE productos SET especie=? WHERE codigo=?", cambios)
+        if cambios:
+            self._invalidar_catalogo()
+        return reporte
+
     # --- COMPATIBILIDAD CON CÓDIGO ACTUAL ---
     def list_all(self, include_inactive=True):
         return self.get_all_productos(incluir_inactivos=include_inactive)
@@ -78,10 +258,7 @@ class ProductService:
         nombre_limpio = self._validar_texto(nombre, "nombre")
         especie_limpia = self._validar_texto(especie, "especie")
 
-        conn = self.db._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-
+        with self.db.transaction() as conn:
             if self._existe_producto_conn(conn, codigo_limpio):
                 raise ValueError(f"El producto '{codigo_limpio}' ya existe")
 
@@ -89,22 +266,14 @@ class ProductService:
                 "INSERT INTO productos (codigo, nombre, especie, estado) VALUES (?, ?, ?, 'ACTIVO')",
                 (codigo_limpio, nombre_limpio, especie_limpia),
             )
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
 
     def update(self, codigo_original, nuevo_nombre, nueva_especie):
         codigo_limpio = self._validar_codigo(codigo_original)
         nombre_limpio = self._validar_texto(nuevo_nombre, "nombre")
         especie_limpia = self._validar_texto(nueva_especie, "especie")
 
-        conn = self.db._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-
+        with self.db.transaction() as conn:
             if not self._existe_producto_conn(conn, codigo_limpio):
                 raise ValueError(f"El producto '{codigo_limpio}' no existe")
 
@@ -112,21 +281,13 @@ class ProductService:
                 "UPDATE productos SET nombre=?, especie=? WHERE codigo=?",
                 (nombre_limpio, especie_limpia, codigo_limpio),
             )
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
 
     def change_codigo(self, codigo_original, nuevo_codigo):
         codigo_original_limpio = self._validar_codigo(codigo_original)
         nuevo_codigo_limpio = self._validar_codigo(nuevo_codigo)
 
-        conn = self.db._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-
+        with self.db.transaction() as conn:
             if not self._existe_producto_conn(conn, codigo_original_limpio):
                 raise ValueError(f"El producto '{codigo_original_limpio}' no existe")
 
@@ -143,12 +304,7 @@ class ProductService:
                 "UPDATE productos SET codigo=? WHERE codigo=?",
                 (nuevo_codigo_limpio, codigo_original_limpio),
             )
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
 
     def deactivate(self, codigo):
         self.desactivar_producto(codigo)
@@ -159,10 +315,7 @@ class ProductService:
     def delete_if_unused(self, codigo):
         codigo_limpio = self._validar_codigo(codigo)
 
-        conn = self.db._get_conn()
-        try:
-            conn.execute("BEGIN IMMEDIATE")
-
+        with self.db.transaction() as conn:
             if not self._existe_producto_conn(conn, codigo_limpio):
                 raise ValueError(f"El producto '{codigo_limpio}' no existe")
 
@@ -173,22 +326,28 @@ class ProductService:
                 )
 
             conn.execute("DELETE FROM productos WHERE codigo=?", (codigo_limpio,))
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
 
     def _set_estado(self, codigo, estado_objetivo):
         codigo_limpio = self._validar_codigo(codigo)
 
-        conn = self.db._get_conn()
-        try:
+        with self.db.transaction() as conn:
             conn.execute("UPDATE productos SET estado=? WHERE codigo=?", (estado_objetivo, codigo_limpio))
-            conn.commit()
-        finally:
-            conn.close()
+        self._invalidar_catalogo()
+
+    def _productos_en_memoria(self):
+        """{codigo: Producto} vigente, o None si no hay catálogo en memoria o se está en una transacción."""
+        if self.catalogo is None:
+            return None
+        conn = self.db._get_conn()
+        # Dentro de una transacción se consulta la base: puede haber cambios sin confirmar.
+        if conn.in_transaction:
+            return None
+        return self.catalogo.productos(self.db, conn)
+
+    def _invalidar_catalogo(self):
+        if self.catalogo is not None:
+            self.catalogo.invalidar()
 
     def _count_piezas_por_codigo_conn(self, conn, codigo):
         row = conn.execute(
@@ -219,3 +378,14 @@ class ProductService:
             raise ValueError(f"El {campo} no puede estar vacío")
 
         return valor_limpio
+
+
+def _consulta_fts(texto):
+    """'rib ey' -> '"rib"* "ey"*': cada palabra como prefijo; las comillas evitan la sintaxis de FTS5."""
+    palabras = re.findall(r"\w+", str(texto or ""))
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+def _siguiente_prefijo(prefijo):
+    """Menor texto mayor que todo lo que empieza con `prefijo`: '41' -> '42'."""
+    return prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
@@ -0,0 +1,60 @@
+# archivar.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.archivar                 -> archiva según [ARCHIVO] de config.ini
+#   python -m tools.archivar --dias 60       -> retención distinta a la configurada
+#   python -m tools.archivar --dry-run       -> solo lista los canales candidatos
+#   python -m tools.archivar --vacuum        -> compacta la base caliente al terminar
+import argparse
+import configparser
+import os
+import sys
+
+from archive_service import ArchiveService
+from db_manager import DatabaseManager
+
+CONFIG_FILE = "config.ini"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mueve canales CERRADOS antiguos al archivo histórico mensual.")
+    parser.add_argument("--dias", type=int, default=None, help="Días sin actividad (por defecto DIAS_RETENCION)")
+    parser.add_argument("--dry-run", action="store_true", help="Lista los candidatos sin mover nada")
+    parser.add_argument("--vacuum", action="store_true", help="Ejecuta VACUUM tras archivar")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    if os.path.exists(CONFIG_FILE):
+        config.read(CONFIG_FILE)
+
+    db = DatabaseManager(config=config)
+    # Si archivar() falla, su excepción sale tal cual (no un NameError al leer el reporte).
+    reporte = []
+    try:
+        servicio = ArchiveService(db)
+        dias = servicio.policy.dias_retencion if args.dias is None else args.dias
+        print("=" * 60)
+        print(f" ARCHIVO HISTÓRICO ({'simulación' if args.dry_run else 'ejecución'}, > {dias} días) ")
+        print("=" * 60)
+        reporte = servicio.archivar(dias=dias, dry_run=args.dry_run)
+        for r in reporte:
+            print(f"    [{r['estado']}] Canal {r['canal_id']} {r['siniiga']}: "
+                  f"{r['cajas']} cajas / {r['piezas']} pzas -> {r['archivo']}")
+        if not reporte:
+            print("    [OK] No hay canales para archivar.")
+
+        if args.vacuum and not args.dry_run and any(r['estado'] == 'ARCHIVADO' for r in reporte):
+            db.checkpoint("TRUNCATE")
+            conn = db._get_conn()
+            conn.execute("VACUUM")
+            # VACUUM puede renumerar el rowid de productos, que es la llave de productos_fts.
+            conn.execute("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
+            print("    [OK] Base caliente compactada.")
+        print("=" * 60)
+    finally:
+        db.close()
+
+    return 1 if any(r['estado'] == 'OMITIDO' for r in reporte) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# bench_db.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.bench_db                               -> 10k, 1M y 10M piezas, resultados en bench_db.json
+#   python -m tools.bench_db --tamanos 10000,1000000       -> solo esos tamaños
+#   python -m tools.bench_db --dir /datos/bench --regenerar
+# Cada tamaño se genera una vez con tools.generar_dataset y se reutiliza en
+# corridas siguientes. Las escrituras se miden dentro de una transacción que
+# se revierte: el dataset no cambia entre métodos ni entre corridas.
+import argparse
+import configparser
+import json
+import math
+import os
+import platform
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from box_service import BoxService
+from db_manager import DatabaseManager
+from piece_service import PieceService
+from product_service import ProductService
+from tools.generar_dataset import generar
+
+TAMANOS = (10_000, 1_000_000, 10_000_000)
+CAJAS_POR_CANAL = 8
+PIEZAS_POR_CAJA = 25
+CANALES_POR_DIA = 40
+# Auditorías que recorren todo: menos repeticiones.
+PESADOS = {"verificar_contadores_cajas", "verificar_resumen_canales", "verificar_produccion_diaria", "iter_canales"}
+
+
+class _SinHardware:
+    def print_master(self, *args, **kwargs):
+        pass
+
+
+def forma_dataset(piezas):
+    """(dias, canales_por_dia) para aproximar `piezas` con cajas de 8 x 25."""
+    por_canal = CAJAS_POR_CANAL * PIEZAS_POR_CAJA
+    canales = max(1, round(piezas / por_canal))
+    dias = max(1, math.ceil(canales / CANALES_POR_DIA))
+    return dias, max(1, round(canales / dias))
+
+
+def preparar(directorio, piezas, regenerar=False):
+    ruta = os.path.join(directorio, f"bench_{piezas}.db")
+    if regenerar or not os.path.exists(ruta):
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+        dias, canales_dia = forma_dataset(piezas)
+        print(f"[*] Generando {ruta} ({dias} días x {canales_dia} canales)...")
+        db = DatabaseManager(ruta)
+        try:
+            generar(db, dias=dias, canales_por_dia=canales_dia,
+                    cajas_por_canal=CAJAS_POR_CANAL, piezas_por_caja=PIEZAS_POR_CAJA)
+        finally:
+            db.close()
+    return ruta
+
+
+@contextmanager
+def revertir(db):
+    """Transacción exterior que se revierte: las escrituras anidadas no se confirman."""
+    conn = db._get_conn()
+    with db._write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        finally:
+            conn.rollback()
+
+
+def muestras(db):
+    """Ids representativos: lo de hoy (caliente) y lo más antiguo."""
+    conn = db._get_conn()
+    canal_hoy = conn.execute("SELECT id FROM canales WHERE estado='ACTIVO' ORDER BY id DESC LIMIT 1").fetchone()[0]
+    canal_viejo = conn.execute("SELECT MIN(id) FROM canales").fetchone()[0]
+    caja_abierta = conn.execute("SELECT id FROM cajas WHERE canal_id=? AND estado='ABIERTA'", (canal_hoy,)).fetchone()[0]
+    caja_vieja = conn.execute("SELECT MIN(id) FROM cajas WHERE canal_id=?", (canal_viejo,)).fetchone()[0]
+    pieza = conn.execute("SELECT MAX(id) FROM piezas WHERE caja_id=?", (caja_abierta,)).fetchone()[0]
+    codigos = [r[0] for r in conn.execute("SELECT codigo FROM productos ORDER BY codigo LIMIT 50")]
+    siniiga = conn.execute("SELECT siniiga FROM canales WHERE id=?", (canal_hoy,)).fetchone()[0]
+    return {
+        'canal_hoy': canal_hoy, 'canal_viejo': canal_viejo, 'caja_abierta': caja_abierta,
+        'caja_vieja': caja_vieja, 'pieza': pieza, 'codigos': codigos, 'siniiga': siniiga,
+    }
+
+
+def casos(db, m):
+    """[(nombre, fn, escribe)]: cada método público con argumentos realistas."""
+    productos = ProductService(db)
+    piezas = PieceService(db, productos)
+    cajas = BoxService(db, _SinHardware())
+    codigo = m['codigos'][0]
+    contenido = db.get_contenido_caja(m['caja_abierta'])
+    canal = db.get_canal_by_id(m['canal_hoy'])
+    return [
+        ("DatabaseManager.get_producto", lambda: db.get_producto(codigo), False),
+        ("DatabaseManager.get_all_productos", db.get_all_productos, False),
+        ("DatabaseManager.get_canales_activos", db.get_canales_activos, False),
+        ("DatabaseManager.get_all_canales", lambda: db.get_all_canales(incluir_cerrados=True), False),
+        ("DatabaseManager.iter_canales", lambda: list(db.iter_canales(incluir_cerrados=True)), False),
+        ("DatabaseManager.get_canal_by_id", lambda: db.get_canal_by_id(m['canal_hoy']), False),
+        ("DatabaseManager.buscar_o_crear_canal", lambda: db.buscar_o_crear_canal(m['siniiga']), False),
+        ("DatabaseManager.get_resumen_canal", lambda: db.get_resumen_canal(m['canal_hoy']), False),
+        ("DatabaseManager.get_max_numero_caja", lambda: db.get_max_numero_caja(m['canal_hoy']), False),
+        ("DatabaseManager.get_cajas_abiertas", lambda: db.get_cajas_abiertas(m['canal_hoy']), False),
+        ("DatabaseManager.get_all_cajas_canal", lambda: db.get_all_cajas_canal(m['canal_viejo']), False),
+        ("DatabaseManager.get_caja_by_id", lambda: db.get_caja_by_id(m['caja_abierta']), False),
+        ("DatabaseManager.get_contenido_caja", lambda: db.get_contenido_caja(m['caja_vieja']), False),
+        ("DatabaseManager.get_piezas_by_ids", lambda: db.get_piezas_by_ids([m['pieza']]), False),
+        ("DatabaseManager.get_pieza_by_id", lambda: db.get_pieza_by_id(m['pieza']), False),
+        ("DatabaseManager.get_estadisticas_generales", db.get_estadisticas_generales, False),
+        ("DatabaseManager.get_produccion_por_producto", db.get_produccion_por_producto, False),
+        ("DatabaseManager.get_estadisticas_dia", db.get_estadisticas_dia, False),
+        ("DatabaseManager.get_cambios_desde", lambda: db.get_cambios_desde(db.get_cursor_cambios()), False),
+        ("DatabaseManager.verificar_contadores_cajas", db.verificar_contadores_cajas, False),
+        ("DatabaseManager.verificar_resumen_canales", db.verificar_resumen_canales, False),
+        ("DatabaseManager.verificar_produccion_diaria", db.verificar_produccion_diaria, False),
+        ("DatabaseManager.registrar_pieza", lambda: db.registrar_pieza(m['caja_abierta'], codigo, "BENCH", 2.5), True),
+        ("DatabaseManager.registrar_pieza_etiqueta", lambda: db.registrar_pieza_etiqueta(m['caja_abierta'], codigo, 2.5), True),
+        ("DatabaseManager.registrar_piezas_bulk",
+         lambda: db.registrar_piezas_bulk(m['caja_abierta'], [(codigo, "BENCH", 1.5)] * 50), True),
+        ("DatabaseManager.editar_pieza", lambda: db.editar_pieza(m['pieza'], 3.1), True),
+        ("DatabaseManager.borrar_pieza", lambda: db.borrar_pieza(m['pieza']), True),
+        ("DatabaseManager.crear_o_recuperar_caja",
+         lambda: db.crear_o_recuperar_caja(m['canal_hoy'], db.get_max_numero_caja(m['canal_hoy']) + 1), True),
+        ("DatabaseManager.cerrar_caja", lambda: db.cerrar_caja(m['caja_abierta']), True),
+        ("ProductService.get_producto_activo", lambda: productos.get_producto_activo(codigo), False),
+        ("ProductService.get_productos_activos", lambda: productos.get_productos_activos(m['codigos']), False),
+        ("ProductService.get_all_productos", productos.get_all_productos, False),
+        ("PieceService.registrar_para_etiqueta",
+         lambda: piezas.registrar_para_etiqueta(m['caja_abierta'], codigo, 2.5), True),
+        ("PieceService.editar_pieza", lambda: piezas.editar_pieza(m['pieza'], 3.1), True),
+        ("BoxService.cerrar_caja", lambda: cajas.cerrar_caja(m['caja_abierta'], canal, contenido, None), True),
+    ]
+
+
+def medir(db, fn, escribe, repeticiones):
+    tiempos, filas = [], 0
+    for _ in range(repeticiones):
+        if escribe:
+            with revertir(db):
+                inicio = time.perf_counter()
+                resultado = fn()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        else:
+            inicio = time.perf_counter()
+            resultado = fn()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        filas = len(resultado) if isinstance(resultado, (list, dict)) else int(resultado is not None)
+    orden = sorted(tiempos)
+    return {
+        'repeticiones': repeticiones,
+        'filas': filas,
+        'min_ms': round(orden[0], 3),
+        'p50_ms': round(orden[len(orden) // 2], 3),
+        'p95_ms': round(orden[min(len(orden) - 1, int(len(orden) * 0.95))], 3),
+        'max_ms': round(orden[-1], 3),
+        'media_ms': round(sum(orden) / len(orden), 3),
+    }
+
+
+def correr(ruta, repeticiones, con_cache):
+    config = configparser.ConfigParser()
+    # Sin caché se mide la consulta real; con --cache, el caso de uso de la UI.
+    config["CACHE"] = {"ACTIVO": str(con_cache)}
+    db = DatabaseManager(ruta, config=config)
+    try:
+        conn = db._get_conn()
+        dataset = {
+            'piezas': conn.execute("SELECT COUNT(*) FROM piezas").fetchone()[0],
+            'cajas': conn.execute("SELECT COUNT(*) FROM cajas").fetchone()[0],
+            'canales': conn.execute("SELECT COUNT(*) FROM canales").fetchone()[0],
+            'tamano_mb': round(os.path.getsize(ruta) / 1024 / 1024, 1),
+        }
+        m = muestras(db)
+        metodos = {}
+        for nombre, fn, escribe in casos(db, m):
+            reps = max(1, repeticiones // 10) if nombre.split(".")[-1] in PESADOS else repeticiones
+            try:
+                metodos[nombre] = medir(db, fn, escribe, reps)
+            except (ValueError, RuntimeError, sqlite3.Error) as e:
+                metodos[nombre] = {'error': str(e)}
+            r = metodos[nombre]
+            estado = f"p50 {r['p50_ms']:>9.3f} ms  p95 {r['p95_ms']:>9.3f} ms" if 'p50_ms' in r else f"ERROR {r['error']}"
+            print(f"    {nombre:<46} {estado}")
+        return {'dataset': dataset, 'metodos': metodos}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide cada método de DatabaseManager y servicios a distintas escalas.")
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS), help="Piezas por dataset, separadas por coma")
+    parser.add_argument("--dir", default="bench_datos", help="Carpeta de los datasets generados")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--salida", default="bench_db.json")
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar los datasets existentes")
+    parser.add_argument("--cache", action="store_true", help="Mide con la caché de lecturas activa")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'cache': args.cache,
+        'resultados': {},
+    }
+    for piezas in (int(t) for t in args.tamanos.split(",") if t.strip()):
+        ruta = preparar(args.dir, piezas, args.regenerar)
+        print("=" * 60)
+        print(f" {piezas} PIEZAS ({ruta}) ")
+        print("=" * 60)
+        reporte['resultados'][str(piezas)] = correr(ruta, args.repeticiones, args.cache)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"✅ Resultados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# bench_filas.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.bench_filas                  -> 20000 piezas, 5 repeticiones
+#   python -m tools.bench_filas --piezas 100000  -> caja más grande
+# Compara dict(sqlite3.Row) contra las filas de db_rows (tiempo y memoria retenida)
+# sobre una base temporal; no toca produccion_local.db.
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from db_manager import DatabaseManager
+from db_rows import Pieza
+
+QUERY = "SELECT *, time(fecha_registro, 'localtime') as hora FROM piezas WHERE caja_id=? ORDER BY id DESC"
+
+
+def preparar(db, n):
+    db._get_conn().execute("INSERT OR IGNORE INTO productos (codigo, nombre, especie) VALUES ('99999','BENCH','RES')")
+    canal = db.buscar_o_crear_canal("0899999999")
+    caja_id = db.crear_o_recuperar_caja(canal['id'], 1)
+    db.registrar_piezas_bulk(caja_id, [("99999", "BENCH", 1.0 + (i % 50) / 10) for i in range(n)])
+    return caja_id
+
+
+def con_dict(db, caja_id):
+    return [dict(r) for r in db._get_conn().execute(QUERY, (caja_id,)).fetchall()]
+
+
+def con_filas(db, caja_id):
+    return db._consultar(Pieza, QUERY, (caja_id,)).fetchall()
+
+
+def medir(fn, db, caja_id, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn(db, caja_id)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    filas = fn(db, caja_id)
+    retenido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ms': round(min(tiempos), 2), 'kb': round(retenido / 1024, 1), 'filas': len(filas)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de filas: dict(sqlite3.Row) contra db_rows.")
+    parser.add_argument("--piezas", type=int, default=20000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        try:
+            caja_id = preparar(db, args.piezas)
+            # La caché de lecturas no interviene: se consulta directo.
+            resultados = {
+                'dict': medir(con_dict, db, caja_id, args.repeticiones),
+                'filas': medir(con_filas, db, caja_id, args.repeticiones),
+            }
+        finally:
+            db.close()
+
+    print("=" * 60)
+    print(f" CARGA DE {args.piezas} PIEZAS (mejor de {args.repeticiones}) ")
+    print("=" * 60)
+    for nombre, r in resultados.items():
+        print(f"    {nombre:<6} {r['ms']:>9.2f} ms   {r['kb']:>10.1f} KiB retenidos")
+    base, nuevo = resultados['dict'], resultados['filas']
+    print(f"    Memoria: {100 * (1 - nuevo['kb'] / base['kb']):.0f}% menos | "
+          f"Tiempo: {100 * (1 - nuevo['ms'] / base['ms']):.0f}% menos")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+# bench_pipeline.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.bench_pipeline                        -> 2000 piezas en cajas de 10, resultados en bench_pipeline.json
+#   python -m tools.bench_pipeline --piezas 10000 --dias 30
+#   python -m tools.bench_pipeline --pausa-ms 800         -> con el ritmo de un operario entre piezas
+# Recorre el flujo real de la estación sin pantalla (Qt offscreen): báscula
+# simulada con las lecturas de ScaleWorker, escaneo -> logic_validate_product
+# -> save_and_print_piece y, al llenar cada caja, close_box_flow. Las etiquetas
+# van a un archivo temporal (ImpresoraArchivo) en lugar de win32print. La base
+# es temporal (tools.generar_dataset); no toca produccion_local.db.
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import configparser
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import PySide6
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QApplication, QMessageBox
+
+import hardware
+from db_manager import BASE_DIR, DB_FILE, DatabaseManager
+from main_ui import MainUI
+from peso_policy import resolver_peso_cierre
+from tools.generar_dataset import catalogo, generar, siniiga_num
+
+PIEZAS = 2000
+PIEZAS_POR_CAJA = 10
+CAJAS_POR_CANAL = 8
+# Un indicador de báscula típico manda ~10 lecturas por segundo.
+BASCULA_MS = 100
+LATIDO_MS = 5
+# Más de un cuadro a 60 Hz sin atender eventos: el operario lo nota.
+UMBRAL_BLOQUEO_MS = 16
+ESPERA_LECTURA_S = 2
+
+
+class BasculaSimulada(hardware.ScaleWorker):
+    """ScaleWorker sin puerto serie: arma las líneas del indicador y las
+    interpreta con el mismo patrón. Emite al colocar una pieza y luego cada
+    `intervalo_ms`, como una báscula en modo continuo."""
+
+    def __init__(self, intervalo_ms=BASCULA_MS):
+        super().__init__("SIMULADA")
+        self.intervalo_s = intervalo_ms / 1000
+        self._peso = 0.0
+        self._cambio = threading.Event()
+
+    def colocar(self, peso):
+        self._peso = peso
+        self._cambio.set()
+
+    def run(self):
+        self.status_changed.emit("✅ CONECTADO: SIMULADA")
+        while self.is_running:
+            # Se limpia antes de leer el peso: una pieza colocada después despierta la espera.
+            self._cambio.clear()
+            linea = f"ST,GS,{self._peso:>8.2f},kg"
+            match = self.pattern.search(linea)
+            if match:
+                self.weight_received.emit(float(match.group(1)))
+            self._cambio.wait(self.intervalo_s)
+
+    def stop(self):
+        self.is_running = False
+        self._cambio.set()
+        self.wait()
+
+
+class Cronometro:
+    def __init__(self):
+        self.tiempos = {}
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.agregar(etapa, time.perf_counter() - inicio)
+
+    def agregar(self, etapa, segundos):
+        self.tiempos.setdefault(etapa, []).append(segundos * 1000)
+
+    def resumen(self):
+        return {etapa: percentiles(t) for etapa, t in self.tiempos.items()}
+
+
+def percentiles(tiempos):
+    orden = sorted(tiempos)
+
+    def p(q):
+        return round(orden[min(len(orden) - 1, int(len(orden) * q))], 3)
+
+    return {
+        'n': len(orden),
+        'p50_ms': p(0.50),
+        'p95_ms': p(0.95),
+        'p99_ms': p(0.99),
+        'max_ms': round(orden[-1], 3),
+        'media_ms': round(sum(orden) / len(orden), 3),
+    }
+
+
+class ImpresoraArchivo(hardware.HardwareManager):
+    """HardwareManager que agrega cada etiqueta ZPL a un archivo: mismo armado de ZPL, sin impresora."""
+
+    def __init__(self, archivo_zpl):
+        self.printer_name = archivo_zpl
+        self.archivo_zpl = archivo_zpl
+
+    def send_raw_zpl(self, zpl_code):
+        try:
+            with open(self.archivo_zpl, "a", encoding="utf-8") as f:
+                f.write(zpl_code + "\n")
+            return True, "OK"
+        except OSError as e:
+            return False, f"Fallo al escribir '{self.archivo_zpl}': {e}"
+
+
+class EstacionBench(MainUI):
+    """MainUI con la báscula simulada, impresora a archivo y el diálogo de cierre aceptado con la suma propuesta."""
+
+    def __init__(self, config, bascula, crono, archivo_zpl):
+        self._bascula = bascula
+        self.crono = crono
+        super().__init__(config)
+        self.hw_mgr = ImpresoraArchivo(archivo_zpl)
+        self.box_service.hw_mgr = self.hw_mgr
+
+    def _crear_bascula(self):
+        return self._bascula
+
+    def _request_manual_override(self, peso_calc):
+        # El operario confirma con Enter el peso que propone el diálogo.
+        return resolver_peso_cierre(peso_calc, peso_calc)
+
+    def _register_piece(self, final_w):
+        with self.crono.medir("registrar (bd)"):
+            return super()._register_piece(final_w)
+
+    def _print_piece(self, registro):
+        with self.crono.medir("imprimir etiqueta"):
+            super()._print_piece(registro)
+
+    def _post_print_refresh(self, registro):
+        with self.crono.medir("refrescar pantalla"):
+            super()._post_print_refresh(registro)
+
+    def _ejecutar_cierre_caja(self, peso_final, contenido):
+        with self.crono.medir("cerrar caja (bd + master)"):
+            super()._ejecutar_cierre_caja(peso_final, contenido)
+
+
+class Latido:
+    """Timer de LATIDO_MS en el hilo de la GUI: cada retraso mide cuánto estuvo bloqueado el bucle de eventos."""
+
+    def __init__(self, intervalo_ms=LATIDO_MS):
+        self.intervalo_ms = intervalo_ms
+        self.huecos = []
+        self._ultimo = None
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+
+    def iniciar(self):
+        self._ultimo = time.perf_counter()
+        self.timer.start(self.intervalo_ms)
+
+    def detener(self):
+        self.timer.stop()
+
+    def _tick(self):
+        ahora = time.perf_counter()
+        self.huecos.append((ahora - self._ultimo) * 1000)
+        self._ultimo = ahora
+
+    def resumen(self, segundos):
+        bloqueos = [h - self.intervalo_ms for h in self.huecos if h > self.intervalo_ms + UMBRAL_BLOQUEO_MS]
+        total = sum(bloqueos)
+        return {
+            'latido_ms': self.intervalo_ms,
+            'umbral_ms': UMBRAL_BLOQUEO_MS,
+            'latidos': len(self.huecos),
+            'bloqueos': len(bloqueos),
+            'bloqueo_total_ms': round(total, 1),
+            'bloqueo_max_ms': round(max(bloqueos), 1) if bloqueos else 0.0,
+            'bloqueo_pct': round(100 * total / (segundos * 1000), 2) if segundos else None,
+            'hueco_p99_ms': percentiles(self.huecos)['p99_ms'] if self.huecos else None,
+        }
+
+
+class Recorrido:
+    """Avanza un paso por vuelta del bucle de eventos (QTimer de 0 ms): entre
+    pasos se atienden las señales de la báscula, el DBExecutor y los timers."""
+
+    def __init__(self, app, ui, bascula, crono, args, errores):
+        self.app = app
+        self.ui = ui
+        self.bascula = bascula
+        self.crono = crono
+        self.args = args
+        self.errores = errores
+        self.azar = random.Random(args.semilla)
+        self.codigos = [codigo for codigo, _, _ in catalogo()]
+        self.latido = Latido()
+        self.siguiente_siniiga = ui.db._get_conn().execute("SELECT COUNT(*) FROM canales").fetchone()[0]
+        self.piezas = 0
+        self.cajas = 0
+        self.en_caja = 0
+        self.num_caja = 0
+        self.inicio = None
+        self.segundos = None
+        self._accion = None
+        self._listo_en = 0.0
+        # Un solo timer continuo en lugar de uno por paso.
+        self._paso = QTimer()
+        self._paso.timeout.connect(self._avanzar)
+
+    def _programar(self, accion, ms=0):
+        self._accion = accion
+        self._listo_en = time.perf_counter() + ms / 1000
+
+    def _avanzar(self):
+        if self._accion and time.perf_counter() >= self._listo_en:
+            self._accion()
+
+    def iniciar(self):
+        self.ui.toggle_scale(True)
+        self.latido.iniciar()
+        self.inicio = time.perf_counter()
+        self._nuevo_canal()
+        self._programar(self._colocar)
+        self._paso.start(0)
+
+    def _nuevo_canal(self):
+        siniiga = f"08{siniiga_num(self.siguiente_siniiga):08d}"
+        self.siguiente_siniiga += 1
+        with self.crono.medir("abrir canal"):
+            self.ui._set_canal(self.ui.db.buscar_o_crear_canal(siniiga))
+        self.num_caja = 0
+        self._nueva_caja()
+
+    def _nueva_caja(self):
+        self.num_caja += 1
+        self.en_caja = 0
+        with self.crono.medir("abrir caja"):
+            self.ui._open_box(self.num_caja)
+
+    def _colocar(self):
+        if self.piezas >= self.args.piezas or self.errores:
+            self._terminar()
+            return
+        peso = round(self.azar.uniform(0.5, 8.0), 2)
+        # Una lectura igual a la anterior no se distinguiría en pantalla.
+        if f"{peso:.2f}" == self.ui.txt_weight.text():
+            peso += 0.01
+        self._esperado = f"{peso:.2f}"
+        self._colocado = time.perf_counter()
+        self.bascula.colocar(peso)
+        self._esperar_lectura()
+
+    def _esperar_lectura(self):
+        if self.ui.txt_weight.text() != self._esperado:
+            if time.perf_counter() - self._colocado > ESPERA_LECTURA_S:
+                self.errores.append(f"Báscula: la lectura {self._esperado} no llegó a la pantalla")
+                self._terminar()
+                return
+            self._programar(self._esperar_lectura)
+            return
+        self.crono.agregar("báscula -> pantalla", time.perf_counter() - self._colocado)
+        self._escanear()
+
+    def _escanear(self):
+        inicio = time.perf_counter()
+        self.ui.txt_prod.setText(self.azar.choice(self.codigos))
+        with self.crono.medir("validar producto"):
+            self.ui.logic_validate_product()
+        if not self.ui.state.current_product:
+            self.errores.append(f"Producto {self.ui.txt_prod.text()} no validó: {self.ui.lbl_prod_name.text()}")
+            self._terminar()
+            return
+        with self.crono.medir("registrar e imprimir"):
+            self.ui.save_and_print_piece()
+        self.crono.agregar("pieza (escaneo -> etiqueta)", time.perf_counter() - inicio)
+        self.piezas += 1
+        self.en_caja += 1
+
+        if self.en_caja >= self.args.piezas_caja:
+            with self.crono.medir("close_box_flow"):
+                self.ui.close_box_flow()
+            self.cajas += 1
+            if self.num_caja >= self.args.cajas_canal:
+                self._nuevo_canal()
+            else:
+                self._nueva_caja()
+        self._programar(self._colocar, self.args.pausa_ms)
+
+    def _terminar(self):
+        if self.segundos is not None:
+            return
+        self.segundos = time.perf_counter() - self.inicio
+        self._accion = None
+        self._paso.stop()
+        self.latido.detener()
+        self.ui.toggle_scale(False)
+        self.ui.close()
+        self.app.quit()
+
+
+def _sin_dialogos(errores):
+    # Sin pantalla un QMessageBox modal detendría el recorrido: se registra como error.
+    def registrar(_padre, titulo, texto, *args, **kwargs):
+        errores.append(f"{titulo}: {texto}")
+        return QMessageBox.Ok
+
+    for nombre in ("information", "warning", "critical"):
+        setattr(QMessageBox, nombre, staticmethod(registrar))
+
+
+def configuracion(con_cache):
+    config = configparser.ConfigParser()
+    # Mismo perfil de SQLite que la planta; modo y tareas de fondo fijos.
+    config.read(os.path.join(BASE_DIR, "config.ini"), encoding="utf-8")
+    for seccion in ("SISTEMA", "ARCHIVO", "METRICAS", "CACHE"):
+        if not config.has_section(seccion):
+            config.add_section(seccion)
+    config["SISTEMA"]["MODO_DEMO"] = "False"
+    config["ARCHIVO"]["AL_INICIAR"] = "False"
+    config["METRICAS"]["ACTIVO"] = "False"
+    config["CACHE"]["ACTIVO"] = str(con_cache)
+    return config
+
+
+def contar_etiquetas(archivo_zpl):
+    if not os.path.exists(archivo_zpl):
+        return 0, 0
+    with open(archivo_zpl, encoding="utf-8") as f:
+        etiquetas = [linea for linea in f if linea.startswith("^XA")]
+    masters = sum(1 for e in etiquetas if "CAJA No." in e)
+    return len(etiquetas) - masters, masters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el flujo escaneo -> peso -> registro -> etiqueta sin pantalla.")
+    parser.add_argument("--piezas", type=int, default=PIEZAS)
+    parser.add_argument("--piezas-caja", type=int, default=PIEZAS_POR_CAJA)
+    parser.add_argument("--cajas-canal", type=int, default=CAJAS_POR_CANAL)
+    parser.add_argument("--dias", type=int, default=7, help="Historial previo en la base (8000 piezas/día)")
+    parser.add_argument("--pausa-ms", type=int, default=0, help="Pausa entre piezas (0 = tan rápido como se pueda)")
+    parser.add_argument("--bascula-ms", type=int, default=BASCULA_MS, help="Intervalo entre lecturas de la báscula")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--sin-cache", action="store_true", help="Desactiva la caché de lecturas")
+    parser.add_argument("--salida", default="bench_pipeline.json")
+    args = parser.parse_args()
+    salida = os.path.abspath(args.salida)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    errores = []
+    _sin_dialogos(errores)
+    crono = Cronometro()
+    origen = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # MainUI abre DB_FILE en el directorio actual: aquí es la base temporal.
+        os.chdir(tmp)
+        try:
+            print(f"[*] Generando historial de {args.dias} días...")
+            db = DatabaseManager(DB_FILE)
+            try:
+                dataset = generar(db, dias=args.dias)
+            finally:
+                db.close()
+
+            archivo_zpl = os.path.join(tmp, "etiquetas.zpl")
+            bascula = BasculaSimulada(args.bascula_ms)
+            ui = EstacionBench(configuracion(not args.sin_cache), bascula, crono, archivo_zpl)
+            recorrido = Recorrido(app, ui, bascula, crono, args, errores)
+            QTimer.singleShot(0, recorrido.iniciar)
+            app.exec()
+            tickets, masters = contar_etiquetas(archivo_zpl)
+        finally:
+            os.chdir(origen)
+
+    segundos = recorrido.segundos
+    minutos = segundos / 60 if segundos else None
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'pyside6': PySide6.__version__,
+        'plataforma': platform.platform(),
+        'parametros': {k: v for k, v in vars(args).items() if k != 'salida'},
+        'dataset': dataset,
+        'piezas': recorrido.piezas,
+        'cajas': recorrido.cajas,
+        'etiquetas': tickets,
+        'etiquetas_master': masters,
+        'segundos': round(segundos, 2),
+        'etiquetas_min': round((tickets + masters) / minutos, 1) if minutos else None,
+        'piezas_min': round(recorrido.piezas / minutos, 1) if minutos else None,
+        'etapas': crono.resumen(),
+        'bucle_eventos': recorrido.latido.resumen(segundos),
+        'errores': errores,
+    }
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    bucle = reporte['bucle_eventos']
+    print("=" * 60)
+    print(f" FLUJO DE ESTACIÓN: {recorrido.piezas} piezas / {recorrido.cajas} cajas en {reporte['segundos']} s ")
+    print("=" * 60)
+    print(f"    Etiquetas/min: {reporte['etiquetas_min']} ({tickets} piezas + {masters} master)")
+    for etapa, r in reporte['etapas'].items():
+        print(f"    {etapa:<28} p50 {r['p50_ms']:>8.3f}  p95 {r['p95_ms']:>8.3f}  "
+              f"p99 {r['p99_ms']:>8.3f}  max {r['max_ms']:>8.3f} ms")
+    print(f"    Bucle de eventos bloqueado: {bucle['bloqueo_total_ms']} ms ({bucle['bloqueo_pct']}%), "
+          f"{bucle['bloqueos']} bloqueos > {UMBRAL_BLOQUEO_MS} ms, máximo {bucle['bloqueo_max_ms']} ms")
+    if errores:
+        print(f"❌ {len(errores)} error(es): {errores[0]}")
+    print(f"✅ Resultados en {args.salida}")
+    print("=" * 60)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
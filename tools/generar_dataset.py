@@ -0,0 +1,152 @@
+# generar_dataset.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.generar_dataset --salida prueba.db                 -> 30 días x 40 canales x 8 cajas x 25 piezas
+#   python -m tools.generar_dataset --salida prueba.db --dias 365      -> un año de producción
+#   python -m tools.generar_dataset --forzar                           -> reemplaza produccion_local.db
+# Crea la base con el esquema y las migraciones reales (DatabaseManager) y la
+# llena como lo haría la planta: canales y cajas de días pasados CERRADOS,
+# los del día ACTIVOS con su última caja ABIERTA. Los triggers de contadores,
+# resumen y producción diaria se ejecutan en cada inserción.
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from db_manager import DB_FILE, DatabaseManager
+from importar_productos import CLEAN_DATA
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+INICIO_TURNO_H = 6
+SEGUNDOS_TURNO = 10 * 3600
+
+
+def catalogo():
+    """[(codigo, nombre, especie)] de importar_productos.CLEAN_DATA, sin duplicados."""
+    productos = {}
+    for linea in CLEAN_DATA.strip().split("\n"):
+        partes = [p.strip() for p in linea.split(",")]
+        if len(partes) >= 3 and partes[0] and "Codigo" not in partes[0]:
+            productos.setdefault(partes[0], (partes[0], partes[1], partes[2]))
+    return list(productos.values())
+
+
+def generar(db, dias=30, canales_por_dia=40, cajas_por_canal=8, piezas_por_caja=25, semilla=1, progreso=None):
+    """Llena `db` y devuelve {'canales', 'cajas', 'piezas', 'segundos'}."""
+    azar = random.Random(semilla)
+    productos = catalogo()
+    inicio = time.perf_counter()
+    conn = db._get_conn()
+    # Solo durante la carga: una caída deja la base a medias, pero es sintética.
+    conn.execute("PRAGMA synchronous = OFF")
+
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO productos (codigo, nombre, especie) VALUES (?, ?, ?)", productos
+        )
+        siguiente_siniiga = conn.execute("SELECT COUNT(*) FROM canales").fetchone()[0]
+
+    hoy = datetime.now().date()
+    paso = max(1, SEGUNDOS_TURNO // max(1, canales_por_dia * cajas_por_canal * piezas_por_caja))
+    totales = {'canales': 0, 'cajas': 0, 'piezas': 0}
+    for d in range(dias - 1, -1, -1):
+        dia = hoy - timedelta(days=d)
+        es_hoy = d == 0
+        base = datetime.combine(dia, datetime.min.time()).astimezone() + timedelta(hours=INICIO_TURNO_H)
+        base = base.astimezone(timezone.utc).replace(tzinfo=None)
+        if es_hoy:
+            # Lo de hoy no puede quedar en el futuro.
+            base = min(base, datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=SEGUNDOS_TURNO))
+
+        with db.transaction() as conn:
+            for c in range(canales_por_dia):
+                t_canal = base + timedelta(seconds=c * SEGUNDOS_TURNO // canales_por_dia)
+                canal_id = conn.execute(
+                    "INSERT INTO canales (siniiga, lote_dia, fecha_creacion, estado) VALUES (?, ?, ?, ?)",
+                    (f"08{siniiga_num(siguiente_siniiga):08d}", dia.strftime("%d%m%y"),
+                     t_canal.strftime(FORMATO_FECHA), "ACTIVO" if es_hoy else "CERRADO"),
+                ).lastrowid
+                siguiente_siniiga += 1
+
+                t = t_canal
+                for n in range(1, cajas_por_canal + 1):
+                    caja_id = conn.execute(
+                        "INSERT INTO cajas (canal_id, numero_caja, fecha_apertura) VALUES (?, ?, ?)",
+                        (canal_id, n, t.strftime(FORMATO_FECHA)),
+                    ).lastrowid
+                    piezas = []
+                    for p in range(1, piezas_por_caja + 1):
+                        codigo, nombre, _ = productos[azar.randrange(len(productos))]
+                        t += timedelta(seconds=paso)
+                        piezas.append((caja_id, codigo, nombre, round(azar.uniform(0.4, 28.0), 2), p,
+                                       t.strftime(FORMATO_FECHA)))
+                    conn.executemany("""
+                        INSERT INTO piezas (caja_id, codigo_producto, nombre_producto, peso, consecutivo, fecha_registro)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, piezas)
+                    # Hoy la última caja de cada canal sigue abierta.
+                    if not (es_hoy and n == cajas_por_canal):
+                        conn.execute(
+                            "UPDATE cajas SET estado='CERRADA', fecha_cierre=? WHERE id=?",
+                            (t.strftime(FORMATO_FECHA), caja_id),
+                        )
+                totales['canales'] += 1
+                totales['cajas'] += cajas_por_canal
+                totales['piezas'] += cajas_por_canal * piezas_por_caja
+        if progreso:
+            progreso(dias - d, dias, totales)
+
+    with db.transaction() as conn:
+        # La bitácora es transitoria (se poda a los 7 días): una base real no la tendría llena.
+        conn.execute("DELETE FROM cambios")
+    conn = db._get_conn()
+    conn.execute("ANALYZE")
+    conn.execute(f"PRAGMA synchronous = {db.profile.synchronous}")
+    db.checkpoint("TRUNCATE")
+    totales['segundos'] = round(time.perf_counter() - inicio, 2)
+    return totales
+
+
+def siniiga_num(n):
+    # Dispersa los números para que no sean consecutivos (como los aretes reales).
+    return (n * 7919 + 1000003) % 100000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera una base de producción sintética con el esquema real.")
+    parser.add_argument("--salida", default=DB_FILE, help=f"Archivo a crear (por defecto {DB_FILE})")
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--canales-dia", type=int, default=40)
+    parser.add_argument("--cajas", type=int, default=8, help="Cajas por canal")
+    parser.add_argument("--piezas", type=int, default=25, help="Piezas por caja")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--forzar", action="store_true", help="Reemplaza el archivo si ya existe")
+    args = parser.parse_args()
+
+    if os.path.exists(args.salida):
+        if not args.forzar:
+            print(f"❌ {args.salida} ya existe (use --forzar para reemplazarlo).")
+            return 1
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(args.salida + sufijo):
+                os.remove(args.salida + sufijo)
+
+    def progreso(hechos, total, totales):
+        print(f"   ⏳ Día {hechos}/{total}: {totales['piezas']} piezas")
+
+    db = DatabaseManager(args.salida)
+    try:
+        totales = generar(db, args.dias, args.canales_dia, args.cajas, args.piezas, args.semilla, progreso)
+    finally:
+        db.close()
+
+    print("=" * 60)
+    print(f"✅ {args.salida}: {totales['canales']} canales / {totales['cajas']} cajas / "
+          f"{totales['piezas']} piezas en {totales['segundos']} s")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
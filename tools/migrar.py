@@ -0,0 +1,57 @@
+# migrar.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.migrar              -> aplica las migraciones pendientes
+#   python -m tools.migrar --dry-run    -> las ejecuta dentro de una transacción y revierte
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from db_manager import DB_FILE, MIGRATIONS_DIR
+from migration_runner import MigrationRunner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica las migraciones de tools/migrations.")
+    parser.add_argument("--db", default=DB_FILE, help=f"Base de datos (por defecto {DB_FILE})")
+    parser.add_argument("--dry-run", action="store_true", help="Valida y mide sin confirmar cambios")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ No existe la base de datos {args.db}")
+        return 1
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys = ON")
+    runner = MigrationRunner(conn, MIGRATIONS_DIR)
+    try:
+        migraciones = runner.discover()
+        print("=" * 60)
+        print(f" MIGRACIONES {'(DRY-RUN) ' if args.dry_run else ''}- {args.db}")
+        print("=" * 60)
+        print(f"[*] Versión actual: {runner.current_version()} / última disponible: "
+              f"{migraciones[-1].version if migraciones else 0}")
+
+        inicio = time.perf_counter()
+        reporte = runner.run(dry_run=args.dry_run)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        for r in reporte:
+            print(f"    [OK] {r['version']:03d}_{r['nombre']:<40} {r['duracion_ms']:>9.1f} ms")
+        if not reporte:
+            print("    [OK] Sin migraciones pendientes.")
+        print(f"[*] Tiempo total: {total_ms:.1f} ms")
+        if args.dry_run:
+            print("[*] DRY-RUN: cambios revertidos.")
+        print("=" * 60)
+    except sqlite3.Error as e:
+        print(f"❌ Error aplicando migraciones (sin cambios): {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
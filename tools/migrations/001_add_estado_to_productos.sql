@@ -1,3 +1,3 @@
 -- MIGRACION CONTROLADA: agregar columna estado a productos
--- Idempotencia: la verificación de existencia de columna se realiza en DatabaseManager
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
 ALTER TABLE productos ADD COLUMN estado TEXT NOT NULL DEFAULT 'ACTIVO';
@@ -0,0 +1,44 @@
+-- MIGRACION CONTROLADA: contadores de caja mantenidos por triggers
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- cajas.peso_acumulado / cajas.num_piezas reemplazan el SUM/COUNT sobre piezas
+-- en cada lectura de caja. Los triggers los mantienen exactos en cada
+-- INSERT/UPDATE/DELETE de piezas (incluye el borrado en cascada de cajas).
+ALTER TABLE cajas ADD COLUMN peso_acumulado REAL NOT NULL DEFAULT 0;
+ALTER TABLE cajas ADD COLUMN num_piezas INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill desde el contenido actual
+UPDATE cajas SET
+    peso_acumulado = COALESCE((SELECT SUM(p.peso) FROM piezas p WHERE p.caja_id = cajas.id), 0),
+    num_piezas = (SELECT COUNT(*) FROM piezas p WHERE p.caja_id = cajas.id);
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_contadores_ai
+AFTER INSERT ON piezas
+BEGIN
+    UPDATE cajas SET
+        peso_acumulado = peso_acumulado + NEW.peso,
+        num_piezas = num_piezas + 1
+    WHERE id = NEW.caja_id;
+END;
+
+-- Al quedar vacía la caja se fija 0 exacto para no arrastrar residuos de coma flotante
+CREATE TRIGGER IF NOT EXISTS trg_piezas_contadores_ad
+AFTER DELETE ON piezas
+BEGIN
+    UPDATE cajas SET
+        peso_acumulado = CASE WHEN num_piezas <= 1 THEN 0 ELSE peso_acumulado - OLD.peso END,
+        num_piezas = num_piezas - 1
+    WHERE id = OLD.caja_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_contadores_au
+AFTER UPDATE OF peso, caja_id ON piezas
+BEGIN
+    UPDATE cajas SET
+        peso_acumulado = CASE WHEN num_piezas <= 1 THEN 0 ELSE peso_acumulado - OLD.peso END,
+        num_piezas = num_piezas - 1
+    WHERE id = OLD.caja_id;
+    UPDATE cajas SET
+        peso_acumulado = peso_acumulado + NEW.peso,
+        num_piezas = num_piezas + 1
+    WHERE id = NEW.caja_id;
+END;
@@ -0,0 +1,91 @@
+-- MIGRACION CONTROLADA: resumen por canal mantenido por triggers
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- Una fila por canal con totales de cajas, peso y piezas. Se alimenta de los
+-- contadores de cajas (003): piezas -> cajas -> resumen_canales.
+CREATE TABLE IF NOT EXISTS resumen_canales (
+    canal_id INTEGER PRIMARY KEY,
+    total_cajas INTEGER NOT NULL DEFAULT 0,
+    cajas_abiertas INTEGER NOT NULL DEFAULT 0,
+    cajas_cerradas INTEGER NOT NULL DEFAULT 0,
+    peso_total REAL NOT NULL DEFAULT 0,
+    num_piezas INTEGER NOT NULL DEFAULT 0,
+    ultima_actividad DATETIME,
+
+    FOREIGN KEY (canal_id) REFERENCES canales(id)
+        ON DELETE CASCADE
+);
+
+-- Backfill desde el estado actual
+INSERT OR REPLACE INTO resumen_canales
+    (canal_id, total_cajas, cajas_abiertas, cajas_cerradas, peso_total, num_piezas, ultima_actividad)
+SELECT
+    cn.id,
+    COUNT(c.id),
+    COALESCE(SUM(c.estado = 'ABIERTA'), 0),
+    COALESCE(SUM(c.estado = 'CERRADA'), 0),
+    COALESCE(SUM(c.peso_acumulado), 0),
+    COALESCE(SUM(c.num_piezas), 0),
+    MAX(
+        COALESCE(cn.fecha_creacion, ''),
+        COALESCE(MAX(c.fecha_apertura), ''),
+        COALESCE(MAX(c.fecha_cierre), ''),
+        COALESCE((SELECT MAX(p.fecha_registro) FROM piezas p JOIN cajas c2 ON c2.id = p.caja_id
+                  WHERE c2.canal_id = cn.id), '')
+    )
+FROM canales cn
+LEFT JOIN cajas c ON c.canal_id = cn.id
+GROUP BY cn.id;
+
+CREATE TRIGGER IF NOT EXISTS trg_canales_resumen_ai
+AFTER INSERT ON canales
+BEGIN
+    INSERT OR IGNORE INTO resumen_canales (canal_id, ultima_actividad)
+    VALUES (NEW.id, COALESCE(NEW.fecha_creacion, CURRENT_TIMESTAMP));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cajas_resumen_ai
+AFTER INSERT ON cajas
+BEGIN
+    UPDATE resumen_canales SET
+        total_cajas = total_cajas + 1,
+        cajas_abiertas = cajas_abiertas + (NEW.estado = 'ABIERTA'),
+        cajas_cerradas = cajas_cerradas + (NEW.estado = 'CERRADA'),
+        peso_total = peso_total + NEW.peso_acumulado,
+        num_piezas = num_piezas + NEW.num_piezas,
+        ultima_actividad = CURRENT_TIMESTAMP
+    WHERE canal_id = NEW.canal_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cajas_resumen_ad
+AFTER DELETE ON cajas
+BEGIN
+    UPDATE resumen_canales SET
+        total_cajas = total_cajas - 1,
+        cajas_abiertas = cajas_abiertas - (OLD.estado = 'ABIERTA'),
+        cajas_cerradas = cajas_cerradas - (OLD.estado = 'CERRADA'),
+        peso_total = CASE WHEN num_piezas - OLD.num_piezas <= 0 THEN 0 ELSE peso_total - OLD.peso_acumulado END,
+        num_piezas = num_piezas - OLD.num_piezas,
+        ultima_actividad = CURRENT_TIMESTAMP
+    WHERE canal_id = OLD.canal_id;
+END;
+
+-- Cubre cambios de estado (cerrar/reabrir) y de contadores (cada pieza)
+CREATE TRIGGER IF NOT EXISTS trg_cajas_resumen_au
+AFTER UPDATE OF estado, peso_acumulado, num_piezas, canal_id ON cajas
+BEGIN
+    UPDATE resumen_canales SET
+        cajas_abiertas = cajas_abiertas - (OLD.estado = 'ABIERTA'),
+        cajas_cerradas = cajas_cerradas - (OLD.estado = 'CERRADA'),
+        total_cajas = total_cajas - 1,
+        peso_total = CASE WHEN num_piezas - OLD.num_piezas <= 0 THEN 0 ELSE peso_total - OLD.peso_acumulado END,
+        num_piezas = num_piezas - OLD.num_piezas
+    WHERE canal_id = OLD.canal_id;
+    UPDATE resumen_canales SET
+        cajas_abiertas = cajas_abiertas + (NEW.estado = 'ABIERTA'),
+        cajas_cerradas = cajas_cerradas + (NEW.estado = 'CERRADA'),
+        total_cajas = total_cajas + 1,
+        peso_total = peso_total + NEW.peso_acumulado,
+        num_piezas = num_piezas + NEW.num_piezas,
+        ultima_actividad = CURRENT_TIMESTAMP
+    WHERE canal_id = NEW.canal_id;
+END;
@@ -0,0 +1,53 @@
+-- MIGRACION CONTROLADA: índice por fecha y acumulado diario de producción
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- fecha_registro se guarda en UTC (CURRENT_TIMESTAMP); el día operativo es el
+-- día local, por eso el acumulado se agrupa con date(..., 'localtime').
+CREATE INDEX IF NOT EXISTS idx_piezas_fecha_registro
+ON piezas(fecha_registro);
+
+CREATE TABLE IF NOT EXISTS produccion_diaria (
+    dia TEXT NOT NULL,              -- YYYY-MM-DD (hora local)
+    codigo_producto TEXT NOT NULL,
+    piezas INTEGER NOT NULL DEFAULT 0,
+    peso REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, codigo_producto)
+) WITHOUT ROWID;
+
+-- Backfill desde el histórico
+INSERT OR REPLACE INTO produccion_diaria (dia, codigo_producto, piezas, peso)
+SELECT date(fecha_registro, 'localtime'), codigo_producto, COUNT(*), SUM(peso)
+FROM piezas
+GROUP BY date(fecha_registro, 'localtime'), codigo_producto;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_diaria_ai
+AFTER INSERT ON piezas
+BEGIN
+    INSERT INTO produccion_diaria (dia, codigo_producto, piezas, peso)
+    VALUES (date(NEW.fecha_registro, 'localtime'), NEW.codigo_producto, 1, NEW.peso)
+    ON CONFLICT(dia, codigo_producto) DO UPDATE SET
+        piezas = piezas + 1,
+        peso = peso + excluded.peso;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_diaria_ad
+AFTER DELETE ON piezas
+BEGIN
+    UPDATE produccion_diaria SET
+        peso = CASE WHEN piezas <= 1 THEN 0 ELSE peso - OLD.peso END,
+        piezas = piezas - 1
+    WHERE dia = date(OLD.fecha_registro, 'localtime') AND codigo_producto = OLD.codigo_producto;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_diaria_au
+AFTER UPDATE OF peso, codigo_producto, fecha_registro ON piezas
+BEGIN
+    UPDATE produccion_diaria SET
+        peso = CASE WHEN piezas <= 1 THEN 0 ELSE peso - OLD.peso END,
+        piezas = piezas - 1
+    WHERE dia = date(OLD.fecha_registro, 'localtime') AND codigo_producto = OLD.codigo_producto;
+    INSERT INTO produccion_diaria (dia, codigo_producto, piezas, peso)
+    VALUES (date(NEW.fecha_registro, 'localtime'), NEW.codigo_producto, 1, NEW.peso)
+    ON CONFLICT(dia, codigo_producto) DO UPDATE SET
+        piezas = piezas + 1,
+        peso = peso + excluded.peso;
+END;
@@ -0,0 +1,37 @@
+-- MIGRACION CONTROLADA: índice de canales archivados en frío
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- archive_service mueve canales CERRADOS antiguos (con sus cajas y piezas) a
+-- archivo/produccion_AAAA_MM.db. Aquí queda una fila por canal para saber en
+-- qué archivo buscarlo y qué rangos de ids de caja/pieza contiene.
+CREATE TABLE IF NOT EXISTS archivo_canales (
+    canal_id INTEGER PRIMARY KEY,
+    siniiga TEXT NOT NULL,
+    lote_dia TEXT NOT NULL,
+    fecha_creacion DATETIME,
+    archivo TEXT NOT NULL,          -- nombre del archivo mensual, relativo a [ARCHIVO] DIRECTORIO
+    total_cajas INTEGER NOT NULL DEFAULT 0,
+    peso_total REAL NOT NULL DEFAULT 0,
+    num_piezas INTEGER NOT NULL DEFAULT 0,
+    ultima_actividad DATETIME,
+    caja_id_min INTEGER,
+    caja_id_max INTEGER,
+    pieza_id_min INTEGER,
+    pieza_id_max INTEGER,
+    archivado_en DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archivo_canales_cajas
+ON archivo_canales(caja_id_min, caja_id_max);
+
+CREATE INDEX IF NOT EXISTS idx_archivo_canales_piezas
+ON archivo_canales(pieza_id_min, pieza_id_max);
+
+-- Aporte de las piezas archivadas a produccion_diaria: el acumulado diario no
+-- se descuenta al archivar y la verificación lo suma a las piezas vivas.
+CREATE TABLE IF NOT EXISTS produccion_diaria_archivada (
+    dia TEXT NOT NULL,
+    codigo_producto TEXT NOT NULL,
+    piezas INTEGER NOT NULL DEFAULT 0,
+    peso REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, codigo_producto)
+) WITHOUT ROWID;
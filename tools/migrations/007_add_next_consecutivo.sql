@@ -0,0 +1,50 @@
+-- MIGRACION CONTROLADA: secuencia de consecutivo por caja
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- cajas.next_consecutivo reemplaza el SELECT MAX(consecutivo) de cada registro.
+-- Conserva la regla anterior (MAX + 1): borrar la última pieza libera su
+-- número, borrar una intermedia deja el hueco.
+ALTER TABLE cajas ADD COLUMN next_consecutivo INTEGER NOT NULL DEFAULT 1;
+
+-- Backfill desde el contenido actual
+UPDATE cajas SET
+    next_consecutivo = COALESCE((SELECT MAX(p.consecutivo) FROM piezas p WHERE p.caja_id = cajas.id), 0) + 1;
+
+-- Los contadores de 003 ya actualizan la fila de la caja en cada INSERT/DELETE:
+-- se redefinen para mover la secuencia en el mismo UPDATE.
+DROP TRIGGER IF EXISTS trg_piezas_contadores_ai;
+CREATE TRIGGER trg_piezas_contadores_ai
+AFTER INSERT ON piezas
+BEGIN
+    UPDATE cajas SET
+        peso_acumulado = peso_acumulado + NEW.peso,
+        num_piezas = num_piezas + 1,
+        next_consecutivo = MAX(next_consecutivo, NEW.consecutivo + 1)
+    WHERE id = NEW.caja_id;
+END;
+
+-- Solo al borrar la última pieza se busca el nuevo máximo (índice UNIQUE(caja_id, consecutivo))
+DROP TRIGGER IF EXISTS trg_piezas_contadores_ad;
+CREATE TRIGGER trg_piezas_contadores_ad
+AFTER DELETE ON piezas
+BEGIN
+    UPDATE cajas SET
+        peso_acumulado = CASE WHEN num_piezas <= 1 THEN 0 ELSE peso_acumulado - OLD.peso END,
+        num_piezas = num_piezas - 1,
+        next_consecutivo = CASE
+            WHEN OLD.consecutivo + 1 = next_consecutivo
+            THEN COALESCE((SELECT MAX(p.consecutivo) FROM piezas p WHERE p.caja_id = OLD.caja_id), 0) + 1
+            ELSE next_consecutivo
+        END
+    WHERE id = OLD.caja_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_consecutivo_au
+AFTER UPDATE OF caja_id, consecutivo ON piezas
+BEGIN
+    UPDATE cajas SET
+        next_consecutivo = COALESCE((SELECT MAX(p.consecutivo) FROM piezas p WHERE p.caja_id = OLD.caja_id), 0) + 1
+    WHERE id = OLD.caja_id;
+    UPDATE cajas SET
+        next_consecutivo = MAX(next_consecutivo, NEW.consecutivo + 1)
+    WHERE id = NEW.caja_id;
+END;
@@ -0,0 +1,88 @@
+-- MIGRACION CONTROLADA: bitácora de cambios para refresco incremental
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- Cada INSERT/UPDATE/DELETE de canales, cajas y piezas deja una fila en
+-- cambios. cambios.id es el cursor: las pantallas piden "lo posterior a N" y
+-- aplican solo esos deltas. La actualización de contadores de caja no se
+-- registra (ya la implica el cambio de la pieza).
+CREATE TABLE IF NOT EXISTS cambios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entidad TEXT NOT NULL,          -- 'canal' | 'caja' | 'pieza'
+    entidad_id INTEGER NOT NULL,
+    operacion TEXT NOT NULL,        -- 'I' | 'U' | 'D'
+    canal_id INTEGER,
+    caja_id INTEGER,
+    fecha DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+    CHECK (entidad IN ('canal','caja','pieza')),
+    CHECK (operacion IN ('I','U','D'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_cambios_fecha
+ON cambios(fecha);
+
+-- CANALES
+CREATE TRIGGER IF NOT EXISTS trg_canales_cambios_ai
+AFTER INSERT ON canales
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id) VALUES ('canal', NEW.id, 'I', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_canales_cambios_au
+AFTER UPDATE ON canales
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id) VALUES ('canal', NEW.id, 'U', NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_canales_cambios_ad
+AFTER DELETE ON canales
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id) VALUES ('canal', OLD.id, 'D', OLD.id);
+END;
+
+-- CAJAS
+CREATE TRIGGER IF NOT EXISTS trg_cajas_cambios_ai
+AFTER INSERT ON cajas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('caja', NEW.id, 'I', NEW.canal_id, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cajas_cambios_au
+AFTER UPDATE OF canal_id, numero_caja, peso_tara, fecha_cierre, estado ON cajas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('caja', NEW.id, 'U', NEW.canal_id, NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cajas_cambios_ad
+AFTER DELETE ON cajas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('caja', OLD.id, 'D', OLD.canal_id, OLD.id);
+END;
+
+-- PIEZAS
+CREATE TRIGGER IF NOT EXISTS trg_piezas_cambios_ai
+AFTER INSERT ON piezas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('pieza', NEW.id, 'I', (SELECT canal_id FROM cajas WHERE id = NEW.caja_id), NEW.caja_id);
+END;
+
+-- Si la pieza cambia de caja, la caja anterior recibe además un 'D'
+CREATE TRIGGER IF NOT EXISTS trg_piezas_cambios_au
+AFTER UPDATE ON piezas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    SELECT 'pieza', OLD.id, 'D', (SELECT canal_id FROM cajas WHERE id = OLD.caja_id), OLD.caja_id
+    WHERE OLD.caja_id != NEW.caja_id;
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('pieza', NEW.id, 'U', (SELECT canal_id FROM cajas WHERE id = NEW.caja_id), NEW.caja_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_cambios_ad
+AFTER DELETE ON piezas
+BEGIN
+    INSERT INTO cambios (entidad, entidad_id, operacion, canal_id, caja_id)
+    VALUES ('pieza', OLD.id, 'D', (SELECT canal_id FROM cajas WHERE id = OLD.caja_id), OLD.caja_id);
+END;
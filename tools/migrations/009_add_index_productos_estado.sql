@@ -0,0 +1,7 @@
+-- MIGRACION CONTROLADA: índice del catálogo activo
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- get_all_productos / listados del catálogo filtran por estado y ordenan por
+-- código: con (estado, codigo) la consulta es un SEARCH ya ordenado.
+-- Señalado por tools/verificar_planes.py.
+CREATE INDEX IF NOT EXISTS idx_productos_estado_codigo
+ON productos(estado, codigo);
@@ -0,0 +1,29 @@
+-- MIGRACION CONTROLADA: sello de versión del catálogo de productos
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- Cualquier INSERT/UPDATE/DELETE en productos incrementa catalogo_version.version
+-- (desde la UI, importar_productos.py o un script). ProductService guarda el
+-- catálogo en memoria y solo lo recarga cuando la versión cambió.
+CREATE TABLE IF NOT EXISTS catalogo_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO catalogo_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_version_ai
+AFTER INSERT ON productos
+BEGIN
+    UPDATE catalogo_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_version_au
+AFTER UPDATE ON productos
+BEGIN
+    UPDATE catalogo_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_version_ad
+AFTER DELETE ON productos
+BEGIN
+    UPDATE catalogo_version SET version = version + 1 WHERE id = 1;
+END;
@@ -0,0 +1,42 @@
+-- MIGRACION CONTROLADA: búsqueda de texto completo en el catálogo
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- productos_fts indexa codigo, nombre y especie de productos (tabla de
+-- contenido externo: el texto vive en productos, el índice usa su rowid).
+-- unicode61 con remove_diacritics 2 pliega acentos y Ñ: 'rinon' encuentra
+-- 'RIÑON'. Los triggers lo mantienen al día; un cambio de estado no lo toca.
+-- VACUUM puede renumerar el rowid de productos: tools/archivar.py reconstruye
+-- el índice después de compactar.
+CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+    codigo, nombre, especie,
+    content='productos',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+-- Ranking por defecto: pesa más coincidir en el código que en el nombre o la especie.
+INSERT INTO productos_fts (productos_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)');
+
+INSERT INTO productos_fts (productos_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ai
+AFTER INSERT ON productos
+BEGIN
+    INSERT INTO productos_fts (rowid, codigo, nombre, especie)
+    VALUES (NEW.rowid, NEW.codigo, NEW.nombre, NEW.especie);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_fts_au
+AFTER UPDATE OF codigo, nombre, especie ON productos
+BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, codigo, nombre, especie)
+    VALUES ('delete', OLD.rowid, OLD.codigo, OLD.nombre, OLD.especie);
+    INSERT INTO productos_fts (rowid, codigo, nombre, especie)
+    VALUES (NEW.rowid, NEW.codigo, NEW.nombre, NEW.especie);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ad
+AFTER DELETE ON productos
+BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, codigo, nombre, especie)
+    VALUES ('delete', OLD.rowid, OLD.codigo, OLD.nombre, OLD.especie);
+END;
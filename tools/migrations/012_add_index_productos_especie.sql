@@ -0,0 +1,6 @@
+-- MIGRACION CONTROLADA: índice del catálogo por especie
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- ProductService.cambiar_en_lote selecciona productos por especie (p. ej.
+-- desactivar todo CERDO): con (especie, codigo) es un SEARCH ya ordenado.
+CREATE INDEX IF NOT EXISTS idx_productos_especie_codigo
+ON productos(especie, codigo);
@@ -0,0 +1,38 @@
+-- MIGRACION CONTROLADA: integridad piezas -> productos
+-- Idempotencia: migration_runner la registra en schema_version y no la repite
+-- Equivale a la FOREIGN KEY (codigo_producto) REFERENCES productos(codigo)
+-- ON DELETE RESTRICT de historico/20260224_add_fk_piezas_productos.sql sin
+-- reconstruir piezas (la reconstrucción perdería las columnas y triggers de
+-- 003-012, y una FK fallaría al copiar piezas huérfanas de bases antiguas:
+-- esas se conservan). Usa idx_piezas_codigo_producto (002).
+-- Cambiar el código de un producto con piezas también se rechaza, igual que
+-- ProductService.change_codigo.
+CREATE TRIGGER IF NOT EXISTS trg_productos_restrict_bd
+BEFORE DELETE ON productos
+WHEN EXISTS (SELECT 1 FROM piezas WHERE codigo_producto = OLD.codigo)
+BEGIN
+    SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed: el producto tiene piezas registradas');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_productos_restrict_bu
+BEFORE UPDATE OF codigo ON productos
+WHEN NEW.codigo IS NOT OLD.codigo
+    AND EXISTS (SELECT 1 FROM piezas WHERE codigo_producto = OLD.codigo)
+BEGIN
+    SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed: el producto tiene piezas registradas');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_producto_bi
+BEFORE INSERT ON piezas
+WHEN NOT EXISTS (SELECT 1 FROM productos WHERE codigo = NEW.codigo_producto)
+BEGIN
+    SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed: producto inexistente');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_piezas_producto_bu
+BEFORE UPDATE OF codigo_producto ON piezas
+WHEN NEW.codigo_producto IS NOT OLD.codigo_producto
+    AND NOT EXISTS (SELECT 1 FROM productos WHERE codigo = NEW.codigo_producto)
+BEGIN
+    SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed: producto inexistente');
+END;
@@ -0,0 +1,282 @@
+# stress_concurrencia.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.stress_concurrencia                         -> 4 estaciones + importador durante 20 s, resultados en stress_concurrencia.json
+#   python -m tools.stress_concurrencia --estaciones 8 --segundos 60
+#   python -m tools.stress_concurrencia --reintentos 0          -> solo busy_timeout, para comparar
+#   python -m tools.stress_concurrencia --sin-importador
+# Varios procesos escriben a la vez sobre una base temporal con el perfil [DB]
+# de config.ini: cada estación registra piezas (PieceService.registrar_para_etiqueta)
+# y cierra su caja (BoxService.cerrar_caja) cada N piezas; el importador repite
+# transacciones largas sobre el catálogo (upsert fila por fila). Mide
+# rendimiento y latencia de cola por operación, los reintentos por bloqueo, y
+# al final verifica que contadores y resúmenes cuadren.
+import argparse
+import configparser
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from box_service import BoxService
+from db_manager import BASE_DIR, DatabaseManager
+from db_profile import BaseOcupadaError
+from peso_policy import calcular_peso_caja
+from piece_service import PieceService
+from product_service import ProductService
+from tools.generar_dataset import catalogo, generar
+
+ESTACIONES = 4
+SEGUNDOS = 20
+PIEZAS_POR_CAJA = 25
+CLAVES_DB = ("BUSY_TIMEOUT_MS", "REINTENTOS_BLOQUEO", "REINTENTO_BASE_MS", "REINTENTO_MAX_MS")
+
+
+class _SinImpresora:
+    def print_master(self, *args, **kwargs):
+        pass
+
+
+def configuracion(db_conf):
+    config = configparser.ConfigParser()
+    config.read(os.path.join(BASE_DIR, "config.ini"), encoding="utf-8")
+    if not config.has_section("DB"):
+        config.add_section("DB")
+    for clave, valor in db_conf.items():
+        config["DB"][clave] = str(valor)
+    return config
+
+
+class Medidor:
+    def __init__(self):
+        self.tiempos = {}
+        self.errores = {}
+
+    def medir(self, operacion, fn, *args):
+        inicio = time.perf_counter()
+        try:
+            resultado = fn(*args)
+        except (BaseOcupadaError, sqlite3.OperationalError, ValueError) as e:
+            clave = f"{operacion}: {type(e).__name__}"
+            self.errores[clave] = self.errores.get(clave, 0) + 1
+            return None
+        self.tiempos.setdefault(operacion, []).append((time.perf_counter() - inicio) * 1000)
+        return resultado
+
+
+def estacion(ruta, db_conf, n, segundos, piezas_caja, barrera, cola):
+    """Proceso de una estación: registra piezas y cierra cajas hasta que se acaba el tiempo."""
+    db = DatabaseManager(ruta, config=configuracion(db_conf))
+    productos = ProductService(db)
+    piezas = PieceService(db, productos)
+    cajas = BoxService(db, _SinImpresora())
+    codigos = [codigo for codigo, _, _ in catalogo()]
+    azar = random.Random(n)
+    medidor = Medidor()
+    canal = db.buscar_o_crear_canal(f"09{n:08d}")
+    caja_id, numero, en_caja, registradas = None, 0, 0, 0
+
+    barrera.wait()
+    fin = time.perf_counter() + segundos
+    try:
+        while time.perf_counter() < fin:
+            if caja_id is None:
+                caja_id = medidor.medir("abrir caja", cajas.crear_o_recuperar_caja, canal['id'], numero + 1)
+                if caja_id is None:
+                    continue
+                numero += 1
+                en_caja = 0
+
+            if en_caja < piezas_caja:
+                peso = round(azar.uniform(0.5, 3.5), 2)
+                if medidor.medir("registrar pieza", piezas.registrar_para_etiqueta, caja_id, azar.choice(codigos), peso):
+                    en_caja += 1
+                    registradas += 1
+                continue
+
+            contenido = db.get_contenido_caja(caja_id)
+            if medidor.medir("cerrar caja", cajas.cerrar_caja, caja_id, canal, contenido, calcular_peso_caja(contenido)):
+                caja_id = None
+    finally:
+        cola.put({
+            'proceso': f"estacion-{n}",
+            'tiempos': medidor.tiempos,
+            'errores': medidor.errores,
+            'piezas': registradas,
+            'bloqueo': db.get_estadisticas_bloqueo(),
+        })
+        db.close()
+
+
+def importador(ruta, db_conf, segundos, pausa_ms, barrera, cola):
+    """Proceso que reescribe el catálogo completo en una transacción, una y otra vez."""
+    db = DatabaseManager(ruta, config=configuracion(db_conf))
+    productos = ProductService(db)
+    filas = catalogo()
+    medidor = Medidor()
+
+    def importar():
+        with db.transaction():
+            for codigo, nombre, especie in filas:
+                productos.upsert_producto(codigo, nombre, especie)
+        return True
+
+    barrera.wait()
+    fin = time.perf_counter() + segundos
+    try:
+        while time.perf_counter() < fin:
+            medidor.medir("importar catálogo", importar)
+            time.sleep(pausa_ms / 1000)
+    finally:
+        cola.put({
+            'proceso': "importador",
+            'tiempos': medidor.tiempos,
+            'errores': medidor.errores,
+            'piezas': 0,
+            'bloqueo': db.get_estadisticas_bloqueo(),
+        })
+        db.close()
+
+
+def percentiles(tiempos):
+    orden = sorted(tiempos)
+
+    def p(q):
+        return round(orden[min(len(orden) - 1, int(len(orden) * q))], 3)
+
+    return {
+        'p50_ms': p(0.50),
+        'p95_ms': p(0.95),
+        'p99_ms': p(0.99),
+        'max_ms': round(orden[-1], 3),
+    }
+
+
+def consolidar(resultados, segundos):
+    tiempos, errores, bloqueo = {}, {}, {'reintentos': 0, 'agotados': 0, 'espera_ms': 0.0}
+    for r in resultados:
+        for operacion, t in r['tiempos'].items():
+            tiempos.setdefault(operacion, []).extend(t)
+        for clave, cuenta in r['errores'].items():
+            errores[clave] = errores.get(clave, 0) + cuenta
+        for clave in bloqueo:
+            bloqueo[clave] += r['bloqueo'][clave]
+    operaciones = {
+        operacion: dict(n=len(t), por_segundo=round(len(t) / segundos, 1), **percentiles(t))
+        for operacion, t in tiempos.items() if t
+    }
+    bloqueo['espera_ms'] = round(bloqueo['espera_ms'], 1)
+    return operaciones, errores, bloqueo
+
+
+def verificar(ruta, piezas_reportadas, piezas_iniciales):
+    db = DatabaseManager(ruta)
+    try:
+        piezas = db._get_conn().execute("SELECT COUNT(*) FROM piezas").fetchone()[0]
+        return {
+            'piezas_en_base': piezas - piezas_iniciales,
+            'piezas_reportadas': piezas_reportadas,
+            'cajas_descuadradas': len(db.verificar_contadores_cajas()),
+            'canales_descuadrados': len(db.verificar_resumen_canales()),
+        }
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escrituras concurrentes desde varios procesos sobre una base temporal.")
+    parser.add_argument("--estaciones", type=int, default=ESTACIONES)
+    parser.add_argument("--segundos", type=int, default=SEGUNDOS)
+    parser.add_argument("--piezas-caja", type=int, default=PIEZAS_POR_CAJA)
+    parser.add_argument("--sin-importador", action="store_true")
+    parser.add_argument("--importador-pausa-ms", type=int, default=200, help="Pausa entre importaciones del catálogo")
+    parser.add_argument("--dias", type=int, default=3, help="Historial previo en la base (8000 piezas/día)")
+    parser.add_argument("--busy-ms", type=int, help="BUSY_TIMEOUT_MS (por defecto el de config.ini)")
+    parser.add_argument("--reintentos", type=int, help="REINTENTOS_BLOQUEO (por defecto el de config.ini)")
+    parser.add_argument("--salida", default="stress_concurrencia.json")
+    args = parser.parse_args()
+
+    base = configuracion({})["DB"]
+    db_conf = {clave: base.get(clave) for clave in CLAVES_DB if base.get(clave) is not None}
+    if args.busy_ms is not None:
+        db_conf["BUSY_TIMEOUT_MS"] = args.busy_ms
+    if args.reintentos is not None:
+        db_conf["REINTENTOS_BLOQUEO"] = args.reintentos
+
+    # spawn: igual en Windows (la planta) que en Linux; cada proceso abre su propia conexión.
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "stress.db")
+        db = DatabaseManager(ruta)
+        try:
+            dataset = generar(db, dias=args.dias)
+        finally:
+            db.close()
+
+        barrera = ctx.Barrier(args.estaciones + (0 if args.sin_importador else 1))
+        cola = ctx.Queue()
+        procesos = [
+            ctx.Process(target=estacion, args=(ruta, db_conf, n, args.segundos, args.piezas_caja, barrera, cola))
+            for n in range(args.estaciones)
+        ]
+        if not args.sin_importador:
+            procesos.append(ctx.Process(
+                target=importador, args=(ruta, db_conf, args.segundos, args.importador_pausa_ms, barrera, cola)
+            ))
+        print(f"[*] {len(procesos)} procesos escribiendo durante {args.segundos} s...")
+        for p in procesos:
+            p.start()
+        # Se leen los resultados antes de join: un proceso no termina con la cola llena.
+        resultados = [cola.get() for _ in procesos]
+        for p in procesos:
+            p.join()
+
+        operaciones, errores, bloqueo = consolidar(resultados, args.segundos)
+        piezas = sum(r['piezas'] for r in resultados)
+        integridad = verificar(ruta, piezas, dataset['piezas'])
+
+    ok = (
+        integridad['piezas_en_base'] == integridad['piezas_reportadas']
+        and not integridad['cajas_descuadradas'] and not integridad['canales_descuadrados']
+    )
+    reporte = {
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'parametros': {k: v for k, v in vars(args).items() if k != 'salida'},
+        'db': db_conf,
+        'piezas_por_segundo': round(piezas / args.segundos, 1),
+        'operaciones': operaciones,
+        'errores': errores,
+        'bloqueo': bloqueo,
+        'integridad': integridad,
+    }
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+    print("=" * 60)
+    print(f" {len(procesos)} PROCESOS / {args.segundos} s: {reporte['piezas_por_segundo']} piezas/s ")
+    print("=" * 60)
+    for operacion, r in operaciones.items():
+        print(f"    {operacion:<18} {r['n']:>7} ({r['por_segundo']:>7.1f}/s)  p50 {r['p50_ms']:>8.2f}  "
+              f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f}  max {r['max_ms']:>8.2f} ms")
+    print(f"    Reintentos por bloqueo: {bloqueo['reintentos']} ({bloqueo['espera_ms']} ms en pausas), "
+          f"agotados: {bloqueo['agotados']}")
+    for clave, cuenta in errores.items():
+        print(f"    ⚠️ {clave}: {cuenta}")
+    estado = "✅" if ok else "❌"
+    print(f"{estado} Integridad: {integridad['piezas_en_base']} piezas en base / {integridad['piezas_reportadas']} "
+          f"reportadas, {integridad['cajas_descuadradas']} cajas y {integridad['canales_descuadrados']} canales descuadrados")
+    print(f"✅ Resultados en {args.salida}")
+    print("=" * 60)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# verificar_contadores.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.verificar_contadores            -> solo reporta
+#   python -m tools.verificar_contadores --reparar  -> recalcula los descuadres
+import argparse
+import sys
+
+from db_manager import DatabaseManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica los contadores mantenidos por triggers.")
+    parser.add_argument("--reparar", action="store_true", help="Recalcula los valores descuadrados")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    try:
+        print("=" * 60)
+        print(" VERIFICACIÓN DE CONTADORES ")
+        print("=" * 60)
+        print("[*] Contadores de caja:")
+        descuadres = db.verificar_contadores_cajas(reparar=args.reparar)
+        for d in descuadres:
+            print(
+                f"    [X] Caja {d['id']}: guardado {d['peso_acumulado']:.3f} kg / {d['num_piezas']} pzas"
+                f" / sig. #{d['next_consecutivo']}"
+                f" -> real {d['peso_real']:.3f} kg / {d['piezas_reales']} pzas / sig. #{d['next_real']}"
+            )
+        if not descuadres:
+            print("    [OK] Todas las cajas cuadran.")
+        elif args.reparar:
+            print(f"    [OK] {len(descuadres)} cajas recalculadas.")
+
+        print("\n[*] Resumen por canal:")
+        descuadres_canal = db.verificar_resumen_canales(reparar=args.reparar)
+        for d in descuadres_canal:
+            print(
+                f"    [X] Canal {d['canal_id']}: guardado {d['total_cajas']} cajas / {d['num_piezas']} pzas"
+                f" -> real {d['cajas_reales']} cajas / {d['piezas_reales']} pzas"
+            )
+        if not descuadres_canal:
+            print("    [OK] Todos los canales cuadran.")
+        elif args.reparar:
+            print(f"    [OK] {len(descuadres_canal)} canales recalculados.")
+
+        print("\n[*] Producción diaria:")
+        descuadres_dia = db.verificar_produccion_diaria(reparar=args.reparar)
+        for d in descuadres_dia:
+            print(
+                f"    [X] {d['dia']} {d['codigo_producto']}: guardado {d['piezas']} pzas / {d['peso']:.3f} kg"
+                f" -> real {d['piezas_reales']} pzas / {d['peso_real']:.3f} kg"
+            )
+        if not descuadres_dia:
+            print("    [OK] Todos los días cuadran.")
+        elif args.reparar:
+            print(f"    [OK] {len(descuadres_dia)} registros diarios recalculados.")
+        print("=" * 60)
+    finally:
+        db.close()
+
+    hay_descuadres = bool(descuadres or descuadres_canal or descuadres_dia)
+    return 1 if hay_descuadres and not args.reparar else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# verificar_planes.py
+# Uso (desde la raíz del proyecto):
+#   python -m tools.verificar_planes                 -> base temporal de tools.generar_dataset (10 días)
+#   python -m tools.verificar_planes --db copia.db   -> contra una copia de la base real (solo lectura)
+#   python -m tools.verificar_planes --todas         -> imprime el plan de cada sentencia
+# Extrae del código fuente (AST) cada sentencia SQL de DatabaseManager,
+# ProductService y BoxService, ejecuta EXPLAIN QUERY PLAN y falla si alguna
+# recorre una tabla completa (SCAN) o necesita un B-tree temporal para ordenar.
+# También falla si el SQL de alguna llamada no se puede reconstruir (NO VERIFICADA).
+import argparse
+import ast
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+from archive_service import ARCHIVO_ALIAS, INDICES_ARCHIVO, TABLAS_ARCHIVO
+from db_manager import BASE_DIR, DatabaseManager
+from tools.generar_dataset import generar
+
+MODULOS = ("db_manager.py", "product_service.py", "box_service.py")
+# Llamadas que reciben SQL y en qué posiciones.
+LLAMADAS_SQL = {
+    "execute": (0,), "executemany": (0,), "_consultar": (1,), "_paginar": (1, 2), "_leer_archivo": (2,),
+}
+SENTENCIAS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+# Valores de ejemplo para las partes dinámicas de los f-strings.
+MUESTRAS = {
+    "st_filter": ("", "AND estado='ABIERTA'"),
+    "marcas": ("?,?,?",),
+    "entidad": ("caja", "pieza"),
+    "tabla": ("produccion_diaria", "produccion_diaria_archivada"),
+    "filtro": ("", "AND p.estado='ACTIVO'"),
+    "ARCHIVO_ALIAS": (ARCHIVO_ALIAS,),
+    "modo": ("PASSIVE",),
+}
+PALABRAS_SQL = {"WHERE", "ON", "LEFT", "JOIN", "INNER", "GROUP", "ORDER", "LIMIT", "USING", "SET"}
+# Recorridos completos intencionales: auditorías que comparan toda la tabla.
+ESCANEO_PERMITIDO = {
+    "verificar_contadores_cajas": "auditoría completa de cajas",
+    "verificar_resumen_canales": "auditoría completa de canales",
+    "verificar_produccion_diaria": "auditoría completa de piezas",
+}
+# Listados completos sin filtro: el SCAN es su definición, pero ordenar en temporal sigue fallando.
+LISTADO_PERMITIDO = {
+    "get_all_productos": "catálogo completo (admin, importador)",
+    "_cargar": "catálogo completo en memoria (CatalogoCache)",
+    "get_all_canales": "todos los canales, incluidos los cerrados",
+    "iter_canales": "todos los canales por páginas",
+    "get_canales_pagina": "primera página del árbol de supervisión",
+    "get_canales_archivados": "índice de canales archivados",
+}
+
+
+# --- Extracción ---
+def extraer_sentencias(modulos=MODULOS):
+    """([(modulo, funcion, linea, sql)], [(modulo, funcion, linea, expresion)]).
+
+    La segunda lista son las llamadas cuyo SQL no se pudo reconstruir (una
+    variable de f-string sin muestra en MUESTRAS, un SQL armado por otra
+    función...): no se verifican y hacen fallar la revisión.
+    """
+    sentencias, sin_resolver = [], []
+    for modulo in modulos:
+        with open(os.path.join(BASE_DIR, modulo), encoding="utf-8") as f:
+            arbol = ast.parse(f.read())
+        for funcion in ast.walk(arbol):
+            if not isinstance(funcion, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            asignaciones = _asignaciones(funcion)
+            # Los helpers que reciben SQL (_consultar, _paginar...) solo lo reenvían:
+            # se verifica en cada llamada que les pasa el texto.
+            reenviados = set()
+            if funcion.name in LLAMADAS_SQL:
+                reenviados = {a.arg for a in funcion.args.args}
+            for nodo in ast.walk(funcion):
+                if not isinstance(nodo, ast.Call) or not isinstance(nodo.func, ast.Attribute):
+                    continue
+                for pos in LLAMADAS_SQL.get(nodo.func.attr, ()):
+                    if pos >= len(nodo.args):
+                        continue
+                    resueltas = _resolver(nodo.args[pos], asignaciones, reenviados)
+                    if resueltas is None:
+                        sin_resolver.append((modulo, funcion.name, nodo.lineno, ast.unparse(nodo.args[pos])))
+                        continue
+                    for sql in resueltas:
+                        if _normalizar(sql).upper().startswith(SENTENCIAS):
+                            sentencias.append((modulo, funcion.name, nodo.lineno, _normalizar(sql)))
+    # Una misma sentencia puede aparecer en varias llamadas de la misma función.
+    return list(dict.fromkeys(sentencias)), list(dict.fromkeys(sin_resolver))
+
+
+def _asignaciones(funcion):
+    valores = {}
+    for nodo in ast.walk(funcion):
+        if isinstance(nodo, ast.Assign):
+            for destino in nodo.targets:
+                if isinstance(destino, ast.Name):
+                    valores.setdefault(destino.id, []).append(nodo.value)
+                elif isinstance(destino, ast.Tuple) and isinstance(nodo.value, ast.Tuple):
+                    # query, args = primera, tuple(params)
+                    for nombre, valor in zip(destino.elts, nodo.value.elts):
+                        if isinstance(nombre, ast.Name):
+                            valores.setdefault(nombre.id, []).append(valor)
+    return valores
+
+
+def _resolver(nodo, asignaciones, reenviados=(), profundidad=0):
+    """Variantes de texto que puede tomar `nodo`, o None si alguna no se puede reconstruir."""
+    if profundidad > 3:
+        return None
+    if isinstance(nodo, ast.Constant) and isinstance(nodo.value, str):
+        return [nodo.value]
+    if isinstance(nodo, ast.Name):
+        if nodo.id in reenviados:
+            return []
+        valores = asignaciones.get(nodo.id)
+        if not valores:
+            return None
+        variantes = []
+        for v in valores:
+            resueltas = _resolver(v, asignaciones, reenviados, profundidad + 1)
+            if resueltas is None:
+                return None
+            variantes.extend(resueltas)
+        return variantes
+    if isinstance(nodo, ast.JoinedStr):
+        # La misma expresión toma el mismo valor en todo el f-string.
+        expresiones = list(dict.fromkeys(
+            ast.unparse(p.value) for p in nodo.values if isinstance(p, ast.FormattedValue)
+        ))
+        if any(e not in MUESTRAS for e in expresiones):
+            return None
+        variantes = []
+        for valores in itertools.product(*(MUESTRAS[e] for e in expresiones)):
+            muestra = dict(zip(expresiones, valores))
+            variantes.append("".join(
+                p.value if isinstance(p, ast.Constant) else muestra[ast.unparse(p.value)] for p in nodo.values
+            ))
+        return variantes
+    return None
+
+
+def _normalizar(sql):
+    return " ".join(sql.split())
+
+
+def _parametros(sql):
+    sin_literales = re.sub(r"'[^']*'", "", sql)
+    return sin_literales.count("?")
+
+
+# --- Base de prueba ---
+def adjuntar_archivo_vacio(conn):
+    """Esquema `archivo` en memoria con las tablas e índices del archivo mensual."""
+    conn.execute(f"ATTACH DATABASE ':memory:' AS {ARCHIVO_ALIAS}")
+    for tabla in TABLAS_ARCHIVO:
+        conn.execute(f"CREATE TABLE {ARCHIVO_ALIAS}.{tabla} AS SELECT * FROM main.{tabla} WHERE 0")
+    for ddl in INDICES_ARCHIVO:
+        conn.execute(ddl)
+
+
+# --- Verificación ---
+def revisar(conn, sentencias):
+    resultados = []
+    for modulo, funcion, linea, sql in sentencias:
+        try:
+            plan = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * _parametros(sql)).fetchall()]
+        except sqlite3.Error as e:
+            resultados.append((modulo, funcion, linea, sql, [f"sin plan: {e}"], ["ERROR"]))
+            continue
+        problemas = [paso for paso in plan if _es_problema(paso)]
+        if problemas and funcion in ESCANEO_PERMITIDO:
+            problemas = []
+        if funcion in LISTADO_PERMITIDO:
+            problemas = [p for p in problemas if not p.startswith("SCAN ")]
+        resultados.append((modulo, funcion, linea, sql, plan, problemas))
+    return resultados
+
+
+def _es_problema(paso):
+    if paso.startswith("USE TEMP B-TREE"):
+        return True
+    if not paso.startswith("SCAN "):
+        return False
+    # FTS5 resuelve el MATCH con su propio índice invertido ("M" en el idxStr).
+    if " VIRTUAL TABLE INDEX " in paso and "M" in paso.rsplit(":", 1)[-1]:
+        return False
+    return not paso.startswith(("SCAN CONSTANT ROW", "SCAN (subquery", "SCAN json_each"))
+
+
+def sugerir_indice(sql, paso):
+    """Índice que cubriría la consulta: columnas de igualdad del WHERE, luego ORDER BY y rangos."""
+    alias = {}
+    for tabla, nombre in re.findall(r"\b(?:FROM|JOIN)\s+([\w.]+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+        alias[tabla] = tabla
+        if nombre and nombre.upper() not in PALABRAS_SQL:
+            alias[nombre] = tabla
+    if paso.startswith("USE TEMP B-TREE"):
+        m = re.search(r"\bFROM\s+([\w.]+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I)
+    else:
+        m = re.search(r"(?:SCAN|SEARCH) ([\w.]+)", paso)
+    if not m:
+        return None
+    tabla = alias.get(m.group(1), m.group(1))
+    propios = {None, "", tabla, tabla.split(".")[-1]} | {a for a, t in alias.items() if t == tabla}
+
+    def columnas_de(patron, texto):
+        return [col for pre, col in re.findall(patron, texto) if pre in propios]
+
+    donde = re.search(r"\bWHERE (.*?)(?: GROUP BY | ORDER BY | LIMIT |$)", sql, re.I)
+    donde = donde.group(1) if donde else ""
+    iguales = columnas_de(r"(?:(\w+)\.)?(\w+)\s*=\s*(?:\?|'[^']*')", donde)
+    rangos = columnas_de(r"(?:(\w+)\.)?(\w+)\s*(?:<=|>=|<|>)\s*\?", donde)
+    orden = re.search(r"\bORDER BY (.*?)(?: LIMIT |$)", sql, re.I)
+    ordenes = columnas_de(r"(?:(\w+)\.)?(\w+)(?:\s+(?:ASC|DESC))?\s*(?:,|$)", orden.group(1)) if orden else []
+    columnas = [c for c in dict.fromkeys(iguales + ordenes + rangos) if c not in ("id", "rowid")]
+    if not columnas:
+        return None
+    esquema, _, nombre = tabla.rpartition(".")
+    prefijo = f"{esquema}." if esquema else ""
+    return (f"CREATE INDEX IF NOT EXISTS {prefijo}idx_{nombre}_{'_'.join(columnas)} "
+            f"ON {nombre}({', '.join(columnas)});")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Falla si una consulta del código hace SCAN o TEMP B-TREE.")
+    parser.add_argument("--db", help="Base existente a revisar (no se modifica)")
+    parser.add_argument("--dias", type=int, default=10, help="Días a generar en la base temporal (8000 piezas/día)")
+    parser.add_argument("--todas", action="store_true", help="Imprime el plan de todas las sentencias")
+    args = parser.parse_args()
+
+    sentencias, sin_resolver = extraer_sentencias()
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+            db = None
+        else:
+            db = DatabaseManager(os.path.join(tmp, "planes.db"))
+            generar(db, dias=args.dias)
+            conn = db._get_conn()
+        try:
+            adjuntar_archivo_vacio(conn)
+            resultados = revisar(conn, sentencias)
+        finally:
+            conn.execute(f"DETACH DATABASE {ARCHIVO_ALIAS}")
+            if db:
+                db.close()
+            else:
+                conn.close()
+
+    fallos = []
+    print("=" * 60)
+    print(f" PLANES DE CONSULTA ({len(resultados)} sentencias) ")
+    print("=" * 60)
+    for modulo, funcion, linea, sql, plan, problemas in resultados:
+        if problemas:
+            fallos.append((modulo, funcion, linea, sql, plan, problemas))
+        if problemas or args.todas:
+            estado = "FALLA" if problemas else "OK"
+            print(f"    [{estado}] {modulo}:{linea} {funcion}")
+            print(f"        {sql[:110]}")
+            for paso in plan:
+                print(f"        -> {paso}")
+
+    for modulo, funcion, linea, expresion in sin_resolver:
+        print(f"    [NO VERIFICADA] {modulo}:{linea} {funcion}")
+        print(f"        SQL no reconstruible: {expresion[:100]}")
+
+    sugerencias = {s for f in fallos for p in f[5] if (s := sugerir_indice(f[3], p))}
+    if fallos:
+        print("-" * 60)
+        print(f"    [FALLA] {len(fallos)} consulta(s) recorren tablas completas u ordenan en temporal.")
+        for s in sorted(sugerencias):
+            print(f"    Sugerido: {s}")
+    if sin_resolver:
+        print("-" * 60)
+        print(f"    [FALLA] {len(sin_resolver)} llamada(s) sin verificar: agregue la variable a MUESTRAS.")
+    if not fallos and not sin_resolver:
+        print("    [OK] Todas las consultas usan índices.")
+    print("=" * 60)
+    return 1 if fallos or sin_resolver else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())